@@ -1,182 +1,406 @@
+import argparse
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import Iterable, Optional
 import sys
 import os
-import subprocess
 import shutil
 
 # Add root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from original_annotation.modules.cpg_integration import load_pi_cpg_mappings, attach_ewas_atlas_traits, analyze_unmapped_genes
-from original_annotation.modules.disgenet_utils import annotate_with_disgenet
+from original_annotation.modules.cpg_integration import (
+    load_pi_cpg_mappings, attach_ewas_atlas_traits, analyze_unmapped_genes, normalize_atlas_table,
+    build_atlas_associations
+)
+from original_annotation.modules.gene_proximity import load_proximity_cpg_mappings
+from original_annotation.modules.disgenet_utils import annotate_with_disgenet, build_disgenet_associations, load_disgenet
 from original_annotation.modules.viz_engine import plot_disease_heatmap, plot_broad_spectrum_network
 from original_annotation.modules.reporting_engine import generate_summary_report
+from original_annotation.modules.figure_stage import FigureStage
+from original_annotation.modules.excel_export import multiline_columns, write_excel
+from original_annotation.modules.living_store import (
+    LIVING_FILE_PATH, AUGMENTED_FILE_PATH, read_living_file, write_living_file, write_csv_if_changed
+)
+from original_annotation.modules.associations import (
+    ASSOCIATIONS_PATH, SOURCE_BY_COLUMN, combine_associations, load_associations, save_associations,
+    select_associations
+)
+from original_annotation.modules.run_profile import RunProfiler
+from original_annotation.modules.schema import ATLAS_DTYPES, GENE_TABLE_DTYPES, apply_schema, read_csv_with_schema
+from original_annotation.modules.incremental import (
+    diff_rows, manifest_path, read_manifest, row_hashes, row_keys, source_fingerprints, write_manifest
+)
 
+# Optional stages; the CpG join and the augmented-file write always run
+AUGMENT_STAGES = ("atlas", "gap", "disgenet", "excel", "viz", "report")
 
-def augment_living_file(living_path: str = "annotated_genes.xlsx", 
+# Per-stage timing/memory report, written next to the augmented file
+RUN_REPORT_PATH = "annotated_genes_augmented_run_report.json"
+
+
+def _check_stages(stages: Iterable[str]) -> set:
+    stages = set(stages)
+    unknown = sorted(stages - set(AUGMENT_STAGES))
+    if unknown:
+        raise ValueError(f"Unknown augment stages {unknown}; choose from {list(AUGMENT_STAGES)}")
+    return stages
+
+
+def _figure_columns(df: pd.DataFrame, disease_col: str) -> pd.DataFrame:
+    """Just the columns a figure reads, so worker processes receive a small pickle."""
+    return df[[c for c in ('symbol', disease_col) if c in df.columns]]
+
+
+def _figure_associations(associations: Optional[pd.DataFrame], df: pd.DataFrame,
+                         disease_col: str) -> Optional[pd.DataFrame]:
+    """The association rows a figure reads (its source, df's genes), rather than the whole table."""
+    genes = df['symbol'] if 'symbol' in df.columns else None
+    return select_associations(associations, SOURCE_BY_COLUMN.get(disease_col, disease_col), genes=genes)
+
+
+def augment_living_file(living_path: str = LIVING_FILE_PATH,
                         mapping_path: str = "ewas_res_groupsig_128.xlsx",
                         atlas_path: str = "data/ewas_atlas.csv",
                         gea_path: str = "data/disgenet_gea.csv",
-                        output_path: str = "annotated_genes_augmented.xlsx"):
+                        output_path: str = AUGMENTED_FILE_PATH,
+                        annotation_path: str = None,
+                        excel_path: str = "annotated_genes_augmented.xlsx",
+                        associations_path: str = ASSOCIATIONS_PATH,
+                        parallel_figures: bool = True,
+                        incremental: bool = False,
+                        stages: Iterable[str] = AUGMENT_STAGES,
+                        viz_dir: str = "viz",
+                        report_path: str = "summary_report.md",
+                        unaccounted_path: str = "unaccounted_genes.csv",
+                        appendix_c_path: str = "appendix_c_source.csv",
+                        run_report_path: Optional[str] = RUN_REPORT_PATH,
+                        trace_allocations: bool = True):
     """
     Loads the existing living file and appends CpG coordinates, Atlas traits, and broad DisGeNET data.
     Ensures all CpGs are preserved and performs gap analysis on unmapped genes.
+    If annotation_path (GTF or refGene table) is given, CpG-to-gene mappings are derived
+    from it by TSS proximity instead of the PI's unique_gene_name column.
+    The augmented table is stored at output_path (Parquet by default) and exported to excel_path.
+    Atlas and broad DisGeNET associations replace those sources in the long-form table at
+    associations_path, which the heatmap, network and report read instead of the string columns.
+    Figures (and the R heatmap) render in parallel worker processes unless parallel_figures is False.
+    With incremental=True, rows whose (cpg, gene) key and inputs match the manifest of the
+    previous run are reused from output_path and only new or changed rows are enriched;
+    a changed Atlas or DisGeNET file forces a full run.
+    stages selects the optional steps (see AUGMENT_STAGES); inputs of disabled stages are not loaded.
+    Per-stage wall/CPU time, peak RSS, row counts and (with trace_allocations) the top
+    tracemalloc allocation sites are written to run_report_path as JSON.
     """
-    print(f"[AUGMENT] Loading living file: {living_path}")
-    df_living = pd.read_excel(living_path)
+    stages = _check_stages(stages)
+    profiler = RunProfiler(report_path=run_report_path, trace_allocations=trace_allocations)
+    try:
+        with profiler.stage("load_inputs") as stage:
+            print(f"[AUGMENT] Loading living file: {living_path}")
+            df_living = apply_schema(read_living_file(living_path), GENE_TABLE_DTYPES)
+            associations = None
+            if stages & {"atlas", "disgenet", "viz", "report"}:
+                associations = load_associations(associations_path)
     
-    print(f"[AUGMENT] Loading CpG mappings from PI file: {mapping_path}")
-    df_mappings = load_pi_cpg_mappings(mapping_path)
+            if annotation_path:
+                print(f"[AUGMENT] Mapping CpGs from {mapping_path} to genes in {annotation_path}")
+                df_mappings = load_proximity_cpg_mappings(mapping_path, annotation_path)
+            else:
+                print(f"[AUGMENT] Loading CpG mappings from PI file: {mapping_path}")
+                df_mappings = load_pi_cpg_mappings(mapping_path)
+            stage.rows_out = df_mappings
     
-    # 1. Join genetic annotations to the CpG mappings (Comprehensive Join)
-    print("[AUGMENT] Performing comprehensive join (retaining all CpGs)...")
-    df_mappings_clean = df_mappings[['cpg', 'chr', 'Start_hg38', 'End_hg38', 'gene']].rename(columns={
-        'chr': 'cpg_chr',
-        'Start_hg38': 'cpg_start',
-        'End_hg38': 'cpg_end'
-    })
+        # 1. Join genetic annotations to the CpG mappings (Comprehensive Join)
+        with profiler.stage("join_and_diff", rows_in=df_mappings) as stage:
+            print("[AUGMENT] Performing comprehensive join (retaining all CpGs)...")
+            df_mappings_clean = df_mappings[['cpg', 'chr', 'Start_hg38', 'End_hg38', 'gene']].rename(columns={
+                'chr': 'cpg_chr',
+                'Start_hg38': 'cpg_start',
+                'End_hg38': 'cpg_end'
+            })
     
-    df_living['input'] = df_living['input'].astype(str).str.strip()
-    df_augmented = pd.merge(df_living, df_mappings_clean, left_on='input', right_on='gene', how='right')
-    
-    if 'gene' in df_augmented.columns:
-        df_augmented = df_augmented.drop(columns=['gene'])
+            df_living['input'] = df_living['input'].astype(str).str.strip()
+            df_base = pd.merge(df_living, df_mappings_clean, left_on='input', right_on='gene', how='right')
 
-    # 2. EWAS Atlas Integration & Gap Analysis
-    if Path(atlas_path).is_file():
-        print("[AUGMENT] Processing EWAS Atlas data and gap analysis...")
-        df_atlas = pd.read_csv(atlas_path, low_memory=False)
-        
-        # A. Attach traits (with refined formatting/scoring)
-        df_augmented = attach_ewas_atlas_traits(df_augmented, df_atlas)
-        
-        # B. Update ewas_atlas.csv on disk with rank_score
-        def calc_rank_score(row):
-            try:
-                # Only calculate if rank is NOT blank
-                if pd.notna(row['rank']) and pd.notna(row['total_associations']) and row['total_associations'] != 0:
-                    score = float(row['rank']) / float(row['total_associations'])
-                    return f"{score:.3f}"
-            except:
-                pass
-            return "" # Return empty string for CSV if no rank exists
-        
-        df_atlas_disk = df_atlas.copy()
-        df_atlas_disk['rank_score'] = df_atlas_disk.apply(calc_rank_score, axis=1)
+            # Incremental mode: only rows whose (cpg, gene) key is new or whose inputs changed are enriched
+            keys = row_keys(df_base, ['cpg', 'gene'])
+            hashes = row_hashes(df_base)
+            manifest_file = manifest_path(output_path)
+            df_previous = None
+            if incremental:
+                try:
+                    df_previous = read_living_file(output_path)
+                except FileNotFoundError:
+                    pass
+            def run_inputs():
+                # Reused rows are only valid if the same sources went through the same enrichment stages
+                inputs = source_fingerprints({'atlas': atlas_path if stages & {"atlas", "gap"} else None,
+                                              'gea': gea_path if "disgenet" in stages else None})
+                inputs['stages'] = ",".join(s for s in AUGMENT_STAGES if s in stages & {"atlas", "gap", "disgenet"})
+                return inputs
+
+            diff = diff_rows(keys, hashes, read_manifest(manifest_file) if incremental else None,
+                             run_inputs(), None if df_previous is None else len(df_previous))
+            stage.rows_out = df_base
+
+        if incremental:
+            if diff.up_to_date:
+                print(f"[AUGMENT] {output_path} is up to date ({len(keys)} rows unchanged); nothing to do.")
+                return
+            if diff.full:
+                print(f"[AUGMENT] Full augmentation: {diff.reason}.")
+            else:
+                print(f"[AUGMENT] Incremental augmentation: {int(diff.changed.sum())} new or changed rows, "
+                      f"{len(keys) - int(diff.changed.sum())} reused, {diff.removed} removed.")
+
+        df_augmented = df_base[diff.changed].reset_index(drop=True)
+        if 'gene' in df_augmented.columns:
+            df_augmented = df_augmented.drop(columns=['gene'])
+
+        # 2. EWAS Atlas Integration & Gap Analysis
+        df_atlas = None
+        if not stages & {"atlas", "gap"}:
+            print("[AUGMENT] Skipping EWAS Atlas integration and gap analysis.")
+        elif Path(atlas_path).is_file():
+            with profiler.stage("ewas_atlas_and_gap", rows_in=df_augmented) as stage:
+                print("[AUGMENT] Processing EWAS Atlas data and gap analysis...")
+                df_atlas = read_csv_with_schema(atlas_path, ATLAS_DTYPES, low_memory=False)
         
-        # Clean up .0 decimals for CSV readability
-        for col in ['rank', 'total_associations', 'pmid']:
-            if col in df_atlas_disk.columns:
-                # Convert to numeric, then to string without .0, preserving NaN
-                df_atlas_disk[col] = pd.to_numeric(df_atlas_disk[col], errors='coerce')
-                df_atlas_disk[col] = df_atlas_disk[col].apply(lambda x: f"{int(x)}" if pd.notna(x) else "")
-
-
-        # Reorder columns to put rank_score between p and rank
-        cols = list(df_atlas_disk.columns)
-        if 'p' in cols and 'rank' in cols:
-            cols.remove('rank_score')
-            p_idx = cols.index('p')
-            cols.insert(p_idx + 1, 'rank_score')
-        df_atlas_disk = df_atlas_disk[cols]
-        df_atlas_disk.to_csv(atlas_path, index=False)
-        print(f"[AUGMENT] Updated {atlas_path} with rank_score column and integer strings.")
-
-        # C. Analyze unmapped genes (passing original unexpanded mappings)
-        unmapped_genes, unmapped_regions, unaccounted_df, appendix_c_df = analyze_unmapped_genes(df_atlas, df_living, df_mappings)
+                if "atlas" in stages:
+                    # A. Attach traits (with refined formatting/scoring)
+                    df_augmented = attach_ewas_atlas_traits(df_augmented, df_atlas)
+            
+                    # B. Normalize ewas_atlas.csv on disk (rank_score, integer strings); skipped if unchanged
+                    if write_csv_if_changed(normalize_atlas_table(df_atlas), atlas_path):
+                        print(f"[AUGMENT] Updated {atlas_path} with rank_score column and integer strings.")
+                    else:
+                        print(f"[AUGMENT] {atlas_path} already normalized; left untouched.")
+
+                if "gap" in stages:
+                    # C. Analyze unmapped genes (passing original unexpanded mappings)
+                    unmapped_genes, unmapped_regions, unaccounted_df, appendix_c_df = analyze_unmapped_genes(df_atlas, df_living, df_mappings)
+            
+                    # D. Export diagnostic tables (columns are attached once the rows are merged)
+                    print("[AUGMENT] Exporting gap analysis diagnostic tables...")
+                    unaccounted_df.to_csv(unaccounted_path, index=False)
+                    appendix_c_df.to_csv(appendix_c_path, index=False)
+                stage.rows_out = df_augmented
+        else:
+            print(f"[AUGMENT] Warning: {atlas_path} not found.")
+
+        # 3. Rename existing 'disgenet_evidence' to 'disgenet_psych_evidence'
+        if 'disgenet_evidence' in df_augmented.columns:
+            print("[AUGMENT] Renaming 'disgenet_evidence' to 'disgenet_psych_evidence'...")
+            df_augmented = df_augmented.rename(columns={'disgenet_evidence': 'disgenet_psych_evidence'})
+
+        # 4. Attach Broad-Spectrum DisGeNET
+        df_gea = None
+        if "disgenet" not in stages:
+            print("[AUGMENT] Skipping Broad-Spectrum DisGeNET.")
+        elif Path(gea_path).is_file():
+            with profiler.stage("disgenet", rows_in=df_augmented) as stage:
+                print("[AUGMENT] Attaching Broad-Spectrum DisGeNET associations...")
+                df_gea = load_disgenet(gea_path)
         
-        # D. Attach columns
-        df_augmented['ewas_unmapped_gene'] = df_augmented['cpg'].map(unmapped_genes)
-        df_augmented['ewas_unmapped_regions'] = df_augmented['cpg'].map(unmapped_regions)
+                # We target 'symbol' column
+                df_augmented = annotate_with_disgenet(df_augmented, df_gea, psych_only=False)
         
-        # E. Export diagnostic tables
-        print("[AUGMENT] Exporting gap analysis diagnostic tables...")
-        unaccounted_df.to_csv("unaccounted_genes.csv", index=False)
-        appendix_c_df.to_csv("appendix_c_source.csv", index=False)
-    else:
-        print(f"[AUGMENT] Warning: {atlas_path} not found.")
-
-    # 3. Rename existing 'disgenet_evidence' to 'disgenet_psych_evidence'
-    if 'disgenet_evidence' in df_augmented.columns:
-        print("[AUGMENT] Renaming 'disgenet_evidence' to 'disgenet_psych_evidence'...")
-        df_augmented = df_augmented.rename(columns={'disgenet_evidence': 'disgenet_psych_evidence'})
-
-    # 4. Attach Broad-Spectrum DisGeNET
-    if Path(gea_path).is_file():
-        print("[AUGMENT] Attaching Broad-Spectrum DisGeNET associations...")
-        df_gea = pd.read_csv(gea_path)
+                # Clean up the duplicate broad column (it adds 'disgenet_diseases' while 'disgenet_disease' might exist)
+                # Fix for duplicate disgenet columns: ensure only one broad column exists
+                if 'disgenet_diseases' in df_augmented.columns and 'disgenet_disease' in df_augmented.columns:
+                     print("[AUGMENT] Removing duplicate disgenet broad column...")
+                     df_augmented = df_augmented.drop(columns=['disgenet_diseases'])
         
-        # We target 'symbol' column
-        df_augmented = annotate_with_disgenet(df_augmented, df_gea, psych_only=False)
+                # Drop broad evidence if it appeared
+                if 'disgenet_evidence' in df_augmented.columns:
+                     df_augmented = df_augmented.drop(columns=['disgenet_evidence'])
+                stage.rows_out = df_augmented
+        else:
+            print(f"[AUGMENT] Warning: {gea_path} not found.")
+
+        with profiler.stage("merge_rows", rows_in=df_augmented) as stage:
+            # Merge reused rows from the previous output back in, in mapping order
+            if not diff.full:
+                reused = df_previous.iloc[diff.previous_rows[~diff.changed]]
+                position = np.concatenate([np.flatnonzero(diff.changed), np.flatnonzero(~diff.changed)])
+                df_augmented = pd.concat([df_augmented, reused], ignore_index=True)
+                df_augmented = df_augmented.iloc[np.argsort(position, kind='stable')].reset_index(drop=True)
+
+            if df_atlas is not None and "gap" in stages:
+                df_augmented['ewas_unmapped_gene'] = df_augmented['cpg'].map(unmapped_genes)
+                df_augmented['ewas_unmapped_regions'] = df_augmented['cpg'].map(unmapped_regions)
+            # The long-form tables are vectorized joins, so they are rebuilt over every row
+            if df_atlas is not None and "atlas" in stages:
+                associations = combine_associations(associations, build_atlas_associations(df_augmented, df_atlas))
+            if df_gea is not None:
+                associations = combine_associations(associations, build_disgenet_associations(df_augmented, df_gea, psych_only=False))
+
+            # Reorder columns
+            cols = list(df_augmented.columns)
+            cpg_cols = ['cpg', 'cpg_chr', 'cpg_start', 'cpg_end']
+            for c in reversed(cpg_cols):
+                if c in cols:
+                    cols.remove(c)
+                    cols.insert(0, c)
+    
+            # Put unmapped cols near end
+            for c in ['ewas_unmapped_gene', 'ewas_unmapped_regions']:
+                if c in cols:
+                    cols.remove(c)
+                    cols.append(c)
         
-        # Clean up the duplicate broad column (it adds 'disgenet_diseases' while 'disgenet_disease' might exist)
-        # Fix for duplicate disgenet columns: ensure only one broad column exists
-        if 'disgenet_diseases' in df_augmented.columns and 'disgenet_disease' in df_augmented.columns:
-             print("[AUGMENT] Removing duplicate disgenet broad column...")
-             df_augmented = df_augmented.drop(columns=['disgenet_diseases'])
+            # Reused and new rows may arrive with different category sets; restore the declared dtypes
+            df_augmented = apply_schema(df_augmented[cols], GENE_TABLE_DTYPES)
+            stage.rows_out = df_augmented
+
+        with profiler.stage("write_outputs", rows_in=df_augmented):
+            saved_path = write_living_file(df_augmented, output_path)
+            print(f"[AUGMENT] Saved augmented file to: {saved_path}")
+            # Fingerprints are taken after the Atlas table was normalized, so the next run sees the file as written
+            write_manifest(manifest_file, keys, hashes, run_inputs())
+            if excel_path and "excel" in stages:
+                print(f"[AUGMENT] Exporting augmented file to: {excel_path}")
+                write_excel(df_augmented, excel_path, wrap_columns=multiline_columns(df_augmented))
+            if associations is not None:
+                saved_assoc = save_associations(associations, associations_path)
+                print(f"[AUGMENT] Saved association table to: {saved_assoc}")
+
+        # 5. Generate Visualizations (independent figures render concurrently; collected at the end)
+        figures = None
+        if "viz" in stages:
+            with profiler.stage("figures_submit"):
+                print("[AUGMENT] Generating visualizations...")
+                viz_dir = Path(viz_dir)
+                viz_dir.mkdir(parents=True, exist_ok=True)
+                figures = FigureStage(parallel=parallel_figures)
+
+                if shutil.which("Rscript"):
+                    r_script_path = Path("disgenet/plot_heatmap.R")
+                    if r_script_path.is_file():
+                        print("[AUGMENT] Starting R script for DisGeNET2R heatmap...")
+                        figures.run_command("DisGeNET2R heatmap", ["Rscript", str(r_script_path)])
         
-        # Drop broad evidence if it appeared
-        if 'disgenet_evidence' in df_augmented.columns:
-             df_augmented = df_augmented.drop(columns=['disgenet_evidence'])
-    else:
-        print(f"[AUGMENT] Warning: {gea_path} not found.")
-
-    # Reorder columns
-    cols = list(df_augmented.columns)
-    cpg_cols = ['cpg', 'cpg_chr', 'cpg_start', 'cpg_end']
-    for c in reversed(cpg_cols):
-        if c in cols:
-            cols.remove(c)
-            cols.insert(0, c)
-    
-    # Put unmapped cols near end
-    for c in ['ewas_unmapped_gene', 'ewas_unmapped_regions']:
-        if c in cols:
-            cols.remove(c)
-            cols.append(c)
+                if 'disgenet_psych_diseases' in df_augmented.columns:
+                    figures.submit("psychiatric heatmap", plot_disease_heatmap,
+                                   _figure_columns(df_augmented, 'disgenet_psych_diseases'),
+                                   disease_col='disgenet_psych_diseases', 
+                                   output_path=str(viz_dir / "heatmap_psychiatric_seaborn.png"),
+                                   title="Psychiatric Gene-Disease Associations (Seaborn)",
+                                   dpi=300,
+                                   associations=_figure_associations(associations, df_augmented,
+                                                                     'disgenet_psych_diseases'))
         
-    df_augmented = df_augmented[cols]
+                # Use disgenet_disease (the correct one) for the network graph
+                target_broad_col = 'disgenet_disease' if 'disgenet_disease' in df_augmented.columns else 'disgenet_diseases'
+                if target_broad_col in df_augmented.columns:
+                    figures.submit("broad-spectrum network", plot_broad_spectrum_network,
+                                   _figure_columns(df_augmented, target_broad_col),
+                                   disease_col=target_broad_col, 
+                                   output_path=str(viz_dir / "network_broad_spectrum.png"),
+                                   title="Broad-Spectrum Gene-Disease Network",
+                                   score_threshold=0.1,
+                                   wrap_width=20,
+                                   associations=_figure_associations(associations, df_augmented, target_broad_col),
+                                   layout_cache_dir=viz_dir / "layout_cache",
+                                   export_path=str(viz_dir / "network_broad_spectrum.json"))
 
-    print(f"[AUGMENT] Saving augmented file to: {output_path}")
-    df_augmented.to_excel(output_path, index=False)
+        # 6. Generate Summary Report (while the figures render)
+        if "report" in stages:
+            print("[AUGMENT] Generating summary report...")
+            with profiler.stage("report", rows_in=df_augmented):
+                generate_summary_report(df_augmented, output_path=report_path, associations=associations)
 
-    # 5. Generate Visualizations
-    print("[AUGMENT] Generating visualizations...")
-    viz_dir = Path("viz")
-    viz_dir.mkdir(exist_ok=True)
-    
-    if 'disgenet_psych_diseases' in df_augmented.columns:
-        plot_disease_heatmap(df_augmented, 
-                             disease_col='disgenet_psych_diseases', 
-                             output_path="viz/heatmap_psychiatric_seaborn.png",
-                             title="Psychiatric Gene-Disease Associations (Seaborn)",
-                             dpi=300)
-    
-    # Use disgenet_disease (the correct one) for the network graph
-    target_broad_col = 'disgenet_disease' if 'disgenet_disease' in df_augmented.columns else 'disgenet_diseases'
-    if target_broad_col in df_augmented.columns:
-        plot_broad_spectrum_network(df_augmented, 
-                                    disease_col=target_broad_col, 
-                                    output_path="viz/network_broad_spectrum.png",
-                                    title="Broad-Spectrum Gene-Disease Network",
-                                    score_threshold=0.1,
-                                    wrap_width=20)
-
-    if shutil.which("Rscript"):
-        r_script_path = Path("disgenet/plot_heatmap.R")
-        if r_script_path.is_file():
-            print("[AUGMENT] Executing R script for DisGeNET2R heatmap...")
-            try:
-                subprocess.run(["Rscript", str(r_script_path)], check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"[AUGMENT] Error running R script: {e}")
-
-    # 6. Generate Summary Report
-    print("[AUGMENT] Generating summary report...")
-    generate_summary_report(df_augmented, output_path="summary_report.md")
+        if figures is not None:
+            print("[AUGMENT] Waiting for figures...")
+            with profiler.stage("figures_wait"):
+                figures.wait()
 
+        profiler.print_summary(prefix="[AUGMENT]")
+    finally:
+        # Stop tracemalloc even when a stage fails
+        profiler.close()
+    if run_report_path:
+        print(f"[AUGMENT] Run report written to: {run_report_path}")
     print("[AUGMENT] Done.")
 
+
+# ---------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------
+
+def _stage_list(value: str) -> list:
+    stages = [s.strip() for s in value.split(",") if s.strip()]
+    try:
+        _check_stages(stages)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return stages
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Augment the living annotation file with CpG coordinates, EWAS Atlas traits "
+            "and broad-spectrum DisGeNET data, then export figures and a summary report."
+        )
+    )
+    paths = parser.add_argument_group("paths")
+    paths.add_argument("--living", default=LIVING_FILE_PATH, help=f"Living file (default: {LIVING_FILE_PATH})")
+    paths.add_argument("--mapping", default="ewas_res_groupsig_128.xlsx",
+                       help="PI CpG mapping workbook (default: ewas_res_groupsig_128.xlsx)")
+    paths.add_argument("--annotation", default=None,
+                       help="Optional GTF/refGene table; maps CpGs to genes by TSS proximity instead.")
+    paths.add_argument("--atlas", default="data/ewas_atlas.csv", help="EWAS Atlas table (default: data/ewas_atlas.csv)")
+    paths.add_argument("--gea", default="data/disgenet_gea.csv", help="DisGeNET GEA export (default: data/disgenet_gea.csv)")
+    paths.add_argument("--output", default=AUGMENTED_FILE_PATH, help=f"Augmented file (default: {AUGMENTED_FILE_PATH})")
+    paths.add_argument("--excel", default="annotated_genes_augmented.xlsx",
+                       help="Excel export (default: annotated_genes_augmented.xlsx)")
+    paths.add_argument("--associations", default=ASSOCIATIONS_PATH,
+                       help=f"Long-form association table (default: {ASSOCIATIONS_PATH})")
+    paths.add_argument("--viz-dir", default="viz", help="Directory for figures (default: viz)")
+    paths.add_argument("--report", default="summary_report.md", help="Summary report (default: summary_report.md)")
+    paths.add_argument("--unaccounted", default="unaccounted_genes.csv",
+                       help="Gap analysis: uncaptured Atlas genes (default: unaccounted_genes.csv)")
+    paths.add_argument("--appendix-c", default="appendix_c_source.csv",
+                       help="Gap analysis: decimal Atlas gene tokens (default: appendix_c_source.csv)")
+    paths.add_argument("--run-report", default=RUN_REPORT_PATH,
+                       help=f"Per-stage timing/memory JSON report (default: {RUN_REPORT_PATH})")
+
+    selection = parser.add_argument_group("stages")
+    selection.add_argument("--only", type=_stage_list, default=None,
+                           help=f"Comma-separated stages to run, e.g. disgenet,atlas (from: {','.join(AUGMENT_STAGES)})")
+    for stage in AUGMENT_STAGES:
+        selection.add_argument(f"--no-{stage}", dest="skip", action="append_const", const=stage,
+                               help=f"Skip the {stage} stage.")
+    selection.add_argument("--incremental", action="store_true",
+                           help="Only enrich new or changed CpG/gene rows; reuse the rest from --output.")
+    selection.add_argument("--sequential-figures", action="store_true",
+                           help="Render figures in this process instead of worker processes.")
+    selection.add_argument("--no-trace-allocations", action="store_true",
+                           help="Skip tracemalloc allocation sites in the run report (lower overhead).")
+
+    args = parser.parse_args(argv)
+    stages = [s for s in (args.only or AUGMENT_STAGES) if s not in (args.skip or [])]
+
+    augment_living_file(living_path=args.living,
+                        mapping_path=args.mapping,
+                        atlas_path=args.atlas,
+                        gea_path=args.gea,
+                        output_path=args.output,
+                        annotation_path=args.annotation,
+                        excel_path=args.excel,
+                        associations_path=args.associations,
+                        parallel_figures=not args.sequential_figures,
+                        incremental=args.incremental,
+                        stages=stages,
+                        viz_dir=args.viz_dir,
+                        report_path=args.report,
+                        unaccounted_path=args.unaccounted,
+                        appendix_c_path=args.appendix_c,
+                        run_report_path=args.run_report,
+                        trace_allocations=not args.no_trace_allocations)
+
+
 if __name__ == "__main__":
-    augment_living_file()
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Recorded HTTP responses, replayed in place of requests so the annotation stages run offline."""
+
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from unittest import mock
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from original_annotation.modules.http_metrics import service_for_url
+
+logger = logging.getLogger(__name__)
+
+# Credentials and contact details never take part in matching (or get written to disk)
+IGNORED_PARAMS = frozenset({"email", "api_key", "tool"})
+
+
+def request_key(url: str, params: Optional[dict] = None) -> str:
+    """'host/path?sorted query' for a GET, e.g. 'rest.uniprot.org/uniprotkb/P1.json?'."""
+    prepared = requests.PreparedRequest()
+    prepared.prepare_url(url, params)
+    parts = urlsplit(prepared.url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    return f"{parts.netloc}{parts.path}?{urlencode(query)}"
+
+
+@dataclass
+class RecordedResponse:
+    status: int
+    body: str
+    content_type: str = "application/json"
+
+    def to_response(self, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = self.body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = self.content_type
+        response.url = url
+        return response
+
+
+# Answers a family of requests (e.g. ranged or batched queries) from the parsed query string
+Handler = Callable[[dict], Optional[RecordedResponse]]
+
+
+class Cassette:
+    """
+    Responses keyed by request_key, plus handlers for request families whose exact
+    URLs depend on batching (EFetch id lists, UCSC ranges).
+
+    Unmatched requests get an empty 404 and are listed in misses, so a stale cassette
+    shows up in the benchmark output instead of silently timing error paths.
+    """
+
+    def __init__(self, responses: Optional[dict[str, RecordedResponse]] = None):
+        self.responses: dict[str, RecordedResponse] = dict(responses or {})
+        self.handlers: dict[str, Handler] = {}
+        self.served: Counter = Counter()
+        self.misses: list[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, url: str, body: str, params: Optional[dict] = None, status: int = 200,
+            content_type: str = "application/json") -> None:
+        self.responses[request_key(url, params)] = RecordedResponse(status, body, content_type)
+
+    def add_json(self, url: str, payload, params: Optional[dict] = None, status: int = 200) -> None:
+        self.add(url, json.dumps(payload), params=params, status=status)
+
+    def route(self, url: str, handler: Handler) -> None:
+        """Serves every request to url (any query string) that has no exact entry from handler(query)."""
+        self.handlers[request_key(url).rstrip("?")] = handler
+
+    def lookup(self, url: str, params: Optional[dict] = None) -> Optional[RecordedResponse]:
+        key = request_key(url, params)
+        recorded = self.responses.get(key)
+        if recorded is None:
+            path, _, query = key.partition("?")
+            handler = self.handlers.get(path)
+            if handler is not None:
+                recorded = handler(dict(parse_qsl(query, keep_blank_values=True)))
+        return recorded
+
+    def respond(self, url: str, params: Optional[dict] = None) -> requests.Response:
+        recorded = self.lookup(url, params)
+        with self._lock:
+            if recorded is None:
+                self.misses.append(request_key(url, params))
+            else:
+                self.served[service_for_url(url)] += 1
+        return (recorded or RecordedResponse(404, "", "text/plain")).to_response(url)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.served.clear()
+            self.misses = []
+
+    def save(self, path: str | Path) -> Path:
+        """Writes the exact-match responses as JSON (gzipped for a .gz path); handlers are code and are not saved."""
+        path = Path(path)
+        payload = json.dumps({key: asdict(r) for key, r in sorted(self.responses.items())}, indent=1)
+        if path.suffix == ".gz":
+            with gzip.open(path, "wt", encoding="utf-8") as fh:
+                fh.write(payload)
+        else:
+            path.write_text(payload, encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Cassette":
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as fh:
+            entries = json.load(fh)
+        return cls({key: RecordedResponse(**entry) for key, entry in entries.items()})
+
+
+@contextmanager
+def replay(cassette: Cassette, latency_s: float = 0.0) -> Iterator[Cassette]:
+    """
+    Serves requests.get and requests.Session.get from the cassette and turns time.sleep
+    into a no-op, so retry back-off and rate-limit pauses cost nothing.
+
+    latency_s adds a real per-request delay, which makes concurrency changes measurable.
+    """
+    real_sleep = time.sleep
+
+    def fake_get(url, params=None, **kwargs):
+        if latency_s:
+            real_sleep(latency_s)
+        return cassette.respond(url, params)
+
+    def fake_session_get(session, url, params=None, **kwargs):
+        return fake_get(url, params)
+
+    with mock.patch.object(requests, "get", fake_get), \
+            mock.patch.object(requests.Session, "get", fake_session_get), \
+            mock.patch.object(time, "sleep", lambda seconds: None):
+        yield cassette
+
+
+@contextmanager
+def record(cassette: Cassette) -> Iterator[Cassette]:
+    """
+    Passes requests through to the network and stores every response in the cassette.
+    Rate-limit (429) and server-error responses are not kept, so a replay never times a transient failure.
+    """
+    real_get, real_session_get = requests.get, requests.Session.get
+
+    def keep(url, params, response):
+        if response.status_code != 429 and response.status_code < 500:
+            cassette.add(url, response.text, params=params, status=response.status_code,
+                         content_type=response.headers.get("Content-Type", "application/json"))
+        return response
+
+    def recording_get(url, params=None, **kwargs):
+        return keep(url, params, real_get(url, params=params, **kwargs))
+
+    def recording_session_get(session, url, params=None, **kwargs):
+        return keep(url, params, real_session_get(session, url, params=params, **kwargs))
+
+    with mock.patch.object(requests, "get", recording_get), \
+            mock.patch.object(requests.Session, "get", recording_session_get):
+        yield cassette
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Deterministic synthetic gene universes and the upstream responses that describe them.
+
+build_universe(n) returns N genes (BENCH00000, ...) with one CpG each, and universe.cassette()
+answers every request the annotation stages make about them, with payloads shaped like
+the real NCBI Datasets, HGNC, UniProt, Harmonizome, E-utilities, EWAS Atlas and UCSC APIs.
+A fixed share of genes takes each slower path (HGNC Ensembl fallback, ESearch fallback,
+shared UniProt accessions, failed CpG verification) so those paths are timed too.
+"""
+
+import json
+import random
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional
+from xml.sax.saxutils import escape
+
+from original_annotation.modules.function_annotation import UNIPROT_BASE
+from original_annotation.modules.harmonizome_association import HARMONIZOME_API_BASE
+from original_annotation.modules.hgnc_pull import HGNC_BASE, NCBI_BASE
+from original_annotation.modules.pubmed_association import NCBI_EUTILS_BASE
+
+from benchmarks.cassette import Cassette, RecordedResponse
+
+# Mirrors ucsc/ucsc_screen.py and ewas-atlas/ewas_atlas_pmid.py, which are scripts rather than modules
+UCSC_API_URL = "https://api.genome.ucsc.edu/getData/track"
+EWAS_ATLAS_PUBLICATION_URL = "https://ngdc.cncb.ac.cn/ewas/rest/publication"
+
+PMIDS_PER_GENE = 8
+HARMONIZOME_ROWS_PER_GENE = 12
+ATLAS_ASSOCIATIONS_PER_STUDY = 10
+
+PSYCH_TERMS = ("Schizophrenia", "Bipolar Disorder", "Major Depressive Disorder", "Autism Spectrum Disorder")
+OTHER_TERMS = ("Hypertension", "Asthma", "Type 2 Diabetes", "Breast Neoplasms", "Obesity")
+
+
+def _ensembl(i: int) -> str:
+    return f"ENSG{900000000 + i:011d}"
+
+
+def _symbol(i: int) -> str:
+    return f"BENCH{i:05d}"
+
+
+@dataclass
+class SyntheticUniverse:
+    n_genes: int
+    seed: int = 0
+    symbols: list[str] = field(default_factory=list)
+    cpg_rows: list[dict] = field(default_factory=list)
+    atlas_pmids: list[str] = field(default_factory=list)
+
+    # Per-gene behaviour switches
+    def has_ncbi_report(self, i: int) -> bool:
+        return i % 25 != 24
+
+    def has_ensembl(self, i: int) -> bool:
+        return i % 10 != 3
+
+    def uniprot_accession(self, i: int) -> str:
+        # Every tenth gene shares its neighbour's accession, exercising the lookup cache
+        return f"Q{i - (i % 10 == 9):05d}"
+
+    def linked_pmids(self, i: int) -> list[str]:
+        if i % 7 == 6:
+            return []   # no gene2pubmed links: the ESearch fallback runs
+        rng = random.Random(self.seed * 1_000_003 + i)
+        pool = max(PMIDS_PER_GENE, self.n_genes * 4)
+        return [str(30_000_000 + rng.randrange(pool)) for _ in range(PMIDS_PER_GENE)]
+
+    def searched_pmids(self, i: int) -> list[str]:
+        return [str(40_000_000 + i * 5 + k) for k in range(5)]
+
+    # Response payloads
+    def ncbi_report(self, i: int) -> dict:
+        if not self.has_ncbi_report(i):
+            return {"reports": [], "total_count": 0}
+        return {"reports": [{"gene": {
+            "gene_id": str(900_000 + i),
+            "symbol": _symbol(i),
+            "description": f"benchmark gene {i}",
+            "tax_id": "9606",
+            "type": "PROTEIN_CODING" if i % 6 else "ncRNA",
+            "nomenclature_authority": {"authority": "HGNC", "identifier": f"HGNC:{50_000 + i}"},
+            "ensembl_gene_ids": [_ensembl(i)] if self.has_ensembl(i) else [],
+            "swiss_prot_accessions": [self.uniprot_accession(i)],
+            "synonyms": [f"BG{i}", f"KIAA{i:04d}"],
+            "summary": [{"description": f"This gene encodes benchmark protein {i}, involved in "
+                                        f"synaptic signalling and chromatin remodelling.",
+                         "date": "2024-01-01T00:00:00Z"}],
+        }}], "total_count": 1}
+
+    def hgnc_record(self, i: int) -> dict:
+        return {"responseHeader": {"status": 0}, "response": {"numFound": 1, "start": 0, "docs": [{
+            "hgnc_id": f"HGNC:{50_000 + i}",
+            "symbol": _symbol(i),
+            "name": f"benchmark gene {i}",
+            "ensembl_gene_id": _ensembl(i),
+            "gene_group": [f"Benchmark family {i % 40}"],
+        }]}}
+
+    def uniprot_entry(self, accession: str) -> dict:
+        n = int(accession[1:])
+        return {
+            "entryType": "UniProtKB reviewed (Swiss-Prot)" if n % 4 else "UniProtKB unreviewed (TrEMBL)",
+            "primaryAccession": accession,
+            "proteinExistence": "1: Evidence at protein level",
+            "comments": [
+                {"commentType": "FUNCTION", "texts": [{"value": f"Regulates benchmark pathway {n % 50}."}]},
+                {"commentType": "SUBCELLULAR LOCATION", "texts": [{"value": "Nucleus."}]},
+            ],
+        }
+
+    def harmonizome_table(self, i: int) -> str:
+        lines = ["# Attribute\tDataset\tStandardized Value"]
+        datasets = ("CTD Gene-Disease Associations", "DisGeNET Gene-Disease Associations",
+                    "GTEx Tissue Gene Expression Profiles")
+        for k in range(HARMONIZOME_ROWS_PER_GENE):
+            terms = PSYCH_TERMS if (i % 3 == 0 and k % 2 == 0) else OTHER_TERMS
+            lines.append(f"{terms[k % len(terms)]}\t{datasets[k % len(datasets)]}\t{(k + 1) / 10:.2f}")
+        return "\n".join(lines) + "\n"
+
+    def elink_xml(self, i: int) -> str:
+        links = "".join(f"<Link><Id>{p}</Id></Link>" for p in self.linked_pmids(i))
+        linkset_db = f"<LinkSetDb><DbTo>pubmed</DbTo><LinkName>gene_pubmed</LinkName>{links}</LinkSetDb>" if links else ""
+        return (f'<?xml version="1.0" ?><eLinkResult><LinkSet><DbFrom>gene</DbFrom>'
+                f"<IdList><Id>{900_000 + i}</Id></IdList>{linkset_db}</LinkSet></eLinkResult>")
+
+    def esearch_xml(self, i: int) -> str:
+        ids = "".join(f"<Id>{p}</Id>" for p in self.searched_pmids(i))
+        return (f'<?xml version="1.0" ?><eSearchResult><Count>5</Count><RetMax>5</RetMax>'
+                f"<RetStart>0</RetStart><IdList>{ids}</IdList></eSearchResult>")
+
+    def efetch_xml(self, pmids: list[str]) -> str:
+        articles = []
+        for pmid in pmids:
+            n = int(pmid)
+            title = f"{PSYCH_TERMS[n % 4]} risk variants near benchmark loci" if n % 3 == 0 \
+                else f"Expression of benchmark gene products in {OTHER_TERMS[n % 5].lower()}"
+            mesh = ["Humans", "Genetic Predisposition to Disease"] if n % 2 == 0 else ["Humans"]
+            if n % 3 == 0:
+                mesh.append(PSYCH_TERMS[n % 4])
+            mesh_xml = "".join(f"<MeshHeading><DescriptorName>{escape(m)}</DescriptorName></MeshHeading>" for m in mesh)
+            articles.append(
+                f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article><Journal><JournalIssue>"
+                f"<PubDate><Year>{2000 + n % 24}</Year></PubDate></JournalIssue></Journal>"
+                f"<ArticleTitle>{escape(title)}</ArticleTitle></Article>"
+                f"<MeshHeadingList>{mesh_xml}</MeshHeadingList></MedlineCitation></PubmedArticle>")
+        return f'<?xml version="1.0" ?><PubmedArticleSet>{"".join(articles)}</PubmedArticleSet>'
+
+    def atlas_publication(self, pmid: str) -> dict:
+        n = int(pmid)
+        studies = []
+        for s in range(2):
+            assocs = [{"probeId": self.cpg_rows[(n + s * 7 + k) % len(self.cpg_rows)]["cpg"],
+                       "rank": k + 1, "pvalue": 10.0 ** -(5 + k % 4), "trait": PSYCH_TERMS[(n + k) % 4]}
+                      for k in range(ATLAS_ASSOCIATIONS_PER_STUDY)]
+            studies.append({"studyId": f"S{n}-{s}", "assocaitionList": assocs})
+        return {"code": 0, "data": {"pmid": pmid, "title": f"EWAS of benchmark cohort {n}", "studyList": studies}}
+
+    # UCSC track items, indexed by (track, chrom) for ranged lookups
+    def _track_index(self) -> dict[tuple[str, str], tuple[list[int], list[dict]]]:
+        items: dict[tuple[str, str], list[dict]] = {}
+        for i, row in enumerate(self.cpg_rows):
+            chrom, start = row["chr"], row["Start_hg38"]
+            # One probe in twenty carries another name, so its verification fails
+            name = row["cpg"] if i % 20 != 19 else f"cg9{i:07d}"
+            items.setdefault(("snpArrayIllumina850k", chrom), []).append(
+                {"chrom": chrom, "chromStart": start, "chromEnd": start + 1, "name": name})
+            if i % 3 == 0:
+                items.setdefault(("clinvarMain", chrom), []).append(
+                    {"chrom": chrom, "chromStart": start, "chromEnd": start + 1, "name": f"VCV{i:09d}",
+                     "clinSign": "Pathogenic" if i % 2 else "Benign"})
+            if i % 4 == 0:
+                items.setdefault(("gwasCatalog", chrom), []).append(
+                    {"chrom": chrom, "chromStart": start + 2_000, "chromEnd": start + 2_001, "name": f"rs{i + 1000}",
+                     "trait": PSYCH_TERMS[i % 4], "pValue": 1e-9})
+        index = {}
+        for key, track_items in items.items():
+            track_items.sort(key=lambda h: h["chromStart"])
+            index[key] = ([h["chromStart"] for h in track_items], track_items)
+        return index
+
+    def cassette(self) -> Cassette:
+        cassette = Cassette()
+        for i, symbol in enumerate(self.symbols):
+            cassette.add_json(f"{NCBI_BASE}/symbol/{symbol}/taxon/9606", self.ncbi_report(i))
+            cassette.add_json(f"{HGNC_BASE}/fetch/hgnc_id/HGNC:{50_000 + i}", self.hgnc_record(i))
+            cassette.add(f"{HARMONIZOME_API_BASE}/download/associations", self.harmonizome_table(i),
+                         params={"gene": symbol}, content_type="text/plain")
+            if self.has_ncbi_report(i):
+                cassette.add(f"{NCBI_EUTILS_BASE}/elink.fcgi", self.elink_xml(i), content_type="text/xml",
+                             params={"dbfrom": "gene", "db": "pubmed", "id": str(900_000 + i), "retmode": "xml"})
+            cassette.add(f"{NCBI_EUTILS_BASE}/esearch.fcgi", self.esearch_xml(i), content_type="text/xml",
+                         params={"db": "pubmed", "term": f'"{symbol}"[Title/Abstract] OR "{symbol}"[MeSH Terms]',
+                                 "retmode": "xml", "retmax": "500"})
+        for accession in {self.uniprot_accession(i) for i in range(self.n_genes)}:
+            cassette.add_json(f"{UNIPROT_BASE}/{accession}.json", self.uniprot_entry(accession))
+        for pmid in self.atlas_pmids:
+            cassette.add_json(EWAS_ATLAS_PUBLICATION_URL, self.atlas_publication(pmid), params={"pmid": pmid})
+
+        cassette.route(f"{NCBI_EUTILS_BASE}/efetch.fcgi",
+                       lambda query: RecordedResponse(200, self.efetch_xml(query["id"].split(",")), "text/xml"))
+        track_index = self._track_index()
+
+        def ucsc_track(query: dict) -> Optional[RecordedResponse]:
+            track, chrom = query.get("track"), query.get("chrom")
+            start, end = int(query.get("start", 0)), int(query.get("end", 0))
+            starts, items = track_index.get((track, chrom), ([], []))
+            # Items are at most 1 bp long, so everything overlapping starts in [start, end)
+            hits = items[bisect_left(starts, start):bisect_left(starts, end)]
+            limit = int(query.get("maxItemsOutput", 0)) or None
+            truncated = limit is not None and len(hits) > limit
+            payload = {"genome": "hg38", "chrom": chrom, "start": start, "end": end, track: hits[:limit]}
+            if truncated:
+                payload["maxItemsLimit"] = True
+            return RecordedResponse(200, json.dumps(payload))
+
+        cassette.route(UCSC_API_URL, ucsc_track)
+        return cassette
+
+
+def build_universe(n_genes: int, seed: int = 0) -> SyntheticUniverse:
+    universe = SyntheticUniverse(n_genes, seed)
+    universe.symbols = [_symbol(i) for i in range(n_genes)]
+    rng = random.Random(seed)
+    position = {}
+    for i in range(n_genes):
+        chrom = f"chr{1 + i % 22}"
+        # CpGs cluster: mostly 200 bp - 8 kb apart, with an occasional long gap between clusters
+        gap = rng.randrange(200, 8_000) if rng.random() > 0.1 else rng.randrange(50_000, 500_000)
+        position[chrom] = position.get(chrom, 1_000_000) + gap
+        universe.cpg_rows.append({"cpg": f"cg{i:08d}", "gene": universe.symbols[i], "chr": chrom,
+                                  "Start_hg38": position[chrom], "End_hg38": position[chrom] + 1})
+    universe.atlas_pmids = [str(20_000_000 + k) for k in range(max(1, n_genes // 2))]
+    return universe
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""
+Offline benchmarks for the annotation stages that call upstream APIs.
+
+Every stage runs against a synthetic gene universe (see fixtures.py) whose NCBI, HGNC,
+UniProt, Harmonizome, E-utilities, EWAS Atlas and UCSC responses are replayed from a
+cassette, with retry/rate-limit sleeps disabled. Timings therefore measure our own
+request handling, parsing and merging; --latency-ms adds a fixed delay per request
+so concurrency and caching changes can be compared as well.
+
+    python benchmarks/run_benchmarks.py                      # 100, 1k and 10k genes
+    python benchmarks/run_benchmarks.py --sizes 1000 --stages pubmed ucsc_batched
+    python benchmarks/run_benchmarks.py --compare baseline.json --output after.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+# Add root to path, plus the script directories whose modules import their siblings
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "ucsc"))
+sys.path.append(str(ROOT / "ewas-atlas"))
+
+import ewas_atlas_pmid
+import ucsc_screen
+
+from original_annotation.modules.function_annotation import run_function_annotation
+from original_annotation.modules.harmonizome_association import attach_harmonizome
+from original_annotation.modules.hgnc_pull import run_hgnc_pull
+from original_annotation.modules.pubmed_association import annotate_df_with_psych_literature
+
+from benchmarks.cassette import Cassette, replay
+from benchmarks.fixtures import SyntheticUniverse, build_universe
+
+DEFAULT_SIZES = (100, 1_000, 10_000)
+DEFAULT_REPEAT = 3
+DEFAULT_OUTPUT = "benchmark_results.json"
+BENCH_EMAIL = "benchmarks@example.org"
+
+
+@contextlib.contextmanager
+def _quiet():
+    # Stage progress goes to stdout; keep it out of the timings and the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@dataclass
+class Context:
+    """What a stage's setup can draw on for one universe size."""
+    universe: SyntheticUniverse
+    cassette: Cassette
+    work_dir: Path
+    _gene_db: object = None
+
+    @property
+    def gene_db(self):
+        """run_hgnc_pull output for the universe, built once (untimed) for the downstream stages."""
+        if self._gene_db is None:
+            with replay(self.cassette), _quiet():
+                self._gene_db = run_hgnc_pull(list(self.universe.symbols))
+        return self._gene_db
+
+    def fresh_dir(self) -> Path:
+        return Path(tempfile.mkdtemp(dir=self.work_dir))
+
+
+@dataclass
+class Benchmark:
+    """setup(ctx) builds the arguments outside the timer; run(*args) is timed."""
+    setup: Callable[[Context], tuple]
+    run: Callable
+    description: str
+
+
+def _fetch_and_index_atlas(pmids: list[str], cache_dir: Path) -> int:
+    publications = ewas_atlas_pmid.fetch_publications(pmids, cache_dir=str(cache_dir))
+    return sum(ewas_atlas_pmid.index_publication(pub)[0] for pub in publications.values())
+
+
+def _warm_atlas_cache(ctx: Context) -> tuple:
+    cache_dir = ctx.fresh_dir()
+    with replay(ctx.cassette), _quiet():
+        _fetch_and_index_atlas(ctx.universe.atlas_pmids, cache_dir)
+    return ctx.universe.atlas_pmids, cache_dir
+
+
+def _screen_per_cpg(rows: list[dict]) -> list:
+    # Mirrors ucsc_screen.main() --per-cpg
+    with ThreadPoolExecutor(max_workers=ucsc_screen.MAX_WORKERS) as executor:
+        return list(executor.map(partial(ucsc_screen.screen_cpg, fetch=None, verify=True), rows))
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "ncbi_hgnc": Benchmark(
+        lambda ctx: (list(ctx.universe.symbols),), run_hgnc_pull,
+        "run_hgnc_pull: NCBI Datasets per gene, HGNC Ensembl fallback"),
+    "function_annotation": Benchmark(
+        lambda ctx: (ctx.gene_db.copy(),), run_function_annotation,
+        "run_function_annotation: UniProt + HGNC with per-run caches"),
+    "harmonizome": Benchmark(
+        lambda ctx: (ctx.gene_db,), attach_harmonizome,
+        "attach_harmonizome: association download per gene"),
+    "pubmed": Benchmark(
+        lambda ctx: (ctx.gene_db,),
+        partial(annotate_df_with_psych_literature, email=BENCH_EMAIL, pause=0.0),
+        "annotate_df_with_psych_literature: ELink/ESearch + EFetch"),
+    "ewas_atlas_cold": Benchmark(
+        lambda ctx: (ctx.universe.atlas_pmids, ctx.fresh_dir()), _fetch_and_index_atlas,
+        "ewas_atlas_pmid.fetch_publications + index_publication, empty PMID cache"),
+    "ewas_atlas_cached": Benchmark(
+        _warm_atlas_cache, _fetch_and_index_atlas,
+        "ewas_atlas_pmid.fetch_publications + index_publication, every PMID cached"),
+    "ucsc_batched": Benchmark(
+        lambda ctx: (ctx.universe.cpg_rows,), ucsc_screen.screen_batched,
+        "ucsc_screen.screen_batched: region-merged track queries"),
+    "ucsc_per_cpg": Benchmark(
+        lambda ctx: (ctx.universe.cpg_rows,), _screen_per_cpg,
+        "ucsc_screen.screen_cpg per CpG on the worker pool"),
+}
+
+
+def run_benchmark(name: str, ctx: Context, repeat: int, latency_s: float = 0.0) -> dict:
+    """Times one stage `repeat` times; request counts and misses come from the last run."""
+    benchmark = BENCHMARKS[name]
+    timings = []
+    misses = 0
+    for _ in range(repeat):
+        args = benchmark.setup(ctx)
+        ctx.cassette.reset_counts()
+        with replay(ctx.cassette, latency_s), _quiet():
+            t0 = time.perf_counter()
+            benchmark.run(*args)
+            timings.append(time.perf_counter() - t0)
+        misses += len(ctx.cassette.misses)
+    median = statistics.median(timings)
+    return {
+        "stage": name,
+        "n_genes": ctx.universe.n_genes,
+        "repeat": repeat,
+        "min_s": round(min(timings), 4),
+        "median_s": round(median, 4),
+        "max_s": round(max(timings), 4),
+        "genes_per_s": round(ctx.universe.n_genes / median, 1) if median else None,
+        "requests": dict(sorted(ctx.cassette.served.items())),
+        "cassette_misses": misses,
+        "example_misses": ctx.cassette.misses[:3],
+    }
+
+
+def run_suite(sizes, stages, repeat: int = DEFAULT_REPEAT, latency_s: float = 0.0, seed: int = 0,
+              progress: Callable[[dict], None] = None) -> list[dict]:
+    results = []
+    for n_genes in sizes:
+        universe = build_universe(n_genes, seed=seed)
+        work_dir = Path(tempfile.mkdtemp(prefix="annotation-bench-"))
+        try:
+            ctx = Context(universe, universe.cassette(), work_dir)
+            for name in stages:
+                result = run_benchmark(name, ctx, repeat, latency_s)
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _print_result(result: dict, baseline: Optional[dict] = None) -> None:
+    requests = sum(result["requests"].values())
+    line = (f"[BENCH] {result['stage']:<20} {result['n_genes']:>7} {result['median_s']:>10.3f} "
+            f"{result['min_s']:>10.3f} {result['genes_per_s'] or 0:>10.1f} {requests:>9}")
+    previous = (baseline or {}).get((result["stage"], result["n_genes"]))
+    if previous:
+        line += f" {previous['median_s'] / result['median_s']:>8.2f}x"
+    if result["cassette_misses"]:
+        line += f"  {result['cassette_misses']} cassette misses, e.g. {result['example_misses'][0]}"
+    print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the annotation stages offline against replayed API responses.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help=f"Synthetic gene counts (default: {' '.join(map(str, DEFAULT_SIZES))}).")
+    parser.add_argument("--stages", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Stages to time (default: all).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per stage and size.")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Simulated upstream latency added to every replayed request.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic universe.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON results file.")
+    parser.add_argument("--compare", metavar="RESULTS_JSON",
+                        help="Earlier results file; prints the speedup of each stage against it.")
+    parser.add_argument("--list", action="store_true", help="List the stages and exit.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, benchmark in BENCHMARKS.items():
+            print(f"{name:<20} {benchmark.description}")
+        return 0
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        baseline = {(r["stage"], r["n_genes"]): r for r in previous["results"]}
+        if previous.get("latency_ms") != args.latency_ms:
+            print(f"[BENCH] Warning: {args.compare} was run with --latency-ms {previous.get('latency_ms')}, "
+                  f"this run uses {args.latency_ms}; speedups are not comparable.")
+
+    print(f"[BENCH] {'stage':<20} {'genes':>7} {'median s':>10} {'min s':>10} {'genes/s':>10} {'requests':>9}"
+          + (f" {'speedup':>9}" if baseline else ""))
+    results = run_suite(args.sizes, args.stages, repeat=args.repeat, latency_s=args.latency_ms / 1000,
+                        seed=args.seed, progress=lambda r: _print_result(r, baseline))
+
+    Path(args.output).write_text(json.dumps({
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency_ms": args.latency_ms,
+        "seed": args.seed,
+        "results": results,
+    }, indent=2))
+    print(f"[BENCH] Results written to: {args.output}")
+
+    if any(r["cassette_misses"] for r in results):
+        print("[BENCH] Some requests had no recorded response; the fixtures no longer match the stages.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,25 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from original_annotation.modules.excel_export import write_excel
+from original_annotation.modules.living_store import LIVING_FILE_PATH, read_living_file
+
 def main():
     # File paths
     gea_path = 'data/disgenet_gea.csv'
-    genes_path = 'annotated_genes.xlsx'
+    genes_path = LIVING_FILE_PATH
     output_path = 'annotated_genes_output.xlsx'
 
     print("Loading data...")
     try:
         df_gea = pd.read_csv(gea_path)
-        df_genes = pd.read_excel(genes_path)
+        df_genes = read_living_file(genes_path)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
@@ -50,7 +59,7 @@ def main():
     # Iterate through each gene in annotated_genes.xlsx
     # Assuming 'symbol' is the column name for gene symbol based on previous inspection
     if 'symbol' not in df_genes.columns:
-        print("Error: 'symbol' column not found in annotated_genes.xlsx")
+        print(f"Error: 'symbol' column not found in {genes_path}")
         return
 
     for index, row in df_genes.iterrows():
@@ -193,21 +202,9 @@ def main():
 
     # Save with formatting
     print(f"Saving to {output_path}...")
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df_genes.to_excel(writer, index=False, sheet_name='Sheet1')
-        worksheet = writer.sheets['Sheet1']
-        
-        from openpyxl.styles import Alignment
-        wrap_style = Alignment(wrapText=True, vertical='top')
-        
-        # Find column indices
-        cols_to_wrap = ['disgenet_psych_diseases', 'disgenet_evidence']
-        for col_name in cols_to_wrap:
-            if col_name in df_genes.columns:
-                col_idx = df_genes.columns.get_loc(col_name) + 1 # 1-based
-                for row in range(2, len(df_genes) + 2): # Start from row 2 (skip header)
-                    cell = worksheet.cell(row=row, column=col_idx)
-                    cell.alignment = wrap_style
+    # Wrapping is a column-level format, so no per-cell styling pass is needed
+    cols_to_wrap = ['disgenet_psych_diseases', 'disgenet_evidence']
+    write_excel(df_genes, output_path, sheet_name='Sheet1', wrap_columns=cols_to_wrap)
 
     print("Done.")
 
@@ -3,6 +3,14 @@ import requests
 import time
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Publication payloads are cached one file per PMID so reruns only hit the API
+# for PMIDs that have never been fetched successfully.
+CACHE_DIR = "pmid_cache"
+MAX_WORKERS = 4
+REQUEST_DELAY = 0.5  # Respectful delay per worker between requests
+
 
 def get_publication_data(pmid):
     """
@@ -19,6 +27,101 @@ def get_publication_data(pmid):
         print(f"Error querying API for PMID {pmid}: {e}")
         return None
 
+
+def _cache_path(cache_dir, pmid):
+    return os.path.join(cache_dir, f"{pmid}.json")
+
+
+def load_cached_publication(pmid, cache_dir=CACHE_DIR):
+    """
+    Returns the cached publication payload for a PMID, or None if it has not been fetched yet.
+    """
+    path = _cache_path(cache_dir, pmid)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable cache entry for PMID {pmid}: {e}")
+        return None
+
+
+def _fetch_and_cache(pmid, cache_dir):
+    data = get_publication_data(pmid)
+    time.sleep(REQUEST_DELAY)
+    if not data or data.get("code") != 0:
+        return pmid, None
+
+    pub_data = data.get("data")
+    if pub_data is None:
+        # code 0 with "data": null means the PMID is unknown (for now); leave it uncached so a rerun retries it
+        return pmid, None
+    # Write to a temp file first so an interrupted run never leaves a truncated entry
+    path = _cache_path(cache_dir, pmid)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pub_data, f)
+    os.replace(tmp_path, path)
+    return pmid, pub_data
+
+
+def fetch_publications(pmids, cache_dir=CACHE_DIR, max_workers=MAX_WORKERS):
+    """
+    Returns {pmid: publication data} for every PMID the API resolved.
+    Cached PMIDs are served from disk; the rest are fetched with at most
+    `max_workers` requests in flight.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    publications = {}
+    to_fetch = []
+    for pmid in pmids:
+        cached = load_cached_publication(pmid, cache_dir)
+        if cached is not None:
+            publications[pmid] = cached
+        else:
+            to_fetch.append(pmid)
+
+    print(f"{len(publications)} PMIDs served from cache, {len(to_fetch)} to fetch.")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_fetch_and_cache, pmid, cache_dir) for pmid in to_fetch]
+        for future in as_completed(futures):
+            pmid, pub_data = future.result()
+            if pub_data is not None:
+                print(f"Fetched data for PMID {pmid}.")
+                publications[pmid] = pub_data
+            else:
+                print(f"No data found for PMID {pmid}")
+
+    return publications
+
+
+def index_publication(pub_data):
+    """
+    Preindexes a publication's association lists.
+
+    Returns (total_associations, pvalue_index), where pvalue_index maps
+    (probeId, rank) to the first non-null p-value reported for that probe and
+    rank, and (probeId, None) to the first one for that probe regardless of rank.
+    """
+    total = 0
+    pvalue_index = {}
+    for study in pub_data.get("studyList", []):
+        # Handle potential typo in API field name 'assocaitionList'
+        assoc_list = study.get("assocaitionList") or study.get("associationList") or []
+        total += len(assoc_list)
+        for assoc in assoc_list:
+            probe = assoc.get("probeId")
+            pvalue = assoc.get("pvalue")
+            if pvalue is None:
+                continue
+            pvalue_index.setdefault((probe, str(assoc.get("rank"))), pvalue)
+            pvalue_index.setdefault((probe, None), pvalue)
+    return total, pvalue_index
+
+
 def main():
     input_file = "ewas_atlas.csv"
     
@@ -58,15 +161,8 @@ def main():
     
     print(f"Found {len(unique_pmids)} unique PMIDs to query.")
     
-    pmid_cache = {}
-    for pmid in unique_pmids:
-        print(f"Fetching data for PMID {pmid}...")
-        data = get_publication_data(pmid)
-        if data and data.get("code") == 0:
-            pmid_cache[pmid] = data.get("data")
-        else:
-            print(f"No data found for PMID {pmid}")
-        time.sleep(0.5)  # Respectful delay
+    publications = fetch_publications(unique_pmids)
+    pub_index = {pmid: index_publication(pub_data) for pmid, pub_data in publications.items()}
 
     # Process rows
     for row in rows:
@@ -77,37 +173,13 @@ def main():
         row["p"] = ""
         row["total_associations"] = ""
         
-        if pmid and pmid in pmid_cache:
-            pub_data = pmid_cache[pmid]
-            study_list = pub_data.get("studyList", [])
-            
-            # 1. Total associations
-            total = 0
-            for study in study_list:
-                # Handle potential typo in API field name 'assocaitionList'
-                assoc_list = study.get("assocaitionList") or study.get("associationList") or []
-                total += len(assoc_list)
+        if pmid and pmid in pub_index:
+            total, pvalue_index = pub_index[pmid]
             row["total_associations"] = total
-            
-            # 2. Find p-value
-            found_p = None
-            for study in study_list:
-                assoc_list = study.get("assocaitionList") or study.get("associationList") or []
-                for assoc in assoc_list:
-                    # Match by CpG ID
-                    if assoc.get("probeId") == cpg:
-                        # If rank is provided in CSV, try to match it as well
-                        if rank and rank.strip():
-                            if str(assoc.get("rank")) == str(rank):
-                                found_p = assoc.get("pvalue")
-                                break
-                        else:
-                            # If no rank, take the first match
-                            found_p = assoc.get("pvalue")
-                            break
-                if found_p is not None:
-                    break
-            
+
+            # If rank is provided in CSV, match it as well; otherwise take the first match
+            rank_key = rank if rank and rank.strip() else None
+            found_p = pvalue_index.get((cpg, rank_key))
             row["p"] = found_p if found_p is not None else ""
 
     # Write updated data back to CSV
@@ -1,55 +1,382 @@
+import argparse
 import csv
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
-# File paths
-cpg_file_path = 'cpgs.txt'
-results_file_path = 'ewas-catalog/ewascatalog-results.txt'
-studies_file_path = 'ewas-catalog/ewascatalog-studies.txt'
-output_file_path = 'ewas-catalog/combined_ewas_results.csv'
-
-print("Starting combined extraction...")
-
-# 1. Read the list of target CpGs
-with open(cpg_file_path, 'r') as f:
-    target_cpgs = set(line.strip() for line in f if line.strip())
-print(f"Loaded {len(target_cpgs)} target CpGs.")
-
-# 2. Load studies into a dictionary for quick lookup
-studies_data = {}
-with open(studies_file_path, 'r', encoding='utf-8') as f:
-    reader = csv.DictReader(f, delimiter='\t')
-    for row in reader:
-        # Map StudyID to the whole row
-        studies_data[row['StudyID']] = row
-print(f"Loaded {len(studies_data)} studies.")
-
-# 3. Process results and merge with study details
-with open(results_file_path, 'r', encoding='utf-8') as f_in, \
-     open(output_file_path, 'w', newline='', encoding='utf-8') as f_out:
-    
-    reader = csv.DictReader(f_in, delimiter='\t')
-    
-    # Define combined fieldnames
-    # Take study fieldnames from the first study found
-    sample_study = next(iter(studies_data.values()))
-    study_fieldnames = [f for f in sample_study.keys() if f != 'StudyID']
-    fieldnames = reader.fieldnames + study_fieldnames
-    
-    writer = csv.DictWriter(f_out, fieldnames=fieldnames)
-    writer.writeheader()
-
-    match_count = 0
-    for row in reader:
-        if row['CpG'] in target_cpgs:
-            # Get study details for this row's StudyID
-            study_info = studies_data.get(row['StudyID'], {})
-            
-            # Combine the result row with its study info (excluding duplicate StudyID)
-            combined_row = {**row}
-            for k, v in study_info.items():
-                if k != 'StudyID':
-                    combined_row[k] = v
-            
-            writer.writerow(combined_row)
-            match_count += 1
-
-print(f"Finished! Saved {match_count} combined records to '{output_file_path}'.")
\ No newline at end of file
+# Default file paths
+CPG_FILE_PATH = 'cpgs.txt'
+RESULTS_FILE_PATH = 'ewas-catalog/ewascatalog-results.txt'
+STUDIES_FILE_PATH = 'ewas-catalog/ewascatalog-studies.txt'
+OUTPUT_FILE_PATH = 'ewas-catalog/combined_ewas_results.csv'
+
+INDEX_SUFFIX = '.cpgidx.sqlite'
+INDEX_BATCH_SIZE = 100_000
+SQLITE_MAX_VARIABLES = 900
+
+
+def open_text(path, mode='r'):
+    """
+    Opens a plain or gzip-compressed (.gz) text file.
+    """
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def load_cpg_list(path):
+    """
+    Reads one CpG ID per line into a set.
+    """
+    with open(path, 'r') as f:
+        return set(line.strip() for line in f if line.strip())
+
+
+def load_studies(path=STUDIES_FILE_PATH):
+    """
+    Loads the studies table as (study_fieldnames, {StudyID: tuple of study values}).
+    The StudyID column itself is left out of the value tuples.
+    """
+    with open_text(path) as f:
+        reader = csv.reader(f, delimiter='\t')
+        header = next(reader)
+        study_idx = header.index('StudyID')
+        keep = [i for i in range(len(header)) if i != study_idx]
+        studies = {}
+        for row in reader:
+            if not row:
+                continue
+            # Pad short rows so the output always lines up with the header
+            row += [''] * (len(header) - len(row))
+            studies[row[study_idx]] = tuple(row[i] for i in keep)
+    return [header[i] for i in keep], studies
+
+
+def _read_results_header(path):
+    with open_text(path) as f:
+        return next(csv.reader(f, delimiter='\t'))
+
+
+def _match_lines(lines, header, studies, n_study_fields, cpg_targets, writers):
+    """
+    Streams result lines, appending study details to rows whose CpG is in any target set.
+    Returns the number of rows written to each writer.
+    """
+    cpg_idx = header.index('CpG')
+    study_idx = header.index('StudyID')
+    empty_study = ('',) * n_study_fields
+    counts = [0] * len(writers)
+
+    for line in lines:
+        # Cheap split on the raw line first; only matching rows go through the csv parser
+        fields = line.split('\t', cpg_idx + 1)
+        if len(fields) <= cpg_idx:
+            continue
+        target_ids = cpg_targets.get(fields[cpg_idx].strip('"'))
+        if target_ids is None:
+            continue
+
+        row = next(csv.reader([line.rstrip('\r\n')], delimiter='\t'))
+        # Pad short rows and drop surplus fields so study details stay under their own columns
+        row = (row + [''] * (len(header) - len(row)))[:len(header)]
+        combined = row + list(studies.get(row[study_idx], empty_study))
+        for i in target_ids:
+            writers[i].writerow(combined)
+            counts[i] += 1
+    return counts
+
+
+def _index_targets(cpg_sets):
+    """
+    Inverts a list of CpG sets into {cpg: [indices of sets containing it]}.
+    """
+    cpg_targets = {}
+    for i, cpgs in enumerate(cpg_sets):
+        for cpg in cpgs:
+            cpg_targets.setdefault(cpg, []).append(i)
+    return cpg_targets
+
+
+def split_byte_ranges(path, n_chunks):
+    """
+    Splits an uncompressed results file (minus its header) into up to n_chunks
+    byte ranges whose boundaries fall on line starts.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        data_start = f.tell()
+        step = max(1, (size - data_start) // max(1, n_chunks))
+
+        bounds = [data_start]
+        for i in range(1, n_chunks):
+            f.seek(data_start + i * step)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _iter_byte_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+
+def _scan_byte_range(task):
+    """
+    Worker: scans one byte range and writes matches to one temp file per target.
+    """
+    path, start, end, header, studies, n_study_fields, cpg_targets, n_targets, tmp_dir = task
+    part_paths = []
+    handles = []
+    for i in range(n_targets):
+        fd, part_path = tempfile.mkstemp(prefix=f'part{start}_t{i}_', suffix='.csv', dir=tmp_dir)
+        handles.append(os.fdopen(fd, 'w', newline='', encoding='utf-8'))
+        part_paths.append(part_path)
+    try:
+        writers = [csv.writer(h) for h in handles]
+        counts = _match_lines(_iter_byte_range(path, start, end), header, studies,
+                              n_study_fields, cpg_targets, writers)
+    finally:
+        for h in handles:
+            h.close()
+    return part_paths, counts
+
+
+def default_index_path(results_path):
+    return f"{results_path}{INDEX_SUFFIX}"
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return str(stat.st_size), str(stat.st_mtime_ns)
+
+
+def build_cpg_index(results_path=RESULTS_FILE_PATH, index_path=None):
+    """
+    One-time pass over an uncompressed results file recording the byte offset and
+    length of every row, keyed by CpG, in an SQLite index next to the file.
+
+    Returns the index path.
+    """
+    if str(results_path).endswith('.gz'):
+        raise ValueError("Byte-offset indexes need an uncompressed results file.")
+    index_path = index_path or default_index_path(results_path)
+
+    header = _read_results_header(results_path)
+    cpg_idx = header.index('CpG')
+
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE offsets (cpg TEXT, offset INTEGER, length INTEGER)")
+
+        n_rows = 0
+        batch = []
+        with open(results_path, 'rb') as f:
+            offset = len(f.readline())
+            for line in f:
+                fields = line.split(b'\t', cpg_idx + 1)
+                if len(fields) > cpg_idx:
+                    cpg = fields[cpg_idx].strip(b'"').decode('utf-8')
+                    batch.append((cpg, offset, len(line)))
+                offset += len(line)
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    conn.executemany("INSERT INTO offsets VALUES (?, ?, ?)", batch)
+                    n_rows += len(batch)
+                    batch = []
+        conn.executemany("INSERT INTO offsets VALUES (?, ?, ?)", batch)
+        n_rows += len(batch)
+
+        # Building the B-tree after the bulk insert is much faster than maintaining it row by row
+        conn.execute("CREATE INDEX idx_offsets_cpg ON offsets (cpg)")
+        size, mtime = _source_signature(results_path)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [('source_size', size), ('source_mtime_ns', mtime)])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+
+    print(f"Indexed {n_rows} result rows into '{index_path}'.")
+    return index_path
+
+
+def index_is_current(results_path, index_path=None):
+    """
+    True if an index exists for the results file and was built from its current size and mtime.
+    """
+    index_path = index_path or default_index_path(results_path)
+    if str(results_path).endswith('.gz') or not os.path.exists(index_path):
+        return False
+    try:
+        conn = sqlite3.connect(index_path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    size, mtime = _source_signature(results_path)
+    return meta.get('source_size') == size and meta.get('source_mtime_ns') == mtime
+
+
+def _lookup_offsets(index_path, cpgs):
+    """
+    Returns sorted (offset, length) pairs for every result row of the given CpGs.
+    """
+    cpgs = list(cpgs)
+    spans = []
+    conn = sqlite3.connect(index_path)
+    try:
+        for i in range(0, len(cpgs), SQLITE_MAX_VARIABLES):
+            chunk = cpgs[i:i + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            spans.extend(conn.execute(
+                f"SELECT offset, length FROM offsets WHERE cpg IN ({placeholders})", chunk))
+    finally:
+        conn.close()
+    # File order keeps the output identical to a full scan and makes the reads sequential
+    spans.sort()
+    return spans
+
+
+def _iter_indexed_lines(path, spans):
+    with open(path, 'rb') as f:
+        for offset, length in spans:
+            f.seek(offset)
+            yield f.read(length).decode('utf-8')
+
+
+def extract_ewas_results(targets, results_path=RESULTS_FILE_PATH,
+                         studies_path=STUDIES_FILE_PATH, workers=1,
+                         index_path=None, use_index=True):
+    """
+    Extracts EWAS Catalog results for several CpG sets in a single pass over the results file.
+
+    Args:
+        targets: Mapping of output CSV path -> set of CpG IDs to extract into it.
+        results_path: ewascatalog-results.txt, optionally gzip-compressed (.gz).
+        studies_path: ewascatalog-studies.txt, optionally gzip-compressed (.gz).
+        workers: Number of processes scanning byte ranges of the results file.
+            Compressed input cannot be split and is always scanned by one process.
+        index_path: CpG offset index built by build_cpg_index (default: next to the results file).
+        use_index: Read only the indexed rows when a current index exists instead of scanning.
+
+    Returns:
+        Mapping of output path -> number of combined records written.
+    """
+    output_paths = list(targets)
+    cpg_targets = _index_targets([targets[p] for p in output_paths])
+
+    study_fieldnames, studies = load_studies(studies_path)
+    print(f"Loaded {len(studies)} studies.")
+
+    header = _read_results_header(results_path)
+    fieldnames = header + study_fieldnames
+    n_study_fields = len(study_fieldnames)
+
+    indexed = use_index and index_is_current(results_path, index_path)
+    if workers > 1 and str(results_path).endswith('.gz'):
+        print("Compressed results cannot be split into byte ranges; scanning with a single process.")
+        workers = 1
+
+    handles = [open(p, 'w', newline='', encoding='utf-8') for p in output_paths]
+    try:
+        writers = [csv.writer(h) for h in handles]
+        for w in writers:
+            w.writerow(fieldnames)
+
+        if indexed:
+            spans = _lookup_offsets(index_path or default_index_path(results_path), cpg_targets)
+            print(f"Reading {len(spans)} indexed result rows...")
+            counts = _match_lines(_iter_indexed_lines(results_path, spans), header, studies,
+                                  n_study_fields, cpg_targets, writers)
+        elif workers <= 1:
+            with open_text(results_path) as f:
+                next(f)
+                counts = _match_lines(f, header, studies, n_study_fields, cpg_targets, writers)
+        else:
+            ranges = split_byte_ranges(results_path, workers)
+            print(f"Scanning {len(ranges)} byte ranges with {workers} processes...")
+            counts = [0] * len(output_paths)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                tasks = [(results_path, start, end, header, studies, n_study_fields,
+                          cpg_targets, len(output_paths), tmp_dir)
+                         for start, end in ranges]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # map() yields in submission order, so parts are appended in file order
+                    for part_paths, part_counts in executor.map(_scan_byte_range, tasks):
+                        for i, part_path in enumerate(part_paths):
+                            handles[i].flush()
+                            with open(part_path, 'r', newline='', encoding='utf-8') as part:
+                                shutil.copyfileobj(part, handles[i])
+                            os.remove(part_path)
+                            counts[i] += part_counts[i]
+    finally:
+        for h in handles:
+            h.close()
+
+    return dict(zip(output_paths, counts))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract EWAS Catalog results for one or more CpG lists, joined with study details."
+    )
+    parser.add_argument(
+        "--target",
+        nargs=2,
+        action="append",
+        metavar=("CPG_FILE", "OUTPUT_CSV"),
+        help=f"CpG list and its output CSV; repeat for several lists "
+             f"(default: {CPG_FILE_PATH} -> {OUTPUT_FILE_PATH}).",
+    )
+    parser.add_argument("--results", default=RESULTS_FILE_PATH,
+                        help=f"EWAS Catalog results file, plain or .gz (default: {RESULTS_FILE_PATH}).")
+    parser.add_argument("--studies", default=STUDIES_FILE_PATH,
+                        help=f"EWAS Catalog studies file (default: {STUDIES_FILE_PATH}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to scan byte ranges of an uncompressed results file (default: 1).")
+    parser.add_argument("--build-index", action="store_true",
+                        help="(Re)build the CpG byte-offset index for the results file before extracting.")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Ignore any CpG index and scan the whole results file.")
+    args = parser.parse_args()
+
+    if args.build_index:
+        build_cpg_index(args.results)
+
+    print("Starting combined extraction...")
+
+    target_pairs = args.target or [(CPG_FILE_PATH, OUTPUT_FILE_PATH)]
+    targets = {}
+    for cpg_path, output_path in target_pairs:
+        cpgs = load_cpg_list(cpg_path)
+        print(f"Loaded {len(cpgs)} target CpGs from {cpg_path}.")
+        targets[output_path] = cpgs
+
+    counts = extract_ewas_results(targets, args.results, args.studies, workers=args.workers,
+                                  use_index=not args.no_index)
+
+    for output_path, count in counts.items():
+        print(f"Finished! Saved {count} combined records to '{output_path}'.")
+
+
+if __name__ == "__main__":
+    main()
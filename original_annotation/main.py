@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 """Run the gene annotation pipeline and produce spreadsheet-friendly outputs."""
 
+import argparse
 import json
 import sys
-from importlib import util as importlib_util
 from pathlib import Path
 from typing import Optional
 import re
@@ -17,7 +17,19 @@ from modules.gwas_association import attach_psychiatric_gwas
 from modules.pubmed_association import annotate_df_with_psych_literature
 from modules.harmonizome_association import attach_harmonizome
 from modules.cpg_integration import load_pi_cpg_mappings, attach_ewas_atlas_traits
-from modules.disgenet_utils import annotate_with_disgenet
+from modules.gene_proximity import DEFAULT_GENE_ANNOTATION_PATH, load_proximity_cpg_mappings
+from modules.disgenet_utils import annotate_with_disgenet, load_disgenet
+from modules.living_store import LIVING_FILE_PATH, write_living_file
+from modules.associations import ASSOCIATIONS_PATH, empty_associations, combine_associations, save_associations
+from modules.excel_export import available_excel_engine, multiline_columns, write_excel
+from modules.schema import ATLAS_DTYPES, GENE_TABLE_DTYPES, apply_schema, read_csv_with_schema
+from modules.run_profile import RunProfiler
+from modules.http_metrics import METRICS as HTTP_METRICS
+
+# Per-stage timing/memory report, written next to annotated_genes_raw.csv
+RUN_REPORT_PATH = "annotated_genes_run_report.json"
+# Per-service HTTP request counts, latencies, retries and cache hits
+HTTP_METRICS_PATH = "annotated_genes_http_metrics.json"
 
 
 def load_ncbi_config(config_path: str = "config.json") -> tuple[Optional[str], Optional[str]]:
@@ -110,8 +122,8 @@ def prompt_path_with_completion(prompt: str) -> str:
         readline.set_completer_delims(old_delims)
 
 
-def export_readable_excel(gene_db: pd.DataFrame, output_path: str = "annotated_genes.xlsx") -> None:
-    """Write a readable Excel version of the annotations with flattened lists and pruned columns."""
+def build_readable_df(gene_db: pd.DataFrame) -> pd.DataFrame:
+    """Flatten lists and prune columns for the readable deliverable (living file and Excel export)."""
     df = gene_db.copy()
 
     if "synonyms" in df.columns:
@@ -188,25 +200,32 @@ def export_readable_excel(gene_db: pd.DataFrame, output_path: str = "annotated_g
         col_order.insert(insert_at, "name")
         df = df[col_order]
 
-    # Pick an available Excel engine (cross-platform).
-    engine = None
-    if importlib_util.find_spec("openpyxl"):
-        engine = "openpyxl"
-    elif importlib_util.find_spec("xlsxwriter"):
-        engine = "xlsxwriter"
+    return df
+
+
+def write_excel_export(df: pd.DataFrame, output_path: str) -> None:
+    """Write an already-formatted table to an .xlsx export."""
+    # Pick an available Excel engine (cross-platform); XlsxWriter streams rows in constant memory.
+    engine = available_excel_engine()
 
     if engine is None:
-        print("[MAIN] Skipping Excel export: no Excel writer engine found. Install `openpyxl` (recommended) or `XlsxWriter`, then rerun to produce the .xlsx file.")
+        print("[MAIN] Skipping Excel export: no Excel writer engine found. Install `XlsxWriter` (recommended) or `openpyxl`, then rerun to produce the .xlsx file.")
         return
 
     try:
-        df.to_excel(output_path, index=False, engine=engine)
+        # Multi-line list cells are shown wrapped via a column-level format
+        write_excel(df, output_path, wrap_columns=multiline_columns(df), engine=engine)
         print(f"[MAIN] Readable Excel written to: {output_path} (engine: {engine})")
     except ModuleNotFoundError:
         # Rare race: engine discovered but import failed; tell user to install.
         print(f"[MAIN] Skipping Excel export: the {engine} package is not available at runtime. Install it and rerun to produce the .xlsx file.")
 
 
+def export_readable_excel(gene_db: pd.DataFrame, output_path: str = "annotated_genes.xlsx") -> None:
+    """Write a readable Excel version of the annotations with flattened lists and pruned columns."""
+    write_excel_export(build_readable_df(gene_db), output_path)
+
+
 def build_output_df(gene_db: pd.DataFrame) -> pd.DataFrame:
     """Apply final column renames/order for deliverables and drop noisy intermediate fields."""
     df = gene_db.copy()
@@ -264,54 +283,42 @@ def build_output_df(gene_db: pd.DataFrame) -> pd.DataFrame:
 
 
 
-def main() -> None:
-    """Run the annotation pipeline end to end."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        datefmt="%H:%M:%S",
-    )
-    
-    # Get gene list file path from command line or prompt user
-    # Default to the PI's CpG mapping file
-    default_input = "ewas_res_groupsig_128.xlsx"
-    if len(sys.argv) > 1:
-        input_path = sys.argv[1]
-    else:
-        input_path = prompt_path_with_completion(f"Enter path to input file (default: {default_input}): ").strip()
-        if not input_path:
-            input_path = default_input
-    
-    # Validate file exists
-    input_path = str(Path(input_path).expanduser())
-    if not Path(input_path).is_file():
-        print(f"Error: File not found: {input_path}", file=sys.stderr)
-        sys.exit(1)
-    
-    print(f"\n{'='*60}")
-    print("Gene Annotation Pipeline")
-    print(f"{'='*60}")
-    print(f"Input file: {input_path}\n")
-    
+def run_pipeline(input_path: str, args: argparse.Namespace, profiler: RunProfiler) -> None:
+    """Run every annotation stage on input_path and write the outputs, timing each stage with profiler."""
     # Determine if input is the CpG mapping Excel
-    if input_path.endswith('.xlsx') and 'ewas_res' in input_path:
-        print("[MAIN] Detected CpG mapping file. Loading PI mappings...")
-        cpg_db = load_pi_cpg_mappings(input_path)
-        # We need to annotate these genes
-        unique_genes = cpg_db['gene'].unique().tolist()
-        print(f"[MAIN] Pulling metadata for {len(unique_genes)} unique genes from CpG mapping...")
-        gene_db_raw = run_hgnc_pull(unique_genes)
-        # Merge back
-        gene_db = pd.merge(cpg_db, gene_db_raw, left_on='gene', right_on='raw_input', how='left')
-    else:
-        # Run HGNC/NCBI annotation module from a standard gene list
-        print("[MAIN] Starting HGNC/NCBI annotation module...")
-        gene_db: pd.DataFrame = run_hgnc_pull(input_path)
+    with profiler.stage("hgnc_pull") as stage:
+        if input_path.endswith('.xlsx') and 'ewas_res' in input_path:
+            if args.proximity_mapping:
+                print(f"[MAIN] Detected CpG mapping file. Mapping CpGs to genes by TSS proximity "
+                      f"from {args.gene_annotation}...")
+                cpg_db = load_proximity_cpg_mappings(input_path, args.gene_annotation)
+            else:
+                print("[MAIN] Detected CpG mapping file. Loading PI mappings (unique_gene_name)...")
+                cpg_db = load_pi_cpg_mappings(input_path)
+            # We need to annotate these genes
+            unique_genes = cpg_db['gene'].unique().tolist()
+            stage.rows_in = len(unique_genes)
+            print(f"[MAIN] Pulling metadata for {len(unique_genes)} unique genes from CpG mapping...")
+            gene_db_raw = run_hgnc_pull(unique_genes)
+            # Merge back
+            gene_db = pd.merge(cpg_db, gene_db_raw, left_on='gene', right_on='raw_input', how='left')
+        else:
+            # Run HGNC/NCBI annotation module from a standard gene list
+            print("[MAIN] Starting HGNC/NCBI annotation module...")
+            gene_db: pd.DataFrame = run_hgnc_pull(input_path)
+        stage.rows_out = gene_db
 
 
     # Run function aggregation module (NCBI + UniProt + HGNC)
     print("\n[MAIN] Starting function annotation (NCBI + UniProt + HGNC)...")
-    gene_db = run_function_annotation(gene_db)
+    with profiler.stage("function_annotation", rows_in=gene_db) as stage:
+        gene_db = run_function_annotation(gene_db)
+        # Low-cardinality labels (chromosome, gene type, UniProt status) as categories from here on
+        gene_db = apply_schema(gene_db, GENE_TABLE_DTYPES)
+        stage.rows_out = gene_db
+
+    # Long-form gene-term associations collected alongside the formatted columns
+    associations = empty_associations()
 
     # ------------------------------------------------------------------
     # CpG-level EWAS Atlas associations
@@ -320,8 +327,11 @@ def main() -> None:
         print("\n[MAIN] Attaching EWAS Atlas CpG-trait associations...")
         atlas_path = "data/ewas_atlas.csv"
         if Path(atlas_path).is_file():
-            atlas_df = pd.read_csv(atlas_path, low_memory=False)
-            gene_db = attach_ewas_atlas_traits(gene_db, atlas_df)
+            with profiler.stage("ewas_atlas", rows_in=gene_db) as stage:
+                atlas_df = read_csv_with_schema(atlas_path, ATLAS_DTYPES, low_memory=False)
+                gene_db, atlas_assoc = attach_ewas_atlas_traits(gene_db, atlas_df, return_associations=True)
+                associations = combine_associations(associations, atlas_assoc)
+                stage.rows_out = gene_db
         else:
             print(f"[MAIN] Warning: {atlas_path} not found; skipping Atlas step.")
 
@@ -338,13 +348,17 @@ def main() -> None:
         symbol_col = "symbol"
 
     if symbol_col is not None:
-        gene_db = attach_psychiatric_gwas(gene_db, gene_col=symbol_col)
+        with profiler.stage("gwas", rows_in=gene_db) as stage:
+            gene_db = attach_psychiatric_gwas(gene_db, gene_col=symbol_col)
+            stage.rows_out = gene_db
     else:
         print("[MAIN] No symbol / approved_symbol column found; skipping GWAS step.")
 
     # Harmonizome psychiatric disease associations
     print("\n[MAIN] Attaching Harmonizome-based psychiatric disease evidence...")
-    gene_db = attach_harmonizome(gene_db, symbol_col="approved_symbol")
+    with profiler.stage("harmonizome", rows_in=gene_db) as stage:
+        gene_db = attach_harmonizome(gene_db, symbol_col="approved_symbol")
+        stage.rows_out = gene_db
     
     # ------------------------------------------------------------------
     # DisGeNET Broad-Spectrum associations
@@ -352,11 +366,17 @@ def main() -> None:
     print("\n[MAIN] Attaching DisGeNET associations (Broad-Spectrum & Psych)...")
     gea_path = 'data/disgenet_gea.csv'
     if Path(gea_path).is_file():
-        disgenet_df = pd.read_csv(gea_path)
-        # 1. Broad spectrum (all traits)
-        gene_db = annotate_with_disgenet(gene_db, disgenet_df, psych_only=False)
-        # 2. Psych specific (to maintain compatibility with previous outputs)
-        gene_db = annotate_with_disgenet(gene_db, disgenet_df, psych_only=True)
+        with profiler.stage("disgenet", rows_in=gene_db) as stage:
+            disgenet_df = load_disgenet(gea_path)
+            # 1. Broad spectrum (all traits)
+            gene_db, broad_assoc = annotate_with_disgenet(gene_db, disgenet_df, psych_only=False,
+                                                          return_associations=True)
+            # 2. Psych specific (to maintain compatibility with previous outputs)
+            gene_db, psych_assoc = annotate_with_disgenet(gene_db, disgenet_df, psych_only=True,
+                                                          return_associations=True)
+            associations = combine_associations(associations, broad_assoc)
+            associations = combine_associations(associations, psych_assoc)
+            stage.rows_out = gene_db
     else:
         print(f"[MAIN] Warning: {gea_path} not found; skipping DisGeNET step.")
 
@@ -370,13 +390,17 @@ def main() -> None:
     if not ncbi_email:
         print("[MAIN] NCBI_EMAIL missing; skipping PubMed psych literature step.")
     else:
-        gene_db = annotate_df_with_psych_literature(
-            gene_db,
-            gene_symbol_col="approved_symbol" if "approved_symbol" in gene_db.columns else "symbol",
-            entrez_col="entrez_id",
-            email=ncbi_email,
-            api_key=ncbi_api_key,
-        )
+        with profiler.stage("pubmed", rows_in=gene_db) as stage:
+            gene_db, pubmed_assoc = annotate_df_with_psych_literature(
+                gene_db,
+                gene_symbol_col="approved_symbol" if "approved_symbol" in gene_db.columns else "symbol",
+                entrez_col="entrez_id",
+                email=ncbi_email,
+                api_key=ncbi_api_key,
+                return_associations=True,
+            )
+            associations = combine_associations(associations, pubmed_assoc)
+            stage.rows_out = gene_db
 
     # Print summary
     print(f"\n{'='*60}")
@@ -393,7 +417,8 @@ def main() -> None:
 
     # Write full, un-pruned results to CSV for debugging/traceability
     raw_output_path = "annotated_genes_raw.csv"
-    gene_db.to_csv(raw_output_path, index=False)
+    with profiler.stage("raw_csv", rows_in=gene_db):
+        gene_db.to_csv(raw_output_path, index=False)
     print(f"\n[MAIN] Raw results written to: {raw_output_path} (all columns retained)")
     
     # Prepare deliverable with final column names/order
@@ -415,8 +440,81 @@ def main() -> None:
     available_cols = [col for col in display_cols if col in output_df.columns]
     print(output_df[available_cols].head().to_string(index=False))
 
+
+    # The columnar living file is the canonical store; the .xlsx is an export of the same table
+    with profiler.stage("living_file_and_exports", rows_in=output_df) as stage:
+        readable_df = apply_schema(build_readable_df(output_df), GENE_TABLE_DTYPES)
+        living_path = write_living_file(readable_df, LIVING_FILE_PATH)
+        print(f"\n[MAIN] Living file written to: {living_path}")
+        assoc_path = save_associations(associations, ASSOCIATIONS_PATH)
+        print(f"[MAIN] Association table written to: {assoc_path} ({len(associations)} rows)")
+        write_excel_export(readable_df, "annotated_genes.xlsx")
+        stage.rows_out = readable_df
+
+    print(f"\n{'='*60}")
+    print("Stage Profile")
+    print(f"{'='*60}")
+    profiler.print_summary(prefix="[MAIN]")
+
+
+def main(argv=None) -> None:
+    """Run the annotation pipeline end to end."""
+    parser = argparse.ArgumentParser(description="Annotate a gene list or the PI's CpG mapping workbook.")
+    parser.add_argument("input_path", nargs="?", default=None,
+                        help="Gene list or ewas_res_*.xlsx CpG mapping (prompted for when omitted).")
+    parser.add_argument("--proximity-mapping", action="store_true",
+                        help="Map CpGs to genes by TSS proximity instead of the PI's unique_gene_name column.")
+    parser.add_argument("--gene-annotation", default=str(DEFAULT_GENE_ANNOTATION_PATH),
+                        help=f"GTF/refGene table for --proximity-mapping (default: {DEFAULT_GENE_ANNOTATION_PATH})")
+    parser.add_argument("--no-trace-allocations", action="store_true",
+                        help="Skip tracemalloc allocation sites in the run report (lower overhead).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    
+    # Get gene list file path from command line or prompt user
+    # Default to the PI's CpG mapping file
+    default_input = "ewas_res_groupsig_128.xlsx"
+    if args.input_path:
+        input_path = args.input_path
+    else:
+        input_path = prompt_path_with_completion(f"Enter path to input file (default: {default_input}): ").strip()
+        if not input_path:
+            input_path = default_input
+    
+    # Validate file exists
+    input_path = str(Path(input_path).expanduser())
+    if not Path(input_path).is_file():
+        print(f"Error: File not found: {input_path}", file=sys.stderr)
+        sys.exit(1)
+    if args.proximity_mapping and not Path(args.gene_annotation).is_file():
+        print(f"Error: Gene annotation not found: {args.gene_annotation}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"\n{'='*60}")
+    print("Gene Annotation Pipeline")
+    print(f"{'='*60}")
+    print(f"Input file: {input_path}\n")
     
-    export_readable_excel(output_df)
+    # Per-stage timings and memory, rewritten next to the raw CSV after every stage
+    profiler = RunProfiler(report_path=RUN_REPORT_PATH, trace_allocations=not args.no_trace_allocations)
+    try:
+        run_pipeline(input_path, args, profiler)
+    finally:
+        # Stop tracemalloc even when a stage fails
+        profiler.close()
+    print(f"[MAIN] Run report written to: {RUN_REPORT_PATH}")
+    print(f"{'='*60}\n")
+
+    print(f"{'='*60}")
+    print("HTTP Telemetry (slowest service first)")
+    print(f"{'='*60}")
+    HTTP_METRICS.print_summary(prefix="[MAIN]")
+    print(f"[MAIN] HTTP metrics written to: {HTTP_METRICS.write_json(HTTP_METRICS_PATH)}")
     print(f"{'='*60}\n")
 
 
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Long-form (tidy) gene-term association table shared by enrichment, viz and reporting."""
+
+import logging
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .living_store import read_living_file, write_living_file
+
+logger = logging.getLogger(__name__)
+
+# Side output written next to the living file
+ASSOCIATIONS_PATH = "associations.parquet"
+
+# One row per (gene, source, term[, cpg]) association
+ASSOCIATION_COLUMNS = ["gene", "source", "term", "score", "pmid", "cpg", "detail"]
+
+# Separator between entries in the formatted string columns
+ENTRY_SEPARATOR = r";\n|;"
+
+# Presentation columns and the association source each one renders
+SOURCE_BY_COLUMN = {
+    "disgenet_diseases": "disgenet",
+    "disgenet_disease": "disgenet",
+    "disgenet_psych_diseases": "disgenet_psych",
+    "ewas_atlas_traits": "ewas_atlas",
+    "pubmed_terms": "pubmed",
+}
+
+
+def empty_associations() -> pd.DataFrame:
+    """An association table with no rows and the canonical columns and dtypes."""
+    return make_associations([], "", [])
+
+
+def _as_series(values: Iterable) -> pd.Series:
+    """Positional Series view of a column; arrays and Series are not copied element by element."""
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True)
+    if not hasattr(values, "__len__") or isinstance(values, (set, frozenset)):
+        values = list(values)
+    return pd.Series(values, dtype=object if len(values) == 0 else None)
+
+
+def make_associations(gene: Iterable, source: str, term: Iterable,
+                      score: Optional[Iterable] = None, pmid: Optional[Iterable] = None,
+                      cpg: Optional[Iterable] = None, detail: Optional[Iterable] = None) -> pd.DataFrame:
+    """
+    Builds a typed association table from aligned columns.
+
+    Scores are float (NaN when the source has none); every other column is text or NA.
+    """
+    gene = _as_series(gene)
+    n = len(gene)
+
+    def text(values):
+        if values is None:
+            return pd.Series([pd.NA] * n, dtype="string")
+        return _as_series(values).astype("string")
+
+    return pd.DataFrame({
+        "gene": gene.astype("string"),
+        "source": pd.Series([source] * n, dtype="string"),
+        "term": text(term),
+        "score": (pd.to_numeric(_as_series(score), errors="coerce").astype(float)
+                  if score is not None else pd.Series(np.full(n, np.nan))),
+        "pmid": text(pmid),
+        "cpg": text(cpg),
+        "detail": text(detail),
+    })
+
+
+def combine_associations(existing: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """Replaces the sources present in new, keeping rows from every other source."""
+    if existing is None or existing.empty:
+        return new.reset_index(drop=True)
+    keep = existing[~existing["source"].isin(new["source"].unique())]
+    return pd.concat([keep, new], ignore_index=True)[ASSOCIATION_COLUMNS]
+
+
+def select_associations(associations: Optional[pd.DataFrame], source: str,
+                        genes: Optional[Iterable] = None) -> Optional[pd.DataFrame]:
+    """
+    Rows for one source, optionally restricted to the given genes.
+
+    Returns None when there is no table or it holds nothing from that source,
+    so callers can fall back to the presentation string columns.
+    """
+    if associations is None or not (associations["source"] == source).any():
+        return None
+    selected = associations[associations["source"] == source]
+    if genes is not None:
+        selected = selected[selected["gene"].isin(pd.Series(list(genes), dtype=object).dropna().astype(str))]
+    return selected.reset_index(drop=True)
+
+
+def split_association_entries(values: pd.Series) -> pd.Series:
+    """
+    One stripped, non-empty entry per row from a formatted column ("A, 0.5;\nB, 0.3").
+
+    Missing and 'n/a' cells contribute nothing; the result is indexed by row position.
+    """
+    values = pd.Series(values).reset_index(drop=True).astype("string")
+    values = values[values.notna() & (values != "n/a")]
+    entries = values.str.split(ENTRY_SEPARATOR, regex=True).explode().str.strip()
+    return entries[entries.notna() & (entries != "")]
+
+
+def scored_frame(gene: Iterable, disease: Iterable, score: Iterable) -> pd.DataFrame:
+    """Compact (gene, disease, score) frame: categorical labels and float32 scores."""
+    return pd.DataFrame({
+        "gene": pd.Categorical(_as_series(gene)),
+        "disease": pd.Categorical(_as_series(disease)),
+        "score": _as_series(score).to_numpy(dtype=np.float32, na_value=np.nan),
+    })
+
+
+def parse_associations(df: pd.DataFrame, col: str, gene_col: str = "symbol") -> pd.DataFrame:
+    """
+    Parses a "Disease Name, Score;\nNext Disease, Score" column into (gene, disease, score) rows.
+
+    The name is everything before the last comma. Entries without a comma or with a
+    non-numeric score ('error', 'n/a') are dropped. gene is NA when gene_col is absent.
+    """
+    entries = split_association_entries(df[col])
+    entries = entries[entries.str.contains(",", regex=False)]
+    parts = entries.str.rsplit(",", n=1, expand=True)
+    if parts.empty:
+        return scored_frame([], [], [])
+
+    score = pd.to_numeric(parts[1].str.strip(), errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(score)
+    # The index holds each entry's row position in df (repeated for multi-entry cells)
+    rows = parts.index.to_numpy()[keep]
+    if gene_col in df.columns:
+        gene = df[gene_col].to_numpy(dtype=object)[rows]
+    else:
+        gene = np.full(len(rows), pd.NA, dtype=object)
+    return scored_frame(gene, parts[0].str.strip().to_numpy(dtype=object)[keep], score[keep])
+
+
+def load_associations(path: str | Path = ASSOCIATIONS_PATH) -> Optional[pd.DataFrame]:
+    """Loads the association side output, or None if it has not been written yet."""
+    try:
+        associations = read_living_file(path)
+    except FileNotFoundError:
+        return None
+    for col in ASSOCIATION_COLUMNS:
+        if col not in associations.columns:
+            associations[col] = pd.NA
+    associations = associations[ASSOCIATION_COLUMNS]
+    text_cols = [c for c in ASSOCIATION_COLUMNS if c != "score"]
+    associations[text_cols] = associations[text_cols].astype("string")
+    associations["score"] = pd.to_numeric(associations["score"], errors="coerce").astype(float)
+    return associations
+
+
+def save_associations(associations: pd.DataFrame, path: str | Path = ASSOCIATIONS_PATH) -> Path:
+    """Writes the association side output through the living-file store."""
+    written = write_living_file(associations[ASSOCIATION_COLUMNS], path)
+    counts = associations["source"].value_counts().to_dict()
+    logger.info("Wrote %d associations to %s (%s)", len(associations), written, counts)
+    return written
@@ -1,7 +1,9 @@
+import json
 import pandas as pd
 import numpy as np
 import re
-import json
+
+from .associations import make_associations
 
 def expand_cpg_gene_mappings(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -23,27 +25,81 @@ def load_pi_cpg_mappings(file_path: str = "ewas_res_groupsig_128.xlsx") -> pd.Da
     df = pd.read_excel(file_path, usecols=cols_to_load)
     return expand_cpg_gene_mappings(df)
 
-def attach_ewas_atlas_traits(mapping_df: pd.DataFrame, atlas_df: pd.DataFrame) -> pd.DataFrame:
+def compute_rank_score(atlas_df: pd.DataFrame) -> pd.Series:
+    """
+    rank / total_associations per Atlas row; NaN where rank is blank or the total is missing or zero.
+    """
+    rank = pd.to_numeric(atlas_df['rank'], errors='coerce')
+    total = pd.to_numeric(atlas_df['total_associations'], errors='coerce')
+    return (rank / total.where(total != 0)).astype(float)
+
+def _integer_strings(values: pd.Series) -> pd.Series:
+    """Numeric values as integer strings without a trailing .0; blanks and non-numbers become ''."""
+    num = np.trunc(pd.to_numeric(values, errors='coerce'))
+    return num.astype('Int64').astype('string').fillna('').astype(object)
+
+def normalize_atlas_table(atlas_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    On-disk form of the EWAS Atlas table: a 3-decimal 'rank_score' placed after 'p',
+    and rank/total_associations/pmid as integer strings. Idempotent.
+    """
+    atlas = atlas_df.copy()
+    score = compute_rank_score(atlas).to_numpy()
+    valid = ~np.isnan(score)
+    formatted = np.full(len(atlas), "", dtype=object)
+    formatted[valid] = np.char.mod('%.3f', score[valid])
+    atlas['rank_score'] = formatted
+
+    # Clean up .0 decimals for CSV readability
+    for col in ['rank', 'total_associations', 'pmid']:
+        if col in atlas.columns:
+            atlas[col] = _integer_strings(atlas[col])
+
+    # Put rank_score between p and rank
+    cols = list(atlas.columns)
+    if 'p' in cols and 'rank' in cols:
+        cols.remove('rank_score')
+        cols.insert(cols.index('p') + 1, 'rank_score')
+    return atlas[cols]
+
+def build_atlas_associations(mapping_df: pd.DataFrame, atlas_df: pd.DataFrame, gene_col: str = None) -> pd.DataFrame:
+    """
+    Long-form EWAS Atlas associations: one row per (gene, cpg, trait) with rank_score,
+    PMID and the mapped correlation (hyper/hypo/NR) as detail.
+
+    gene_col defaults to 'symbol' when present, else 'gene'.
+    """
+    if gene_col is None:
+        gene_col = 'symbol' if 'symbol' in mapping_df.columns else 'gene'
+    atlas = atlas_df.assign(
+        term=atlas_df['trait'].astype('string').str.strip(),
+        score=compute_rank_score(atlas_df),
+        correlation_mapped=atlas_df['correlation'].astype(object).map({'pos': 'hyper', 'neg': 'hypo'}).fillna('NR'),
+        pmid_str=_integer_strings(atlas_df['pmid']).replace('', None),
+    )
+    atlas = atlas[atlas['term'].notna() & (atlas['term'] != '') & (atlas['term'].str.lower() != 'nan')]
+
+    genes = mapping_df[['cpg', gene_col]].dropna().drop_duplicates()
+    joined = genes.merge(atlas[['cpg', 'term', 'score', 'pmid_str', 'correlation_mapped']], on='cpg')
+    joined = joined.sort_values(['cpg', gene_col, 'score', 'term'], ascending=[True, True, False, True], na_position='last')
+    return make_associations(
+        joined[gene_col], 'ewas_atlas', joined['term'], score=joined['score'],
+        pmid=joined['pmid_str'], cpg=joined['cpg'], detail=joined['correlation_mapped'],
+    )
+
+def attach_ewas_atlas_traits(mapping_df: pd.DataFrame, atlas_df: pd.DataFrame, return_associations: bool = False):
     """
     Aggregates trait associations from EWAS Atlas and attaches them to the mapping DataFrame.
     Implements rank scoring, correlation mapping, and strict formatting.
+    With return_associations=True, also returns the long-form association table.
     """
     # 1. Map Correlations
     corr_map = {'pos': 'hyper', 'neg': 'hypo'}
     atlas_df = atlas_df.copy()
-    atlas_df['correlation_mapped'] = atlas_df['correlation'].map(corr_map).fillna('NR')
+    atlas_df['correlation_mapped'] = atlas_df['correlation'].astype(object).map(corr_map).fillna('NR')
     
     # 2. Calculate Rank Score (Numeric only if rank exists)
-    def calc_rank_score(row):
-        try:
-            if pd.notna(row['rank']) and pd.notna(row['total_associations']) and row['total_associations'] != 0:
-                score = float(row['rank']) / float(row['total_associations'])
-                return score
-        except:
-            pass
-        return None
-    
-    atlas_df['rank_score_num'] = atlas_df.apply(calc_rank_score, axis=1)
+    atlas_df['rank_score_num'] = compute_rank_score(atlas_df)
     
     # 3. Aggregation and Formatting
     def aggregate_traits(group):
@@ -74,105 +130,97 @@ def attach_ewas_atlas_traits(mapping_df: pd.DataFrame, atlas_df: pd.DataFrame) -
             })
             
         # Sort by score descending, then trait alphabetical
-        rows.sort(key=lambda x: (x['score_sort'], x['trait']), reverse=[True, False])
+        rows.sort(key=lambda x: (-x['score_sort'], x['trait']))
         
         trait_str = ";\n".join([r['formatted'] for r in rows]) if rows else None
         return pd.Series({'ewas_atlas_traits': trait_str})
 
     atlas_grouped = atlas_df.groupby('cpg').apply(aggregate_traits, include_groups=False).reset_index()
     result_df = pd.merge(mapping_df, atlas_grouped, on='cpg', how='left')
+    if return_associations:
+        return result_df, build_atlas_associations(mapping_df, atlas_df)
     return result_df
 
+def _safe_json_list(text: str) -> list:
+    """Parse a JSON list string; anything malformed yields no synonyms."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+def _explode_synonyms(living_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (synonym, symbol) from the living file's 'synonyms' column.
+
+    Accepts JSON-list strings, ';'-separated strings and in-memory lists.
+    """
+    if 'synonyms' not in living_df.columns:
+        return pd.DataFrame(columns=['synonym', 'symbol'])
+
+    syn = living_df.loc[living_df['synonyms'].notna() & living_df['symbol'].notna(), ['symbol', 'synonyms']]
+    syn = syn.reset_index(drop=True).astype({'synonyms': object})
+    raw = syn['synonyms']
+    is_str = raw.map(type).eq(str)
+    is_json = is_str & raw.where(is_str, '').str.startswith('[')
+
+    # JSON lists go through json.loads so escapes are decoded; malformed ones yield nothing, as before
+    json_tokens = raw[is_json].map(_safe_json_list)
+    plain_tokens = raw[is_str & ~is_json].str.split(';')
+    list_tokens = raw[~is_str & raw.map(pd.api.types.is_list_like)]
+
+    tokens = pd.concat([json_tokens, plain_tokens, list_tokens]).sort_index().explode().dropna()
+    tokens = tokens.astype(str).str.strip()
+    tokens = tokens[tokens != '']
+
+    exploded = pd.DataFrame({'synonym': tokens.to_numpy(), 'symbol': syn['symbol'].reindex(tokens.index).to_numpy()})
+    # A synonym listed under several symbols resolves to the last one in the file
+    return exploded.drop_duplicates(subset='synonym', keep='last')
+
 def analyze_unmapped_genes(atlas_df: pd.DataFrame, living_df: pd.DataFrame, original_mapping_df: pd.DataFrame):
     """
     Identifies genes in EWAS Atlas that are NOT in the living file symbols.
     Cross-checks with synonyms and separates established vs unestablished (decimals).
     """
-    existing_symbols = set(living_df['symbol'].dropna().astype(str).unique())
-    
-    synonyms_map = {}
-    for _, row in living_df.iterrows():
-        symbol = row['symbol']
-        synonyms_raw = row.get('synonyms')
-        if pd.notna(synonyms_raw):
-            try:
-                if isinstance(synonyms_raw, str):
-                    if synonyms_raw.startswith('['):
-                        synonyms = json.loads(synonyms_raw)
-                    else:
-                        synonyms = [s.strip() for s in synonyms_raw.split(';') if s.strip()]
-                else:
-                    synonyms = synonyms_raw
-                
-                for syn in synonyms:
-                    synonyms_map[str(syn)] = symbol
-            except:
-                pass
-
-    original_data_map = original_mapping_df.set_index('cpg')['unique_gene_name'].to_dict()
+    existing_symbols = living_df['symbol'].dropna().astype(str).unique()
+    synonyms = _explode_synonyms(living_df)
 
+    # One row per Atlas gene token, in (cpg, genes) pair order
     cpg_genes = atlas_df[['cpg', 'genes']].drop_duplicates()
-    
-    unmapped_records = []
-    cpg_unmapped_genes = {}
-    cpg_unmapped_regions = {}
-    appendix_c_source = []
-    
-    for _, row in cpg_genes.iterrows():
-        cpg = row['cpg']
-        genes_str = row['genes']
-        if pd.isna(genes_str):
-            continue
-            
-        full_atlas_genes = [g.strip() for g in str(genes_str).split(';') if g.strip()]
-        established = []
-        unestablished = []
-        
-        for gene in full_atlas_genes:
-            is_decimal = '.' in gene
-            if is_decimal:
-                appendix_c_source.append({'cpg': cpg, 'genes': gene})
-            
-            if gene in existing_symbols:
-                continue
-                
-            parent_symbol = synonyms_map.get(gene)
-            
-            # Diagnostic Record
-            orig_val = original_data_map.get(cpg, "")
-            if isinstance(orig_val, str) and orig_val.lower() == 'unmapped':
-                orig_val = ""
-            elif pd.isna(orig_val):
-                orig_val = ""
-
-            unmapped_records.append({
-                'cpg': cpg,
-                'ewas_genes': genes_str,
-                'uncaptured_gene': gene,
-                'synonym_of': parent_symbol if parent_symbol else "",
-                'nearest_from_original_data': orig_val,
-                'is_decimal': is_decimal
-            })
-            
-            if not parent_symbol:
-                if is_decimal:
-                    unestablished.append(gene)
-                else:
-                    established.append(gene)
-        
-        if established:
-            cpg_unmapped_genes[cpg] = ";\n".join(sorted(established))
-        if unestablished:
-            cpg_unmapped_regions[cpg] = ";\n".join(sorted(unestablished))
-
-    unaccounted_df = pd.DataFrame(unmapped_records)
-    if not unaccounted_df.empty:
-        unaccounted_df = unaccounted_df[unaccounted_df['is_decimal'] == False].drop(columns=['is_decimal'])
-    else:
-        unaccounted_df = pd.DataFrame(columns=['cpg', 'ewas_genes', 'uncaptured_gene', 'synonym_of', 'nearest_from_original_data'])
-        
-    appendix_c_df = pd.DataFrame(appendix_c_source).drop_duplicates()
-    if appendix_c_df.empty:
-        appendix_c_df = pd.DataFrame(columns=['cpg', 'genes'])
+    cpg_genes = cpg_genes[cpg_genes['genes'].notna()].reset_index(drop=True)
+    cpg_genes['pair'] = np.arange(len(cpg_genes))
+    tokens = cpg_genes.assign(gene=cpg_genes['genes'].astype(str).str.split(';')).explode('gene')
+    tokens['gene'] = tokens['gene'].str.strip()
+    tokens = tokens[tokens['gene'].notna() & (tokens['gene'] != '')]
+    tokens['is_decimal'] = tokens['gene'].str.contains('.', regex=False)
+
+    appendix_c_df = tokens.loc[tokens['is_decimal'], ['cpg', 'gene']].rename(columns={'gene': 'genes'}).drop_duplicates()
+    appendix_c_df = appendix_c_df.reset_index(drop=True)
+
+    unmapped = tokens[~tokens['gene'].isin(existing_symbols)]
+    unmapped = unmapped.merge(synonyms, left_on='gene', right_on='synonym', how='left')
+    unmapped['synonym_of'] = unmapped['symbol'].fillna("")
+
+    # Original (PI) mapping for context; 'unmapped' and blanks become empty strings
+    original = original_mapping_df.drop_duplicates(subset='cpg', keep='last')[['cpg', 'unique_gene_name']]
+    unmapped = unmapped.merge(original, on='cpg', how='left')
+    orig_val = unmapped['unique_gene_name']
+    blank = orig_val.isna() | orig_val.astype(str).str.lower().eq('unmapped')
+    unmapped['nearest_from_original_data'] = orig_val.where(~blank, "")
+
+    unaccounted_df = unmapped.loc[~unmapped['is_decimal'], ['cpg', 'genes', 'gene', 'synonym_of', 'nearest_from_original_data']]
+    unaccounted_df = unaccounted_df.rename(columns={'genes': 'ewas_genes', 'gene': 'uncaptured_gene'}).reset_index(drop=True)
+
+    # Genes with no synonym match, joined per (cpg, genes) pair; a cpg's last non-empty pair wins
+    def join_per_cpg(frame):
+        joined = (frame.sort_values(['pair', 'gene'])
+                       .groupby(['pair', 'cpg'], sort=True)['gene'].agg(";\n".join)
+                       .reset_index()
+                       .drop_duplicates(subset='cpg', keep='last'))
+        return dict(zip(joined['cpg'], joined['gene']))
+
+    unresolved = unmapped[unmapped['synonym_of'] == ""]
+    cpg_unmapped_genes = join_per_cpg(unresolved[~unresolved['is_decimal']])
+    cpg_unmapped_regions = join_per_cpg(unresolved[unresolved['is_decimal']])
 
-    return cpg_unmapped_genes, cpg_unmapped_regions, unaccounted_df, appendix_c_df
\ No newline at end of file
+    return cpg_unmapped_genes, cpg_unmapped_regions, unaccounted_df, appendix_c_df
@@ -1,7 +1,65 @@
 import pandas as pd
 import numpy as np
 
-def annotate_with_disgenet(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, psych_only: bool = True) -> pd.DataFrame:
+from .associations import make_associations
+from .schema import DISGENET_DTYPES, read_csv_with_schema
+
+PSYCH_DISEASE_CLASS = "Mental or Behavioral Dysfunction (T048)"
+
+def load_disgenet(path: str = "data/disgenet_gea.csv") -> pd.DataFrame:
+    """
+    Reads a DisGeNET GEA export with the compact dtypes from schema.DISGENET_DTYPES
+    (categorical gene/disease/class labels, Int16 years, float32 gene indices).
+    """
+    return read_csv_with_schema(path, DISGENET_DTYPES)
+
+def _subset_disgenet(disgenet_df: pd.DataFrame, psych_only: bool):
+    """Returns (GEA rows to use, column suffix) for the broad or psychiatric view."""
+    if psych_only:
+        if 'diseaseClasses_UMLS_ST' in disgenet_df.columns:
+            df_gea_subset = disgenet_df[disgenet_df['diseaseClasses_UMLS_ST'].astype(str).str.strip() == PSYCH_DISEASE_CLASS].copy()
+        else:
+            print("Warning: diseaseClasses_UMLS_ST column missing, cannot filter for psych traits.")
+            df_gea_subset = disgenet_df.copy()
+        return df_gea_subset, "_psych"
+    return disgenet_df.copy(), ""
+
+def build_disgenet_associations(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, psych_only: bool = True) -> pd.DataFrame:
+    """
+    Long-form DisGeNET associations for the genes in genes_df['symbol'].
+
+    One row per (gene, disease) with the GEA score and the supporting PMIDs (';'-joined).
+    Diseases whose evidence rows disagree on the score get score NaN, matching the
+    'error' rendering in the string columns.
+    """
+    df_gea_subset, col_suffix = _subset_disgenet(disgenet_df, psych_only)
+    source = f"disgenet{col_suffix}"
+    symbols = genes_df['symbol'].dropna().unique()
+    gea = df_gea_subset[df_gea_subset['gene_symbol'].isin(symbols)]
+    if gea.empty:
+        return make_associations([], source, [])
+
+    pmid = pd.to_numeric(gea['reference'], errors='coerce')
+    is_pmid = (gea['reference_type'].astype(str) == 'PMID') & pmid.notna()
+    gea = gea.assign(_pmid=np.where(is_pmid, pmid.fillna(0).astype('int64').astype(str), None))
+
+    # Categorical keys: observed=True keeps only the pairs present, not every gene x disease combination
+    grouped = gea.groupby(['gene_symbol', 'disease_name'], sort=False, observed=True)
+    summary = grouped.agg(
+        score=('score', 'max'),
+        n_scores=('score', 'nunique'),
+        pmid=('_pmid', lambda s: ";".join(dict.fromkeys(s.dropna())) or None),
+    ).reset_index()
+    conflict = summary['n_scores'] > 1
+    return make_associations(
+        summary['gene_symbol'], source, summary['disease_name'],
+        score=summary['score'].where(~conflict),
+        pmid=summary['pmid'],
+        detail=np.where(conflict, "conflicting scores", None),
+    )
+
+def annotate_with_disgenet(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, psych_only: bool = True,
+                           return_associations: bool = False):
     """
     Annotates a gene DataFrame with DisGeNET associations.
     
@@ -9,20 +67,10 @@ def annotate_with_disgenet(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, ps
         genes_df: DataFrame containing a 'symbol' column.
         disgenet_df: DataFrame from DisGeNET GEA export.
         psych_only: If True, filters for 'Mental or Behavioral Dysfunction (T048)'.
+        return_associations: If True, also return the long-form association table.
     """
     df_genes = genes_df.copy()
-    
-    if psych_only:
-        target_class = "Mental or Behavioral Dysfunction (T048)"
-        if 'diseaseClasses_UMLS_ST' in disgenet_df.columns:
-            df_gea_subset = disgenet_df[disgenet_df['diseaseClasses_UMLS_ST'].astype(str).str.strip() == target_class].copy()
-        else:
-            print("Warning: diseaseClasses_UMLS_ST column missing, cannot filter for psych traits.")
-            df_gea_subset = disgenet_df.copy()
-        col_suffix = "_psych"
-    else:
-        df_gea_subset = disgenet_df.copy()
-        col_suffix = ""
+    df_gea_subset, col_suffix = _subset_disgenet(disgenet_df, psych_only)
 
     disease_col_name = f"disgenet{col_suffix}_diseases"
     evidence_col_name = f"disgenet{col_suffix}_evidence"
@@ -74,7 +122,7 @@ def annotate_with_disgenet(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, ps
             disease_name = d_obj['name']
             d_rows = gene_data[gene_data['disease_name'] == disease_name].copy()
             
-            d_rows['polarity_filled'] = d_rows['polarity'].fillna('NAPolarity')
+            d_rows['polarity_filled'] = d_rows['polarity'].astype(object).fillna('NAPolarity')
             d_rows['pmYear_filled'] = d_rows['pmYear'].fillna(9999) 
             d_rows['pol_rank'] = d_rows['polarity_filled'].map(lambda x: polarity_order.get(x, 3))
             
@@ -105,4 +153,6 @@ def annotate_with_disgenet(genes_df: pd.DataFrame, disgenet_df: pd.DataFrame, ps
     df_genes[disease_col_name] = diseases_col
     df_genes[evidence_col_name] = evidence_col
     
+    if return_associations:
+        return df_genes, build_disgenet_associations(genes_df, disgenet_df, psych_only)
     return df_genes
\ No newline at end of file
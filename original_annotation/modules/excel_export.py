@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Streaming .xlsx export with column-level wrap formatting."""
+
+import logging
+from importlib import util as importlib_util
+from typing import Iterable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Applied to wrapped columns so multi-line cells read top-down
+WRAP_FORMAT = {"text_wrap": True, "valign": "top"}
+
+# Excel's hard limit on characters in one cell
+MAX_CELL_CHARS = 32767
+
+# Rows converted to Python values at a time while streaming
+ROW_CHUNK = 10_000
+
+
+def available_excel_engine() -> Optional[str]:
+    """Preferred installed writer: xlsxwriter (streaming), then openpyxl (write-only mode)."""
+    for engine in ("xlsxwriter", "openpyxl"):
+        if importlib_util.find_spec(engine):
+            return engine
+    return None
+
+
+def multiline_columns(df: pd.DataFrame) -> list[str]:
+    """Text columns with at least one multi-line value."""
+    cols = []
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            if values.astype("string").str.contains("\n", regex=False).any():
+                cols.append(col)
+    return cols
+
+
+def _cell_rows(df: pd.DataFrame) -> Iterable[tuple]:
+    """
+    Row tuples with missing values as None and over-long strings clipped to Excel's limit.
+
+    Rows are converted ROW_CHUNK at a time so no full object copy of df is ever held.
+    """
+    for start in range(0, len(df), ROW_CHUNK):
+        chunk = df.iloc[start:start + ROW_CHUNK]
+        clean = chunk.astype(object).where(chunk.notna(), None)
+        for col in clean.columns[clean.apply(lambda c: c.map(_is_long_text).any())]:
+            clean[col] = clean[col].map(lambda v: v[:MAX_CELL_CHARS] if _is_long_text(v) else v)
+        yield from clean.itertuples(index=False, name=None)
+
+
+def _is_long_text(value: object) -> bool:
+    return isinstance(value, str) and len(value) > MAX_CELL_CHARS
+
+
+def _write_xlsxwriter(df, output_path, sheet_name, wrap_columns, column_widths):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output_path, {
+        # Rows are flushed to disk as soon as the next one starts
+        "constant_memory": True,
+        # Match pandas: write strings as text, never as formulas, URLs or numbers
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "strings_to_numbers": False,
+        "default_date_format": "yyyy-mm-dd",
+    })
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        header_format = workbook.add_format({"bold": True})
+        wrap_format = workbook.add_format(WRAP_FORMAT)
+
+        # Column formats must be set before any row is written in constant_memory mode;
+        # cells written without their own format inherit them
+        for idx, col in enumerate(df.columns):
+            width = column_widths.get(col)
+            if col in wrap_columns:
+                worksheet.set_column(idx, idx, width, wrap_format)
+            elif width is not None:
+                worksheet.set_column(idx, idx, width)
+
+        worksheet.write_row(0, 0, [str(c) for c in df.columns], header_format)
+        for r, row in enumerate(_cell_rows(df), start=1):
+            worksheet.write_row(r, 0, row)
+    finally:
+        workbook.close()
+
+
+def _write_openpyxl(df, output_path, sheet_name, wrap_columns, column_widths):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    for idx, col in enumerate(df.columns, start=1):
+        if col in column_widths:
+            worksheet.column_dimensions[get_column_letter(idx)].width = column_widths[col]
+
+    bold = Font(bold=True)
+    header = []
+    for col in df.columns:
+        cell = WriteOnlyCell(worksheet, value=str(col))
+        cell.font = bold
+        header.append(cell)
+    worksheet.append(header)
+
+    wrap_style = Alignment(wrapText=True, vertical="top")
+    wrap_idx = {i for i, col in enumerate(df.columns) if col in wrap_columns}
+    for row in _cell_rows(df):
+        row = list(row)
+        for i, value in enumerate(row):
+            wrap = i in wrap_idx
+            # openpyxl would otherwise store '=...' text as a formula
+            literal = isinstance(value, str) and value.startswith("=")
+            if wrap or literal:
+                cell = WriteOnlyCell(worksheet, value=value)
+                if literal:
+                    cell.data_type = "s"
+                if wrap:
+                    cell.alignment = wrap_style
+                row[i] = cell
+        worksheet.append(row)
+    workbook.save(output_path)
+
+
+def write_excel(df: pd.DataFrame, output_path: str, sheet_name: str = "Sheet1",
+                wrap_columns: Optional[Iterable[str]] = None,
+                column_widths: Optional[dict] = None,
+                engine: Optional[str] = None) -> Optional[str]:
+    """
+    Streams a DataFrame to a single-sheet .xlsx file.
+
+    With xlsxwriter the sheet is written in constant_memory mode and wrapping is a
+    column format, so memory stays flat as rows grow; openpyxl's write-only mode is
+    the fallback.
+
+    Args:
+        df: Table to export (index is not written).
+        output_path: Destination .xlsx path.
+        sheet_name: Worksheet name.
+        wrap_columns: Columns rendered with wrapped, top-aligned text.
+        column_widths: Optional {column: width} overrides.
+        engine: Force 'xlsxwriter' or 'openpyxl'; defaults to the best installed one.
+
+    Returns:
+        The engine used, or None if no Excel writer is installed.
+    """
+    engine = engine or available_excel_engine()
+    wrap_columns = set(wrap_columns or [])
+    column_widths = column_widths or {}
+
+    if engine == "xlsxwriter":
+        _write_xlsxwriter(df, output_path, sheet_name, wrap_columns, column_widths)
+    elif engine == "openpyxl":
+        _write_openpyxl(df, output_path, sheet_name, wrap_columns, column_widths)
+    else:
+        return None
+
+    logger.info("Wrote %d rows x %d columns to %s (engine: %s)", len(df), df.shape[1], output_path, engine)
+    return engine
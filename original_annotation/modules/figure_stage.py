@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Run independent figure renders in worker processes alongside external plotting scripts."""
+
+import logging
+import subprocess
+import tracemalloc
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    # Forked workers would otherwise keep tracing allocations for the parent's run profile
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+class FigureStage:
+    """
+    Collects figure jobs and external commands, runs them concurrently, and waits once.
+
+    Python figures go to a process pool (matplotlib is not thread-safe); commands such
+    as Rscript run as subprocesses. With parallel=False, or if no process pool can be
+    started, figures render inline at submit time. Errors are reported per job by
+    wait() instead of aborting the other figures.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, parallel: bool = True):
+        self.max_workers = max_workers
+        self.parallel = parallel
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: dict[str, Future] = {}
+        self._processes: dict[str, subprocess.Popen] = {}
+        self._errors: dict[str, str] = {}
+        self._done: list[str] = []
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.parallel and self._executor is None:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            except (OSError, NotImplementedError, ValueError) as exc:
+                print(f"[FIGURES] Process pool unavailable ({exc}); rendering figures sequentially.")
+                self.parallel = False
+        return self._executor
+
+    def submit(self, name: str, func: Callable, *args, **kwargs) -> None:
+        """Queues func(*args, **kwargs); func and its arguments must be picklable."""
+        pool = self._pool()
+        if pool is not None:
+            self._futures[name] = pool.submit(func, *args, **kwargs)
+            return
+        try:
+            func(*args, **kwargs)
+            self._done.append(name)
+        except Exception as exc:
+            self._errors[name] = f"{type(exc).__name__}: {exc}"
+
+    def run_command(self, name: str, command: list[str]) -> None:
+        """Starts an external command without waiting for it."""
+        try:
+            self._processes[name] = subprocess.Popen(command)
+        except OSError as exc:
+            self._errors[name] = f"could not start {command[0]}: {exc}"
+
+    def wait(self) -> dict[str, Optional[str]]:
+        """
+        Blocks until every job and command has finished.
+
+        Returns {name: None on success, else an error message}.
+        """
+        for name, future in self._futures.items():
+            try:
+                future.result()
+                self._done.append(name)
+            except Exception as exc:
+                self._errors[name] = f"{type(exc).__name__}: {exc}"
+        for name, process in self._processes.items():
+            returncode = process.wait()
+            if returncode == 0:
+                self._done.append(name)
+            else:
+                self._errors[name] = f"exited with status {returncode}"
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        results = {name: None for name in self._done}
+        results.update(self._errors)
+        for name, error in self._errors.items():
+            print(f"[FIGURES] Error in {name}: {error}")
+        logger.info("Figure stage finished: %d ok, %d failed", len(self._done), len(self._errors))
+        self._futures, self._processes, self._errors, self._done = {}, {}, {}, []
+        return results
@@ -12,6 +12,8 @@ from typing import Dict, Optional
 import pandas as pd
 import requests
 
+from .http_metrics import METRICS, service_for_url
+
 
 UNIPROT_BASE = "https://rest.uniprot.org/uniprotkb"
 HGNC_BASE = "https://rest.genenames.org"  # Accept: application/json
@@ -25,10 +27,14 @@ def _http_get_json_with_retries(
     delay: float = 1.0,
 ) -> Optional[dict]:
     """Generic JSON GET with simple retry logic."""
+    service = service_for_url(url)
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            METRICS.retry(service)
         try:
             print(f"[HTTP] GET {url} (attempt {attempt})")
-            resp = requests.get(url, headers=headers or {}, timeout=15)
+            with METRICS.request(service) as call:
+                resp = call.response = requests.get(url, headers=headers or {}, timeout=15)
             if resp.status_code == 200:
                 try:
                     return resp.json()
@@ -266,14 +272,18 @@ def run_function_annotation(gene_db: pd.DataFrame) -> pd.DataFrame:
 
         # ---- UniProt via accession ----
         uniprot_acc = row.get("uniprot_primary_accession")
+        if pd.isna(uniprot_acc):
+            uniprot_acc = None  # genes NCBI could not resolve carry NaN here
         uni_function = None
         uni_status = None
         uni_pe = None
 
         if uniprot_acc:
             if uniprot_acc in uniprot_cache:
+                METRICS.cache_hit("UniProt")
                 uni_info = uniprot_cache[uniprot_acc]
             else:
+                METRICS.cache_miss("UniProt")
                 uni_info = fetch_uniprot_info(uniprot_acc)
                 uniprot_cache[uniprot_acc] = uni_info
 
@@ -283,11 +293,15 @@ def run_function_annotation(gene_db: pd.DataFrame) -> pd.DataFrame:
 
         # ---- HGNC best-effort ----
         hgnc_id = row.get("hgnc_id")
+        if pd.isna(hgnc_id):
+            hgnc_id = None
         hgnc_text = None
         if hgnc_id:
             if hgnc_id in hgnc_cache:
+                METRICS.cache_hit("HGNC")
                 hgnc_text = hgnc_cache[hgnc_id]
             else:
+                METRICS.cache_miss("HGNC")
                 hgnc_text = fetch_hgnc_function(hgnc_id)
                 hgnc_cache[hgnc_id] = hgnc_text
 
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Map CpG coordinates to nearby genes from a local GTF or RefSeq annotation."""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .cpg_integration import expand_cpg_gene_mappings
+
+logger = logging.getLogger(__name__)
+
+# Default local annotation (UCSC refGene table dump for hg38)
+DEFAULT_GENE_ANNOTATION_PATH = Path("resources") / "annotation" / "refGene.txt.gz"
+
+# TSS window, in bp, on the gene's own strand
+DEFAULT_UPSTREAM = 2000
+DEFAULT_DOWNSTREAM = 500
+
+# Upper bound on candidate (CpG, window) pairs materialized at once per chromosome
+JOIN_CHUNK_PAIRS = 5_000_000
+
+# Column layout of the UCSC refGene / ncbiRefSeq table dumps
+REFGENE_COLUMNS = [
+    "bin", "name", "chrom", "strand", "txStart", "txEnd", "cdsStart", "cdsEnd",
+    "exonCount", "exonStarts", "exonEnds", "score", "name2",
+    "cdsStartStat", "cdsEndStat", "exonFrames",
+]
+
+GTF_COLUMNS = ["seqname", "source", "feature", "start", "end", "score", "strand", "frame", "attribute"]
+
+
+# ---------------------------------------------------------------------------
+# Annotation loading
+# ---------------------------------------------------------------------------
+
+def _normalize_chrom(series: pd.Series) -> pd.Series:
+    """Coerce chromosome labels to the UCSC 'chrN' form used by the CpG sheet."""
+    chrom = series.astype(str).str.strip()
+    return chrom.where(chrom.str.startswith("chr"), "chr" + chrom)
+
+
+def _load_gtf(path: Path) -> pd.DataFrame:
+    """Transcript (or gene) records from a GTF, as 0-based half-open intervals."""
+    gtf = pd.read_csv(
+        path, sep="\t", comment="#", header=None, names=GTF_COLUMNS,
+        usecols=["seqname", "feature", "start", "end", "strand", "attribute"],
+        dtype={"seqname": str, "feature": str, "strand": str, "attribute": str},
+    )
+    # Transcripts carry every alternative TSS; fall back to genes for gene-only GTFs
+    feature = "transcript" if (gtf["feature"] == "transcript").any() else "gene"
+    gtf = gtf[gtf["feature"] == feature]
+
+    gene = gtf["attribute"].str.extract(r'gene_name "([^"]+)"', expand=False)
+    gene = gene.fillna(gtf["attribute"].str.extract(r'gene_id "([^"]+)"', expand=False))
+
+    return pd.DataFrame({
+        "gene": gene.to_numpy(),
+        "chr": _normalize_chrom(gtf["seqname"]).to_numpy(),
+        "start": gtf["start"].to_numpy(dtype=np.int64) - 1,
+        "end": gtf["end"].to_numpy(dtype=np.int64),
+        "strand": gtf["strand"].to_numpy(),
+    })
+
+
+def _load_refgene(path: Path) -> pd.DataFrame:
+    """Transcript records from a UCSC refGene/ncbiRefSeq table dump."""
+    raw = pd.read_csv(path, sep="\t", header=None, comment="#", dtype=str)
+    # Dumps with and without the leading 'bin' column are both common
+    names = REFGENE_COLUMNS if raw[0].str.isdigit().all() else REFGENE_COLUMNS[1:]
+    raw.columns = names[: raw.shape[1]]
+
+    return pd.DataFrame({
+        "gene": raw["name2"].to_numpy(),
+        "chr": _normalize_chrom(raw["chrom"]).to_numpy(),
+        "start": raw["txStart"].astype(np.int64).to_numpy(),
+        "end": raw["txEnd"].astype(np.int64).to_numpy(),
+        "strand": raw["strand"].to_numpy(),
+    })
+
+
+def load_gene_annotation(path: str | Path = DEFAULT_GENE_ANNOTATION_PATH) -> pd.DataFrame:
+    """
+    Loads a GTF (.gtf[.gz]) or UCSC refGene-style table (.txt[.gz]) into one row per transcript.
+
+    Returns columns gene, chr, start, end (0-based half-open), strand and tss.
+    """
+    path = Path(path)
+    suffixes = [s.lower() for s in path.suffixes]
+    if ".gtf" in suffixes or ".gff" in suffixes:
+        genes = _load_gtf(path)
+    else:
+        genes = _load_refgene(path)
+
+    genes = genes.dropna(subset=["gene"])
+    genes = genes[~genes["chr"].str.contains("_")]  # alt/random/fix contigs
+    genes["tss"] = np.where(genes["strand"].to_numpy() == "-", genes["end"].to_numpy() - 1, genes["start"].to_numpy())
+    genes = genes.drop_duplicates(subset=["gene", "chr", "tss", "strand"]).reset_index(drop=True)
+    logger.info("Loaded %d transcripts for %d genes from %s", len(genes), genes["gene"].nunique(), path)
+    return genes
+
+
+def build_tss_windows(genes: pd.DataFrame, upstream: int = DEFAULT_UPSTREAM,
+                      downstream: int = DEFAULT_DOWNSTREAM, include_gene_body: bool = False) -> pd.DataFrame:
+    """
+    Builds strand-aware windows around each TSS (optionally extended over the gene body).
+
+    Upstream is 5' of the TSS on the gene's own strand. Windows are 0-based half-open.
+    """
+    tss = genes["tss"].to_numpy(dtype=np.int64)
+    minus = genes["strand"].to_numpy() == "-"
+    start = np.where(minus, tss - downstream, tss - upstream)
+    end = np.where(minus, tss + upstream, tss + downstream) + 1
+    if include_gene_body:
+        start = np.minimum(start, genes["start"].to_numpy(dtype=np.int64))
+        end = np.maximum(end, genes["end"].to_numpy(dtype=np.int64))
+
+    return pd.DataFrame({
+        "gene": genes["gene"].to_numpy(),
+        "chr": genes["chr"].to_numpy(),
+        "start": np.maximum(start, 0),
+        "end": end,
+        "tss": tss,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Interval join
+# ---------------------------------------------------------------------------
+
+def _join_sorted(q_start: np.ndarray, q_end: np.ndarray, t_start: np.ndarray,
+                 t_end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Overlapping (query, target) index pairs for one chromosome.
+
+    Targets must be sorted by start. The longest target bounds each query's
+    candidates to a binary-searched slice, which is expanded and filtered in
+    vectorized chunks of at most JOIN_CHUNK_PAIRS pairs.
+    """
+    max_len = int((t_end - t_start).max())
+    lo = np.searchsorted(t_start, q_start - max_len + 1, side="left")
+    hi = np.searchsorted(t_start, q_end, side="left")
+    counts = np.maximum(hi - lo, 0)
+
+    q_parts, t_parts = [], []
+    bounds = np.cumsum(counts)
+    first = 0
+    while first < len(counts):
+        # Largest block of queries whose candidates fit in one chunk (at least one query)
+        base = bounds[first - 1] if first else 0
+        last = max(int(np.searchsorted(bounds, base + JOIN_CHUNK_PAIRS, side="right")), first + 1)
+        block = np.arange(first, last)
+        n = counts[block]
+        qi = np.repeat(block, n)
+        # Offsets 0..n-1 within each query's candidate slice
+        offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        ti = lo[qi] + offsets
+        keep = t_end[ti] > q_start[qi]
+        q_parts.append(qi[keep])
+        t_parts.append(ti[keep])
+        first = last
+
+    if not q_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(q_parts), np.concatenate(t_parts)
+
+
+def interval_join(queries: pd.DataFrame, targets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins two interval tables on chromosome overlap of [start, end).
+
+    Both frames need chr, start and end columns. Returns a frame of
+    (query_idx, target_idx) positional index pairs, ordered by query.
+    """
+    q_chr = queries["chr"].astype(str).to_numpy()
+    t_chr = targets["chr"].astype(str).to_numpy()
+    q_start_all = queries["start"].to_numpy(dtype=np.int64)
+    q_end_all = queries["end"].to_numpy(dtype=np.int64)
+    t_start_all = targets["start"].to_numpy(dtype=np.int64)
+    t_end_all = targets["end"].to_numpy(dtype=np.int64)
+
+    q_out, t_out = [], []
+    for chrom in np.intersect1d(np.unique(q_chr), np.unique(t_chr)):
+        q_idx = np.flatnonzero(q_chr == chrom)
+        t_idx = np.flatnonzero(t_chr == chrom)
+        t_idx = t_idx[np.argsort(t_start_all[t_idx], kind="stable")]
+        qi, ti = _join_sorted(q_start_all[q_idx], q_end_all[q_idx], t_start_all[t_idx], t_end_all[t_idx])
+        q_out.append(q_idx[qi])
+        t_out.append(t_idx[ti])
+
+    if not q_out:
+        return pd.DataFrame({"query_idx": np.empty(0, dtype=np.int64), "target_idx": np.empty(0, dtype=np.int64)})
+    pairs = pd.DataFrame({"query_idx": np.concatenate(q_out), "target_idx": np.concatenate(t_out)})
+    return pairs.sort_values(["query_idx", "target_idx"], kind="stable").reset_index(drop=True)
+
+
+def nearest_tss(queries: pd.DataFrame, genes: pd.DataFrame,
+                max_distance: Optional[int] = None) -> pd.DataFrame:
+    """
+    Finds the closest TSS to each query interval by binary search over sorted TSS positions.
+
+    Returns query_idx, target_idx and distance (0 when the TSS lies inside the interval);
+    queries on chromosomes without genes, or farther than max_distance, are omitted.
+    """
+    q_chr = queries["chr"].astype(str).to_numpy()
+    g_chr = genes["chr"].astype(str).to_numpy()
+    q_start_all = queries["start"].to_numpy(dtype=np.int64)
+    q_end_all = queries["end"].to_numpy(dtype=np.int64)
+    tss_all = genes["tss"].to_numpy(dtype=np.int64)
+
+    rows = []
+    for chrom in np.intersect1d(np.unique(q_chr), np.unique(g_chr)):
+        q_idx = np.flatnonzero(q_chr == chrom)
+        g_idx = np.flatnonzero(g_chr == chrom)
+        g_idx = g_idx[np.argsort(tss_all[g_idx], kind="stable")]
+        tss = tss_all[g_idx]
+        q_start = q_start_all[q_idx]
+        q_end = q_end_all[q_idx]
+
+        # Nearest TSS at or after the interval start, and the one before it
+        right = np.minimum(np.searchsorted(tss, q_start, side="left"), len(tss) - 1)
+        left = np.maximum(right - 1, 0)
+        dist_right = np.maximum(tss[right] - (q_end - 1), 0) + np.maximum(q_start - tss[right], 0)
+        # Queries upstream of the first TSS have no left neighbour
+        has_left = (right > 0) & (tss[left] < q_start)
+        dist_left = np.where(has_left, q_start - tss[left], np.iinfo(np.int64).max)
+        pick = np.where(dist_left < dist_right, left, right)
+        dist = np.minimum(dist_left, dist_right)
+        rows.append(pd.DataFrame({"query_idx": q_idx, "target_idx": g_idx[pick], "distance": dist}))
+
+    if not rows:
+        return pd.DataFrame(columns=["query_idx", "target_idx", "distance"], dtype=np.int64)
+    result = pd.concat(rows, ignore_index=True)
+    if max_distance is not None:
+        result = result[result["distance"] <= max_distance]
+    return result.sort_values("query_idx", kind="stable").reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# CpG mapping
+# ---------------------------------------------------------------------------
+
+def map_cpgs_to_genes(cpg_df: pd.DataFrame, genes: pd.DataFrame,
+                      upstream: int = DEFAULT_UPSTREAM, downstream: int = DEFAULT_DOWNSTREAM,
+                      include_gene_body: bool = False, nearest_fallback: bool = True,
+                      max_distance: Optional[int] = None) -> pd.DataFrame:
+    """
+    Assigns genes to CpGs whose coordinates fall inside a TSS window.
+
+    Args:
+        cpg_df: Rows with 'cpg', 'chr', 'Start_hg38' and 'End_hg38'.
+        genes: Output of load_gene_annotation.
+        upstream, downstream: TSS window size in bp.
+        include_gene_body: Also count CpGs anywhere inside the transcript.
+        nearest_fallback: Give CpGs without a window hit the gene with the closest TSS.
+        max_distance: Cap, in bp, on the nearest-TSS fallback.
+
+    Returns:
+        The input columns plus 'unique_gene_name' (comma-separated, closest TSS first,
+        NaN when nothing was found), matching the PI mapping sheet.
+    """
+    cpgs = cpg_df[["cpg", "chr", "Start_hg38", "End_hg38"]].reset_index(drop=True)
+    queries = pd.DataFrame({
+        "chr": _normalize_chrom(cpgs["chr"]),
+        "start": pd.to_numeric(cpgs["Start_hg38"], errors="coerce").fillna(-1).astype(np.int64),
+        "end": pd.to_numeric(cpgs["End_hg38"], errors="coerce").fillna(-1).astype(np.int64),
+    })
+    # Treat single-base coordinates (start == end) as covering that base
+    queries["end"] = np.maximum(queries["end"], queries["start"] + 1)
+
+    windows = build_tss_windows(genes, upstream, downstream, include_gene_body)
+    pairs = interval_join(queries, windows)
+    tss = windows["tss"].to_numpy()[pairs["target_idx"].to_numpy()]
+    q_start = queries["start"].to_numpy()[pairs["query_idx"].to_numpy()]
+    q_end = queries["end"].to_numpy()[pairs["query_idx"].to_numpy()]
+    pairs["distance"] = np.maximum(tss - (q_end - 1), 0) + np.maximum(q_start - tss, 0)
+
+    if nearest_fallback:
+        missing = np.setdiff1d(np.arange(len(queries)), pairs["query_idx"].to_numpy())
+        if len(missing):
+            nearest = nearest_tss(queries.iloc[missing].reset_index(drop=True), genes, max_distance)
+            nearest["query_idx"] = missing[nearest["query_idx"].to_numpy()]
+            pairs = pd.concat([pairs, nearest], ignore_index=True)
+
+    # windows is row-aligned with genes, so window and fallback targets share one index space
+    pairs["gene"] = genes["gene"].to_numpy()[pairs["target_idx"].to_numpy()]
+    pairs = (pairs.sort_values(["query_idx", "distance", "gene"], kind="stable")
+                  .drop_duplicates(subset=["query_idx", "gene"]))
+    names = pairs.groupby("query_idx", sort=False)["gene"].agg(", ".join)
+
+    result = cpgs.copy()
+    result["unique_gene_name"] = names.reindex(np.arange(len(cpgs))).to_numpy()
+    logger.info("Mapped %d/%d CpGs to at least one gene", int(result["unique_gene_name"].notna().sum()), len(result))
+    return result[["cpg", "chr", "unique_gene_name", "Start_hg38", "End_hg38"]]
+
+
+def load_proximity_cpg_mappings(file_path: str = "ewas_res_groupsig_128.xlsx",
+                                annotation_path: str | Path = DEFAULT_GENE_ANNOTATION_PATH,
+                                **kwargs) -> pd.DataFrame:
+    """
+    Drop-in replacement for load_pi_cpg_mappings that derives genes from a local annotation.
+
+    Only the CpG coordinate columns of file_path are read; kwargs go to map_cpgs_to_genes.
+    """
+    cpgs = pd.read_excel(file_path, usecols=["cpg", "chr", "Start_hg38", "End_hg38"])
+    mapped = map_cpgs_to_genes(cpgs, load_gene_annotation(annotation_path), **kwargs)
+    return expand_cpg_gene_mappings(mapped)
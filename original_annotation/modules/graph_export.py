@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Streaming export of networkx graphs to node-link JSON, GraphML and GEXF."""
+
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Optional, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+# Elements written between flushes to the output file
+WRITE_BATCH = 10_000
+
+GEXF_VERSION = "1.3"
+
+
+def _plain(value: object) -> object:
+    """numpy scalars and other number-likes as built-in JSON/XML values."""
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _attr_types(items) -> dict[str, str]:
+    """Attribute name -> 'boolean' | 'long' | 'double' | 'string'; mixed long/double widen to double, other mixes to string."""
+    types: dict[str, str] = {}
+    for data in items:
+        for name, value in data.items():
+            value = _plain(value)
+            if isinstance(value, bool):
+                kind = "boolean"
+            elif isinstance(value, int):
+                kind = "long"
+            elif isinstance(value, float):
+                kind = "double"
+            else:
+                kind = "string"
+            if types.get(name, kind) != kind:
+                kind = "double" if {types[name], kind} == {"long", "double"} else "string"
+            types[name] = kind
+    return types
+
+
+def _xml_value(value: object) -> str:
+    value = _plain(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return escape(str(value))
+
+
+def _write_batched(f: TextIO, lines) -> None:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= WRITE_BATCH:
+            f.write("".join(batch))
+            batch.clear()
+    f.write("".join(batch))
+
+
+def _position(pos: Optional[dict], node) -> Optional[tuple[float, float]]:
+    if pos is None or node not in pos:
+        return None
+    x, y = pos[node]
+    return float(x), float(y)
+
+
+def write_node_link_json(G: nx.Graph, path: str | Path, pos: Optional[dict] = None) -> None:
+    """
+    Node-link JSON readable by nx.node_link_graph, with 'x'/'y' on each node when pos is given.
+    """
+    def node_lines():
+        for i, (node, data) in enumerate(G.nodes(data=True)):
+            record = {"id": _plain(node), **{k: _plain(v) for k, v in data.items()}}
+            xy = _position(pos, node)
+            if xy is not None:
+                record["x"], record["y"] = xy
+            yield ("" if i == 0 else ",\n") + json.dumps(record)
+
+    def edge_lines():
+        for i, (u, v, data) in enumerate(G.edges(data=True)):
+            record = {"source": _plain(u), "target": _plain(v), **{k: _plain(val) for k, val in data.items()}}
+            yield ("" if i == 0 else ",\n") + json.dumps(record)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"directed": %s, "multigraph": %s, "graph": %s,\n"nodes": [\n' % (
+            json.dumps(G.is_directed()), json.dumps(G.is_multigraph()),
+            json.dumps({k: _plain(v) for k, v in G.graph.items()})))
+        _write_batched(f, node_lines())
+        f.write('\n],\n"edges": [\n')
+        _write_batched(f, edge_lines())
+        f.write("\n]}\n")
+
+
+def write_graphml(G: nx.Graph, path: str | Path, pos: Optional[dict] = None) -> None:
+    """GraphML with typed <key> declarations; positions become node attributes 'x' and 'y'."""
+    node_types = _attr_types(data for _, data in G.nodes(data=True))
+    if pos is not None:
+        node_types.update({"x": "double", "y": "double"})
+    edge_types = _attr_types(data for _, _, data in G.edges(data=True))
+    node_keys = {name: f"n{i}" for i, name in enumerate(node_types)}
+    edge_keys = {name: f"e{i}" for i, name in enumerate(edge_types)}
+
+    def node_lines():
+        for node, data in G.nodes(data=True):
+            values = dict(data)
+            xy = _position(pos, node)
+            if xy is not None:
+                values["x"], values["y"] = xy
+            fields = "".join(f'<data key="{node_keys[k]}">{_xml_value(v)}</data>' for k, v in values.items())
+            yield f"    <node id={quoteattr(str(node))}>{fields}</node>\n"
+
+    def edge_lines():
+        for u, v, data in G.edges(data=True):
+            fields = "".join(f'<data key="{edge_keys[k]}">{_xml_value(val)}</data>' for k, val in data.items())
+            yield f"    <edge source={quoteattr(str(u))} target={quoteattr(str(v))}>{fields}</edge>\n"
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+                'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+        for name, kind in node_types.items():
+            f.write(f'  <key id="{node_keys[name]}" for="node" attr.name={quoteattr(name)} attr.type="{kind}"/>\n')
+        for name, kind in edge_types.items():
+            f.write(f'  <key id="{edge_keys[name]}" for="edge" attr.name={quoteattr(name)} attr.type="{kind}"/>\n')
+        edgedefault = "directed" if G.is_directed() else "undirected"
+        f.write(f'  <graph edgedefault="{edgedefault}">\n')
+        _write_batched(f, node_lines())
+        _write_batched(f, edge_lines())
+        f.write("  </graph>\n</graphml>\n")
+
+
+def write_gexf(G: nx.Graph, path: str | Path, pos: Optional[dict] = None) -> None:
+    """
+    GEXF 1.3 for Gephi: node 'label' becomes the GEXF label, edge 'weight' the edge weight,
+    other attributes are declared <attributes>, and positions go to <viz:position>.
+    """
+    node_types = {k: v for k, v in _attr_types(data for _, data in G.nodes(data=True)).items() if k != "label"}
+    edge_types = {k: v for k, v in _attr_types(data for _, _, data in G.edges(data=True)).items() if k != "weight"}
+    node_ids = {name: str(i) for i, name in enumerate(node_types)}
+    edge_ids = {name: str(i) for i, name in enumerate(edge_types)}
+
+    def attvalues(data, ids):
+        values = "".join(f'<attvalue for="{ids[k]}" value={quoteattr(str(_plain(v)))}/>'
+                         for k, v in data.items() if k in ids)
+        return f"<attvalues>{values}</attvalues>" if values else ""
+
+    def node_lines():
+        for node, data in G.nodes(data=True):
+            label = quoteattr(str(data.get("label", node)))
+            xy = _position(pos, node)
+            viz = f'<viz:position x="{xy[0]!r}" y="{xy[1]!r}" z="0.0"/>' if xy is not None else ""
+            yield f"      <node id={quoteattr(str(node))} label={label}>{attvalues(data, node_ids)}{viz}</node>\n"
+
+    def edge_lines():
+        for i, (u, v, data) in enumerate(G.edges(data=True)):
+            weight = f' weight="{float(_plain(data["weight"]))!r}"' if "weight" in data else ""
+            yield (f'      <edge id="{i}" source={quoteattr(str(u))} target={quoteattr(str(v))}{weight}>'
+                   f"{attvalues(data, edge_ids)}</edge>\n")
+
+    def declarations(cls, types, ids):
+        if not types:
+            return ""
+        rows = "".join(f'        <attribute id="{ids[k]}" title={quoteattr(k)} type="{kind}"/>\n'
+                       for k, kind in types.items())
+        return f'    <attributes class="{cls}">\n{rows}    </attributes>\n'
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<gexf xmlns="http://gexf.net/{GEXF_VERSION}" xmlns:viz="http://gexf.net/{GEXF_VERSION}/viz" '
+                f'version="{GEXF_VERSION}">\n')
+        edgetype = "directed" if G.is_directed() else "undirected"
+        f.write(f'  <graph defaultedgetype="{edgetype}" mode="static">\n')
+        f.write(declarations("node", node_types, node_ids))
+        f.write(declarations("edge", edge_types, edge_ids))
+        f.write("    <nodes>\n")
+        _write_batched(f, node_lines())
+        f.write("    </nodes>\n    <edges>\n")
+        _write_batched(f, edge_lines())
+        f.write("    </edges>\n  </graph>\n</gexf>\n")
+
+
+GRAPH_WRITERS: dict[str, Callable] = {
+    ".json": write_node_link_json,
+    ".graphml": write_graphml,
+    ".gexf": write_gexf,
+}
+
+
+def export_graph(G: nx.Graph, path: str | Path, pos: Optional[dict] = None) -> Path:
+    """
+    Writes G in the format given by the file suffix (.json, .graphml or .gexf).
+
+    Nodes and edges are streamed to disk in batches; no second copy of the graph
+    (node-link dict or XML tree) is built in memory.
+    """
+    path = Path(path)
+    writer = GRAPH_WRITERS.get(path.suffix.lower())
+    if writer is None:
+        raise ValueError(f"Unsupported graph export format {path.suffix!r}; use one of {sorted(GRAPH_WRITERS)}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    writer(G, tmp_path, pos)
+    tmp_path.replace(path)
+    logger.info("Exported %d nodes and %d edges to %s", G.number_of_nodes(), G.number_of_edges(), path)
+    return path
@@ -14,6 +14,8 @@ import pandas as pd
 import requests
 from requests.exceptions import ChunkedEncodingError, ContentDecodingError, ConnectionError
 
+from .http_metrics import METRICS, service_for_url
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -157,8 +159,10 @@ def fetch_harmonizome_associations_for_gene(
     text_payload: Optional[str] = None
     resp: Optional[requests.Response] = None
 
+    service = service_for_url(url)
     try:
-        resp = requests.get(url, params={"gene": gene_symbol}, timeout=timeout)
+        with METRICS.request(service) as call:
+            resp = call.response = requests.get(url, params={"gene": gene_symbol}, timeout=timeout)
         text_payload = resp.text
     except (ChunkedEncodingError, ContentDecodingError, ConnectionError) as exc:
         # Harmonizome sometimes closes chunked responses early (e.g., gene NTM),
@@ -169,13 +173,15 @@ def fetch_harmonizome_associations_for_gene(
             gene_symbol,
             exc,
         )
+        METRICS.retry(service)
         try:
             req = Request(f"{url}?{urlencode({'gene': gene_symbol})}")
-            with urlopen(req, timeout=timeout) as fh:  # type: ignore[arg-type]
+            with METRICS.request(service) as call, urlopen(req, timeout=timeout) as fh:  # type: ignore[arg-type]
                 try:
                     data = fh.read()
                 except IncompleteRead as ir_exc:
                     data = ir_exc.partial
+                call.status, call.n_bytes = fh.status, len(data)
                 text_payload = data.decode("utf-8", errors="replace")
         except Exception as exc2:
             logger.warning(
@@ -13,6 +13,8 @@ from typing import Dict, List, Optional
 import pandas as pd
 import requests
 
+from .http_metrics import METRICS
+
 
 NCBI_BASE = "https://api.ncbi.nlm.nih.gov/datasets/v2/gene"
 HGNC_BASE = "https://rest.genenames.org"
@@ -32,9 +34,12 @@ def _http_get_with_retries(
         label = "HGNC"
 
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            METRICS.retry(label)
         try:
             print(f"[{label}] GET {url} (attempt {attempt})")
-            resp = requests.get(url, headers=headers or {}, timeout=10)
+            with METRICS.request(label) as call:
+                resp = call.response = requests.get(url, headers=headers or {}, timeout=10)
             if resp.status_code == 200:
                 return resp.json()
             else:
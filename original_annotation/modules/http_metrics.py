@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Per-service HTTP telemetry shared by the upstream API helpers: counts, latency, bytes, retries, cache hits."""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; slower calls land in a final overflow bucket
+LATENCY_BUCKETS_S = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Service label per upstream host; anything else is reported under its host name
+SERVICE_BY_HOST = {
+    "api.ncbi.nlm.nih.gov": "NCBI",
+    "eutils.ncbi.nlm.nih.gov": "E-utilities",
+    "rest.genenames.org": "HGNC",
+    "rest.uniprot.org": "UniProt",
+    "maayanlab.cloud": "Harmonizome",
+    "api.genome.ucsc.edu": "UCSC",
+    "ngdc.cncb.ac.cn": "EWAS Atlas",
+}
+
+
+def service_for_url(url: str) -> str:
+    host = urlparse(url).netloc
+    return SERVICE_BY_HOST.get(host, host or "HTTP")
+
+
+def _bucket_labels() -> list[str]:
+    return [f"<={b:g}s" for b in LATENCY_BUCKETS_S] + [f">{LATENCY_BUCKETS_S[-1]:g}s"]
+
+
+@dataclass
+class ServiceStats:
+    """Running totals for one upstream service."""
+    requests: int = 0
+    errors: int = 0                 # no response at all (timeouts, resets, truncated bodies)
+    retries: int = 0
+    status_429: int = 0
+    status_5xx: int = 0
+    status_other: int = 0           # any other non-2xx response
+    bytes_received: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    latency_total_s: float = 0.0
+    latency_max_s: float = 0.0
+    latency_buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_S) + 1))
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (the observed max for the overflow bucket)."""
+        if self.requests == 0:
+            return None
+        rank = q * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_S, self.latency_buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.latency_max_s)
+        return self.latency_max_s
+
+    def as_dict(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "status_429": self.status_429,
+            "status_5xx": self.status_5xx,
+            "status_other": self.status_other,
+            "bytes_received": self.bytes_received,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": round(self.cache_hits / lookups, 3) if lookups else None,
+            "latency_total_s": round(self.latency_total_s, 3),
+            "latency_mean_s": round(self.latency_total_s / self.requests, 3) if self.requests else None,
+            "latency_p50_s": self.latency_quantile(0.5),
+            "latency_p95_s": self.latency_quantile(0.95),
+            "latency_max_s": round(self.latency_max_s, 3),
+            "latency_histogram": dict(zip(_bucket_labels(), self.latency_buckets)),
+        }
+
+
+@dataclass
+class RequestRecord:
+    """Filled in inside `with metrics.request(service) as call:`; set response (or status/n_bytes)."""
+    response: object = None
+    status: Optional[int] = None
+    n_bytes: Optional[int] = None
+
+
+class HttpMetrics:
+    """
+    Thread-safe registry of ServiceStats keyed by service name.
+
+    Helpers wrap each HTTP attempt in `with metrics.request(service) as call:` and
+    assign the response to call.response; an exception escaping the block counts as an error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._services: dict[str, ServiceStats] = {}
+
+    def _stats(self, service: str) -> ServiceStats:
+        if service not in self._services:
+            self._services[service] = ServiceStats()
+        return self._services[service]
+
+    @contextmanager
+    def request(self, service: str) -> Iterator[RequestRecord]:
+        call = RequestRecord()
+        t0 = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            self.observe(service, time.perf_counter() - t0, error=True)
+            raise
+        status, n_bytes = call.status, call.n_bytes
+        if call.response is not None:
+            status = call.response.status_code if status is None else status
+            n_bytes = len(call.response.content or b"") if n_bytes is None else n_bytes
+        self.observe(service, time.perf_counter() - t0, status=status, n_bytes=n_bytes or 0,
+                     error=status is None)
+
+    def observe(self, service: str, elapsed_s: float, status: Optional[int] = None,
+                n_bytes: int = 0, error: bool = False) -> None:
+        """Records one completed attempt."""
+        bucket = next((i for i, b in enumerate(LATENCY_BUCKETS_S) if elapsed_s <= b), len(LATENCY_BUCKETS_S))
+        with self._lock:
+            stats = self._stats(service)
+            stats.requests += 1
+            stats.latency_total_s += elapsed_s
+            stats.latency_max_s = max(stats.latency_max_s, elapsed_s)
+            stats.latency_buckets[bucket] += 1
+            stats.bytes_received += n_bytes
+            if error:
+                stats.errors += 1
+            elif status == 429:
+                stats.status_429 += 1
+            elif status is not None and status >= 500:
+                stats.status_5xx += 1
+            elif status is not None and not 200 <= status < 300:
+                stats.status_other += 1
+
+    def retry(self, service: str) -> None:
+        with self._lock:
+            self._stats(service).retries += 1
+
+    def cache_hit(self, service: str) -> None:
+        with self._lock:
+            self._stats(service).cache_hits += 1
+
+    def cache_miss(self, service: str) -> None:
+        with self._lock:
+            self._stats(service).cache_misses += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """{service: stats dict}, busiest service (by total latency) first."""
+        with self._lock:
+            services = sorted(self._services.items(), key=lambda kv: kv[1].latency_total_s, reverse=True)
+            return {name: stats.as_dict() for name, stats in services}
+
+    def write_json(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.write_text(json.dumps({
+            "latency_buckets_s": list(LATENCY_BUCKETS_S),
+            "services": self.snapshot(),
+        }, indent=2))
+        return path
+
+    def print_summary(self, prefix: str = "[HTTP]") -> None:
+        snapshot = self.snapshot()
+        if not snapshot:
+            print(f"{prefix} No HTTP requests recorded.")
+            return
+        print(f"{prefix} {'service':<14} {'reqs':>6} {'total s':>9} {'mean s':>7} {'p95 s':>7} {'max s':>7} "
+              f"{'MB':>8} {'retry':>6} {'429':>5} {'5xx':>5} {'err':>5} {'cache hit':>9}")
+        for name, s in snapshot.items():
+            mean, p95 = ("-" if v is None else f"{v:.2f}" for v in (s["latency_mean_s"], s["latency_p95_s"]))
+            hit_rate = "-" if s["cache_hit_rate"] is None else f"{s['cache_hit_rate']:.0%}"
+            print(f"{prefix} {name:<14} {s['requests']:>6} {s['latency_total_s']:>9.2f} {mean:>7} {p95:>7} "
+                  f"{s['latency_max_s']:>7.2f} {s['bytes_received'] / 1024 / 1024:>8.2f} {s['retries']:>6} "
+                  f"{s['status_429']:>5} {s['status_5xx']:>5} {s['errors']:>5} {hit_rate:>9}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._services.clear()
+
+
+# Process-wide registry used by the annotation modules
+METRICS = HttpMetrics()
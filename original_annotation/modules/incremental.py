@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Row-level change tracking for incremental living-file augmentation."""
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .living_store import recorded_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when the augmentation output changes shape, so old manifests force a full run
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_path: str | Path) -> Path:
+    """Sidecar manifest written next to the augmented file."""
+    return Path(f"{output_path}.manifest.json")
+
+
+def row_keys(df: pd.DataFrame, key_cols: list[str]) -> pd.Series:
+    """
+    One string key per row from key_cols, e.g. 'cg0001|GENE1'.
+
+    Repeated keys get an occurrence suffix ('#1', '#2', ...) so every row stays addressable.
+    """
+    parts = [df[c].astype("string").fillna("<NA>") for c in key_cols]
+    keys = parts[0].str.cat(parts[1:], sep="|") if len(parts) > 1 else parts[0]
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    keys = keys.where(occurrence == 0, keys + "#" + occurrence.astype(str))
+    return keys.reset_index(drop=True).astype(object)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit content hash per row over every column (names included, index ignored)."""
+    if df.empty:
+        return np.zeros(0, dtype=np.uint64)
+    frame = df.reset_index(drop=True)
+    frame.columns = [str(c) for c in frame.columns]
+    frame = frame[sorted(frame.columns)]
+    column_salt = pd.util.hash_pandas_object(pd.Series(frame.columns), index=False).to_numpy()
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashes ^ np.bitwise_xor.reduce(column_salt)
+
+
+def source_fingerprints(paths: dict[str, Optional[str | Path]]) -> dict[str, Optional[str]]:
+    """{name: content hash or None} for each input file that affects every row."""
+    return {name: recorded_hash(path) if path else None for name, path in paths.items()}
+
+
+@dataclass
+class RowDiff:
+    """Rows of the new base table to recompute, and how the previous output lines up with it."""
+    changed: np.ndarray                      # bool mask over the new rows
+    previous_rows: np.ndarray                # previous-output row for each unchanged new row, -1 if changed
+    removed: int = 0
+    reason: Optional[str] = None             # set when everything is recomputed
+
+    @property
+    def full(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def up_to_date(self) -> bool:
+        return not self.full and not self.changed.any() and self.removed == 0
+
+
+def read_manifest(path: str | Path) -> Optional[dict]:
+    """The manifest written by write_manifest, or None if missing, unreadable or from another version."""
+    try:
+        manifest = json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(path: str | Path, keys: pd.Series, hashes: np.ndarray,
+                   fingerprints: dict[str, Optional[str]]) -> Path:
+    """Records the key and base-row hash of every output row, in output order."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps({
+        "version": MANIFEST_VERSION,
+        "sources": fingerprints,
+        "keys": list(keys),
+        "hashes": [format(int(h), "016x") for h in hashes],
+    }))
+    tmp_path.replace(path)
+    return path
+
+
+def diff_rows(keys: pd.Series, hashes: np.ndarray, manifest: Optional[dict],
+              fingerprints: dict[str, Optional[str]], previous_len: Optional[int]) -> RowDiff:
+    """
+    Compares the new base rows against the manifest of the previous output.
+
+    A row is unchanged when its key was present before with the same hash. Everything
+    is recomputed when there is no usable manifest or previous output, or when a
+    run input (Atlas table, DisGeNET export, enrichment stages) has changed since the last run.
+    """
+    n = len(keys)
+
+    def full(reason: str) -> RowDiff:
+        return RowDiff(np.ones(n, dtype=bool), np.full(n, -1), reason=reason)
+
+    if manifest is None:
+        return full("no previous manifest")
+    if previous_len is None:
+        return full("no previous output")
+    if previous_len != len(manifest["keys"]):
+        return full("previous output does not match its manifest")
+    if manifest.get("sources") != fingerprints:
+        changed_sources = sorted(k for k in set(fingerprints) | set(manifest.get("sources", {}))
+                                 if fingerprints.get(k) != manifest.get("sources", {}).get(k))
+        return full(f"inputs changed: {', '.join(changed_sources)}")
+
+    previous = pd.Series(np.arange(previous_len), index=pd.Index(manifest["keys"], dtype=object))
+    previous_hashes = np.array([int(h, 16) for h in manifest["hashes"]], dtype=np.uint64)
+
+    position = previous.reindex(pd.Index(keys, dtype=object)).fillna(-1).astype(np.int64).to_numpy()
+    found = position >= 0
+    same = np.zeros(n, dtype=bool)
+    same[found] = previous_hashes[position[found]] == hashes[found]
+
+    return RowDiff(~same, np.where(same, position, -1), removed=previous_len - int(found.sum()))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Read and write the living annotation table in a columnar format (Parquet/Arrow)."""
+
+import hashlib
+import json
+import logging
+from importlib import util as importlib_util
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Canonical living files; .xlsx versions are export-only products
+LIVING_FILE_PATH = "annotated_genes.parquet"
+AUGMENTED_FILE_PATH = "annotated_genes_augmented.parquet"
+
+COLUMNAR_SUFFIXES = (".parquet", ".feather", ".arrow")
+EXCEL_SUFFIXES = (".xlsx", ".xls")
+
+
+def has_columnar_engine() -> bool:
+    """True when pyarrow is importable (needed for Parquet and Feather/Arrow files)."""
+    return importlib_util.find_spec("pyarrow") is not None
+
+
+def resolve_store_path(path: str | Path) -> Path:
+    """
+    Returns the path actually used for a living file.
+
+    Columnar paths fall back to a .csv sibling when pyarrow is not installed,
+    so the pipeline still runs (slower) without the optional dependency.
+    """
+    path = Path(path)
+    if path.suffix.lower() in COLUMNAR_SUFFIXES and not has_columnar_engine():
+        fallback = path.with_suffix(".csv")
+        print(f"[STORE] Warning: pyarrow not installed; using {fallback} instead of {path}. "
+              "Install `pyarrow` for fast columnar storage.")
+        return fallback
+    return path
+
+
+def _uniform_value(value: object) -> object:
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(list(value) if isinstance(value, tuple) else value)
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+def coerce_mixed_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Makes object columns writable by Arrow (and readable back from CSV/Excel).
+
+    Columns mixing value types (e.g. numbers and strings from Excel, or list-valued
+    synonyms next to strings) become strings, with lists and dicts JSON-encoded.
+    Uniform columns are left untouched.
+    """
+    out = df.copy()
+    out.columns = [str(c) for c in out.columns]
+    for col in out.columns[out.dtypes.eq(object)]:
+        non_null = out[col].dropna()
+        kinds = set(non_null.map(type))
+        if len(kinds) > 1 or kinds & {list, tuple, dict}:
+            out[col] = out[col].map(_uniform_value).astype(object)
+    return out
+
+
+def read_living_file(path: str | Path = LIVING_FILE_PATH) -> pd.DataFrame:
+    """
+    Loads a living annotation table, choosing the reader from the file suffix.
+
+    If a columnar path does not exist yet but an .xlsx file with the same stem does,
+    the workbook is loaded once and migrated to the columnar path.
+    """
+    path = resolve_store_path(path)
+    suffix = path.suffix.lower()
+
+    if not path.is_file():
+        legacy = path.with_suffix(".xlsx")
+        if suffix not in EXCEL_SUFFIXES and legacy.is_file():
+            print(f"[STORE] {path} not found; migrating living file from {legacy}...")
+            df = pd.read_excel(legacy)
+            write_living_file(df, path)
+            return df
+        raise FileNotFoundError(f"Living file not found: {path}")
+
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix in (".feather", ".arrow"):
+        return pd.read_feather(path)
+    if suffix in EXCEL_SUFFIXES:
+        return pd.read_excel(path)
+    if suffix in (".tsv", ".txt"):
+        return pd.read_csv(path, sep="\t", low_memory=False)
+    return pd.read_csv(path, low_memory=False)
+
+
+def write_living_file(df: pd.DataFrame, path: str | Path = LIVING_FILE_PATH) -> Path:
+    """
+    Writes a living annotation table, choosing the writer from the file suffix.
+
+    Returns the path written (which differs from path when falling back to CSV).
+    """
+    path = resolve_store_path(path)
+    suffix = path.suffix.lower()
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    out = coerce_mixed_columns(df)
+    if suffix == ".parquet":
+        out.to_parquet(tmp_path, index=False)
+    elif suffix in (".feather", ".arrow"):
+        out.reset_index(drop=True).to_feather(tmp_path)
+    elif suffix in EXCEL_SUFFIXES:
+        out.to_excel(tmp_path, index=False, engine="openpyxl")
+    elif suffix in (".tsv", ".txt"):
+        out.to_csv(tmp_path, sep="\t", index=False)
+    else:
+        out.to_csv(tmp_path, index=False)
+
+    # Replace in one step so an interrupted write never leaves a truncated living file
+    tmp_path.replace(path)
+    logger.info("Wrote %d rows x %d columns to %s", len(df), df.shape[1], path)
+    return path
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def recorded_hash(path: str | Path) -> Optional[str]:
+    """
+    Content hash of path, taken from its .sha256 sidecar when size and mtime still match.
+
+    Falls back to hashing the file itself; returns None if path does not exist.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    stat = path.stat()
+    sidecar = Path(f"{path}.sha256")
+    try:
+        meta = json.loads(sidecar.read_text())
+        if meta.get("size") == stat.st_size and meta.get("mtime_ns") == stat.st_mtime_ns:
+            return meta["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return _file_sha256(path)
+
+
+def _record_hash(path: Path, sha256: str) -> None:
+    stat = path.stat()
+    Path(f"{path}.sha256").write_text(json.dumps({
+        "sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+    }))
+
+
+def write_csv_if_changed(df: pd.DataFrame, path: str | Path) -> bool:
+    """
+    Writes df as CSV only when the serialized content differs from what is on disk.
+
+    The content hash is recorded in a '<path>.sha256' sidecar so unchanged runs
+    neither rewrite the file nor touch its mtime. Returns True if the file was written.
+    """
+    path = Path(path)
+    payload = df.to_csv(index=False).encode("utf-8")
+    sha256 = hashlib.sha256(payload).hexdigest()
+
+    if recorded_hash(path) == sha256:
+        if not Path(f"{path}.sha256").is_file():
+            _record_hash(path, sha256)
+        return False
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(payload)
+    tmp_path.replace(path)
+    _record_hash(path, sha256)
+    return True
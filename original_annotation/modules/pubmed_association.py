@@ -13,6 +13,9 @@ import requests
 import pandas as pd
 from xml.etree import ElementTree as ET
 
+from .associations import make_associations
+from .http_metrics import METRICS, service_for_url
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -174,15 +177,19 @@ def _eutils_get(
         "Accept-Encoding": "identity",   # disable gzip/chunked compression to reduce truncation errors
     }
 
+    service = service_for_url(url)
     last_exc: Optional[Exception] = None
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            METRICS.retry(service)
         try:
-            resp = requests.get(
-                url,
-                params=merged_params,
-                headers=headers,
-                timeout=45,
-            )
+            with METRICS.request(service) as call:
+                resp = call.response = requests.get(
+                    url,
+                    params=merged_params,
+                    headers=headers,
+                    timeout=45,
+                )
             logger.info(
                 "[PUBMED] %s -> status %s (%d chars)",
                 endpoint,
@@ -194,7 +201,7 @@ def _eutils_get(
             return resp.text
         except (
             requests.exceptions.ChunkedEncodingError,
-            requests.exceptions.ProtocolError,
+            requests.exceptions.ConnectionError,  # wraps urllib3's ProtocolError (connection dropped mid-response)
         ) as exc:
             last_exc = exc
             logger.warning(
@@ -692,7 +699,8 @@ def annotate_df_with_psych_literature(
     max_pmids_per_gene: int = 500,
     mental_health_mesh_terms: Optional[Iterable[str]] = None,
     mental_health_text_terms: Optional[Iterable[str]] = None,
-) -> pd.DataFrame:
+    return_associations: bool = False,
+):
     """
     Main entry point: annotate a DataFrame of genes with columns describing
     their mental-health-related PubMed hits.
@@ -730,11 +738,15 @@ def annotate_df_with_psych_literature(
         Override default MeSH terms for mental health.
     mental_health_text_terms : iterable of str, optional
         Override default text terms.
+    return_associations : bool
+        Also return a long-form association table with one row per
+        (gene, matched term, PMID); detail holds the genetic label.
 
     Returns
     -------
-    pd.DataFrame
-        Copy of df with appended annotation columns.
+    pd.DataFrame or (pd.DataFrame, pd.DataFrame)
+        Copy of df with appended annotation columns, plus the association
+        table when return_associations is True.
     """
     mesh_terms = list(mental_health_mesh_terms or DEFAULT_MENTAL_HEALTH_MESH_TERMS)
     text_terms = list(mental_health_text_terms or DEFAULT_MENTAL_HEALTH_TEXT_TERMS)
@@ -747,10 +759,13 @@ def annotate_df_with_psych_literature(
     df["pubmed_pmids"] = ["" for _ in range(len(df))]
     df["pubmed_terms"] = ["" for _ in range(len(df))]
     df["pubmed_brief"] = ["" for _ in range(len(df))]
+    assoc_rows: List[Tuple[str, str, str, str]] = []
 
     total_genes = len(df)
     for idx, row in df.iterrows():
         gene_symbol = row.get(gene_symbol_col)
+        if pd.isna(gene_symbol):
+            gene_symbol = None
         entrez_val = row.get(entrez_col)
         logger.info("[PUBMED] (%d/%d) Annotating %s", idx + 1, total_genes, gene_symbol or "<no symbol>")
 
@@ -784,6 +799,9 @@ def annotate_df_with_psych_literature(
             if is_mh:
                 mh_records.append(rec)
                 combined_terms.extend(matched_terms)
+                genetic_label = "Genetic" if rec.is_genetic else "Not Genetic"
+                for term in dict.fromkeys(matched_terms):
+                    assoc_rows.append((gene_symbol, term, rec.pmid, genetic_label))
 
         if not mh_records:
             logger.info("[PUBMED] -> No mental-health hits for %s", gene_symbol or "<no symbol>")
@@ -814,5 +832,8 @@ def annotate_df_with_psych_literature(
             gene_symbol or "<no symbol>",
         )
 
+    if return_associations:
+        genes, terms, pmids, labels = zip(*assoc_rows) if assoc_rows else ((), (), (), ())
+        return df, make_associations(genes, "pubmed", terms, pmid=pmids, detail=labels)
     return df
 
@@ -1,101 +1,220 @@
 import pandas as pd
-import re
 from datetime import datetime
 
-def generate_summary_report(df: pd.DataFrame, output_path: str = "summary_report.md"):
+from .associations import SOURCE_BY_COLUMN, parse_associations, select_associations, split_association_entries
+
+# Minimum DisGeNET score for a psychiatric association to count as a hit
+PSYCH_MIN_SCORE = 0.3
+
+# Rows per ranked table
+DEFAULT_TOP_K = 10
+
+# Sections in output order; generate_summary_report(sections=...) takes any subset
+DEFAULT_REPORT_SECTIONS = (
+    "psych_hits",
+    "atlas_clusters",
+    "source_hits",
+    "disease_gene_counts",
+    "cpg_trait_density",
+    "interpretation",
+)
+
+def _score_text(score) -> str:
+    # str() of a numpy float32 gives its short repr ('0.7'); f-strings would widen it first
+    return str(score)
+
+def _psych_hits(df: pd.DataFrame, associations: pd.DataFrame, genes) -> pd.DataFrame:
+    """All psychiatric DisGeNET hits at or above PSYCH_MIN_SCORE as Gene/Disease/Score."""
+    psych = select_associations(associations, 'disgenet_psych', genes=genes)
+    if psych is not None:
+        hits = pd.DataFrame({'Gene': psych['gene'].astype(object), 'Disease': psych['term'].astype(object),
+                             'Score': psych['score']})
+    elif 'disgenet_psych_diseases' in df.columns:
+        parsed = parse_associations(df, 'disgenet_psych_diseases', gene_col='symbol')
+        hits = pd.DataFrame({'Gene': parsed['gene'].astype(object) if 'symbol' in df.columns else 'Unknown',
+                             'Disease': parsed['disease'].astype(object), 'Score': parsed['score']})
+    else:
+        return pd.DataFrame(columns=['Gene', 'Disease', 'Score'])
+    return hits[hits['Score'] >= PSYCH_MIN_SCORE].reset_index(drop=True)
+
+def _atlas_entries(df: pd.DataFrame, associations: pd.DataFrame, genes) -> pd.DataFrame:
     """
-    Generates a summary report highlighting top gene-disease associations.
+    One row per Atlas trait with 'key' numbering the trait clusters in order of appearance:
+    (gene, CpG) groups from the association table, or rows of the ewas_atlas_traits column.
     """
-    
-    # 1. Analyze Top Psychiatric Hits
-    psych_hits = []
-    if 'disgenet_psych_diseases' in df.columns:
-        for _, row in df.iterrows():
-            gene = row.get('symbol', 'Unknown')
-            assoc_str = row['disgenet_psych_diseases']
-            
-            if pd.isna(assoc_str) or assoc_str == 'n/a':
-                continue
-                
-            parts = re.split(r';\n|;', assoc_str)
-            for part in parts:
-                if ',' in part:
-                    try:
-                        disease, score_str = part.rsplit(',', 1)
-                        score = float(score_str.strip())
-                        if score >= 0.3: # Filter for significance in report
-                            psych_hits.append({
-                                'Gene': gene,
-                                'Disease': disease.strip(),
-                                'Score': score
-                            })
-                    except (ValueError, TypeError):
-                        continue
-    
-    # Sort by score descending
-    psych_hits.sort(key=lambda x: x['Score'], reverse=True)
-    top_psych_hits = psych_hits[:10] # Top 10
-
-    # 2. Analyze Top EWAS Atlas Hits (based on frequency?)
-    # Since Atlas doesn't have a score in the same way, we can list genes with most traits?
-    atlas_hits = []
+    atlas = select_associations(associations, 'ewas_atlas', genes=genes)
+    if atlas is not None:
+        atlas = atlas.dropna(subset=['gene', 'cpg'])
+        return pd.DataFrame({
+            'key': atlas.groupby(['gene', 'cpg'], sort=False).ngroup().to_numpy(),
+            'gene': atlas['gene'].astype(object).to_numpy(),
+            'cpg': atlas['cpg'].astype(object).to_numpy(),
+            'trait': atlas['term'].astype(object).to_numpy(),
+        })
     if 'ewas_atlas_traits' in df.columns:
-        for _, row in df.iterrows():
-            gene = row.get('symbol', 'Unknown')
-            traits_str = row['ewas_atlas_traits']
-            if pd.isna(traits_str) or traits_str == 'n/a':
-                continue
-            
-            traits = [t.strip() for t in re.split(r';\n|;', traits_str) if t.strip()]
-            if traits:
-                atlas_hits.append({
-                    'Gene': gene,
-                    'Trait_Count': len(traits),
-                    'Traits': ", ".join(traits[:3]) + ("..." if len(traits) > 3 else "")
-                })
-    
-    atlas_hits.sort(key=lambda x: x['Trait_Count'], reverse=True)
-    top_atlas_hits = atlas_hits[:10]
-
-    # 3. Generate Markdown Content
+        traits = split_association_entries(df['ewas_atlas_traits'])
+        rows = traits.index.to_numpy()
+        symbols = df['symbol'].to_numpy(dtype=object)[rows] if 'symbol' in df.columns else 'Unknown'
+        cpgs = df['cpg'].to_numpy(dtype=object)[rows] if 'cpg' in df.columns else None
+        return pd.DataFrame({'key': rows, 'gene': symbols, 'cpg': cpgs, 'trait': traits.to_numpy(dtype=object)})
+    return pd.DataFrame(columns=['key', 'gene', 'cpg', 'trait'])
+
+def _scored_sources(df: pd.DataFrame, associations: pd.DataFrame, genes) -> dict:
+    """
+    {source: Gene/Term/Score frame} for every scored association source available.
+    Psychiatric hits are held to PSYCH_MIN_SCORE here too, so all sections agree.
+    """
+    sources = {}
+    if associations is not None:
+        for source in associations['source'].dropna().unique():
+            selected = select_associations(associations, source, genes=genes).dropna(subset=['score'])
+            if not selected.empty:
+                sources[source] = pd.DataFrame({'Gene': selected['gene'].astype(object),
+                                                'Term': selected['term'].astype(object),
+                                                'Score': selected['score']})
+    # Columns in "Name, Score" form, for sources the table does not cover
+    for col in ('disgenet_psych_diseases', 'disgenet_disease', 'disgenet_diseases'):
+        source = SOURCE_BY_COLUMN[col]
+        if col in df.columns and source not in sources:
+            parsed = parse_associations(df, col, gene_col='symbol')
+            if not parsed.empty:
+                sources[source] = pd.DataFrame({'Gene': parsed['gene'].astype(object),
+                                                'Term': parsed['disease'].astype(object),
+                                                'Score': parsed['score']})
+    if 'disgenet_psych' in sources:
+        psych = sources['disgenet_psych']
+        sources['disgenet_psych'] = psych[psych['Score'] >= PSYCH_MIN_SCORE].reset_index(drop=True)
+    return sources
+
+def _section_psych_hits(data: dict, top_k: int) -> list:
+    top = data['psych'].nlargest(top_k, 'Score', keep='first')
+    lines = ["## Top Psychiatric Associations (DisGeNET)",
+             f"Genes with the strongest evidence for psychiatric disorders (Score >= {PSYCH_MIN_SCORE}):",
+             "| Gene | Disease | Score |",
+             "|---|---|---|"]
+    if top.empty:
+        lines.append("| None | No significant hits found | - |")
+    for gene, disease, score in zip(top['Gene'], top['Disease'], top['Score'].to_numpy()):
+        lines.append(f"| {gene} | {disease} | {_score_text(score)} |")
+    lines.append("\n")
+    return lines
+
+def _section_atlas_clusters(data: dict, top_k: int) -> list:
+    atlas = data['atlas']
+    counts = atlas.groupby('key', sort=True).size()
+    top = counts.nlargest(top_k, keep='first')
+    lines = ["## Top Epigenetic Trait Clusters (EWAS Atlas)",
+             "Genes with the highest number of associated traits in EWAS studies:",
+             "| Gene | Trait Count | Top Traits |",
+             "|---|---|---|"]
+    if top.empty:
+        lines.append("| None | No Atlas data found | - |")
+    else:
+        # Only the selected clusters are joined into strings
+        selected = atlas[atlas['key'].isin(top.index)]
+        first_traits = selected.groupby('key', sort=False)['trait'].apply(lambda t: ", ".join(t.iloc[:3]))
+        genes = selected.groupby('key', sort=False)['gene'].first()
+        for key, count in top.items():
+            lines.append(f"| {genes[key]} | {count} | {first_traits[key] + ('...' if count > 3 else '')} |")
+    lines.append("\n")
+    return lines
+
+def _section_source_hits(data: dict, top_k: int) -> list:
+    lines = ["## Top Associations by Source",
+             f"Highest-scoring associations per source (top {top_k}):"]
+    if not data['sources']:
+        lines.append("\nNo scored association sources found.")
+    for source, hits in data['sources'].items():
+        top = hits.nlargest(top_k, 'Score', keep='first')
+        lines += [f"\n### {source} ({len(hits)} associations)", "| Gene | Term | Score |", "|---|---|---|"]
+        for gene, term, score in zip(top['Gene'], top['Term'], top['Score'].to_numpy()):
+            lines.append(f"| {gene} | {term} | {_score_text(score)} |")
+    lines.append("\n")
+    return lines
+
+def _section_disease_gene_counts(data: dict, top_k: int) -> list:
+    lines = ["## Diseases with the Most Associated Genes (DisGeNET)"]
+    source = next((s for s in ('disgenet', 'disgenet_psych') if s in data['sources']), None)
+    if source is None:
+        lines += ["No DisGeNET associations found.", "\n"]
+        return lines
+    hits = data['sources'][source]
+    per_disease = hits.groupby('Term', sort=True).agg(Genes=('Gene', 'nunique'), Mean_Score=('Score', 'mean'))
+    top = per_disease.nlargest(top_k, 'Genes', keep='first')
+    lines += [f"Source: {source}", "| Disease | Genes | Mean Score |", "|---|---|---|"]
+    for disease, genes, mean_score in zip(top.index, top['Genes'], top['Mean_Score']):
+        lines.append(f"| {disease} | {genes} | {mean_score:.3f} |")
+    lines.append("\n")
+    return lines
+
+def _section_cpg_trait_density(data: dict, top_k: int) -> list:
+    lines = ["## CpG Trait Density (EWAS Atlas)"]
+    atlas = data['atlas'].dropna(subset=['cpg'])
+    if atlas.empty:
+        lines += ["No CpG-level Atlas data found.", "\n"]
+        return lines
+    per_cpg = atlas.groupby('cpg', sort=True).agg(Traits=('trait', 'nunique'))
+    top = per_cpg.nlargest(top_k, 'Traits', keep='first')
+    genes = (atlas[atlas['cpg'].isin(top.index)].dropna(subset=['gene'])
+             .groupby('cpg')['gene'].apply(lambda g: ", ".join(dict.fromkeys(map(str, g)))))
+    lines += ["CpGs with the most distinct EWAS Atlas traits:", "| CpG | Traits | Genes |", "|---|---|---|"]
+    for cpg, traits in top['Traits'].items():
+        lines.append(f"| {cpg} | {traits} | {genes.get(cpg, '-')} |")
+    lines.append("\n")
+    return lines
+
+def _section_interpretation(data: dict, top_k: int) -> list:
+    psych = data['psych']
+    lines = ["## Interpretation",
+             f"Identified {len(psych)} significant psychiatric gene-disease associations."]
+    if not psych.empty:
+        top = psych.nlargest(1, 'Score', keep='first').iloc[0]
+        lines.append(f"The strongest signal is observed for **{top['Gene']}** in association with **{top['Disease']}**.")
+    return lines
+
+REPORT_SECTIONS = {
+    "psych_hits": _section_psych_hits,
+    "atlas_clusters": _section_atlas_clusters,
+    "source_hits": _section_source_hits,
+    "disease_gene_counts": _section_disease_gene_counts,
+    "cpg_trait_density": _section_cpg_trait_density,
+    "interpretation": _section_interpretation,
+}
+
+def generate_summary_report(df: pd.DataFrame, output_path: str = "summary_report.md",
+                            associations: pd.DataFrame = None,
+                            top_k: int = DEFAULT_TOP_K,
+                            sections: tuple = DEFAULT_REPORT_SECTIONS):
+    """
+    Generates a summary report highlighting top gene-disease associations.
+    Reads the tidy association table when given instead of re-parsing the string columns.
+
+    Each ranked table shows top_k rows, selected with nlargest (ties keep input order).
+    sections picks and orders the report sections; see REPORT_SECTIONS.
+    """
+    unknown = [s for s in sections if s not in REPORT_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown report sections {unknown}; choose from {list(REPORT_SECTIONS)}")
+
+    genes = df['symbol'] if 'symbol' in df.columns else None
+    data = {
+        'psych': _psych_hits(df, associations, genes),
+        'atlas': _atlas_entries(df, associations, genes),
+        'sources': _scored_sources(df, associations, genes) if {'source_hits', 'disease_gene_counts'} & set(sections) else {},
+    }
+
     lines = []
     lines.append(f"# Psychiatric Epigenetics Discovery Report")
     lines.append(f"**Date:** {datetime.now().strftime('%Y-%m-%d')}\n")
-    
+
     lines.append("## Executive Summary")
     lines.append("This report synthesizes key findings from the annotated gene list, highlighting significant psychiatric disease associations and epigenetic trait overlaps.\n")
-    
-    lines.append("## Top Psychiatric Associations (DisGeNET)")
-    lines.append("Genes with the strongest evidence for psychiatric disorders (Score >= 0.3):")
-    lines.append("| Gene | Disease | Score |")
-    lines.append("|---|---|---|")
-    if top_psych_hits:
-        for hit in top_psych_hits:
-            lines.append(f"| {hit['Gene']} | {hit['Disease']} | {hit['Score']} |")
-    else:
-        lines.append("| None | No significant hits found | - |")
-    lines.append("\n")
-    
-    lines.append("## Top Epigenetic Trait Clusters (EWAS Atlas)")
-    lines.append("Genes with the highest number of associated traits in EWAS studies:")
-    lines.append("| Gene | Trait Count | Top Traits |")
-    lines.append("|---|---|---|")
-    if top_atlas_hits:
-        for hit in top_atlas_hits:
-            lines.append(f"| {hit['Gene']} | {hit['Trait_Count']} | {hit['Traits']} |")
-    else:
-        lines.append("| None | No Atlas data found | - |")
-    lines.append("\n")
-    
-    lines.append("## Interpretation")
-    lines.append(f"Identified {len(psych_hits)} significant psychiatric gene-disease associations.")
-    if top_psych_hits:
-        top_gene = top_psych_hits[0]['Gene']
-        top_disease = top_psych_hits[0]['Disease']
-        lines.append(f"The strongest signal is observed for **{top_gene}** in association with **{top_disease}**.")
-    
+
+    for section in sections:
+        lines += REPORT_SECTIONS[section](data, top_k)
+
     # Write to file
     with open(output_path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
-    
-    print(f"[REPORT] Summary report written to: {output_path}")
\ No newline at end of file
+
+    print(f"[REPORT] Summary report written to: {output_path}")
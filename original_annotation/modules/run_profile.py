@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Per-stage wall time, CPU time, peak memory and row counts, written as a JSON run report."""
+
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from importlib import util as importlib_util
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Allocation sites listed per stage when tracemalloc is on
+TOP_ALLOCATIONS = 5
+
+_MB = 1024 * 1024
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Peak resident set size of this process so far.
+
+    Uses getrusage where available (kB on Linux, bytes on macOS) and psutil's peak
+    working set on Windows; None when neither is available.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak if sys.platform == "darwin" else peak * 1024)
+    if importlib_util.find_spec("psutil") is not None:
+        import psutil
+        info = psutil.Process().memory_info()
+        return int(getattr(info, "peak_wset", info.rss))
+    return None
+
+
+def _row_count(rows) -> Optional[int]:
+    if rows is None:
+        return None
+    return rows if isinstance(rows, int) else len(rows)
+
+
+def _mb(n_bytes: Optional[int]) -> Optional[float]:
+    return None if n_bytes is None else round(n_bytes / _MB, 1)
+
+
+@dataclass
+class StageRecord:
+    """Measurements for one pipeline stage; set rows_out inside the with-block."""
+    name: str
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    peak_rss_delta_mb: Optional[float] = None     # growth of the process high-water mark during the stage
+    traced_peak_mb: Optional[float] = None        # Python allocations at their peak within the stage
+    top_allocations: list[dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class RunProfiler:
+    """
+    Collects a StageRecord per `with profiler.stage(name, rows_in=df) as stage:` block.
+
+    With trace_allocations, tracemalloc runs for the whole run and each stage lists
+    the source lines whose live allocations grew the most. When report_path is set, the
+    JSON report is rewritten after every stage, so a run that crashes still leaves one.
+    """
+
+    def __init__(self, report_path: Optional[str | Path] = None, trace_allocations: bool = True,
+                 top_allocations: int = TOP_ALLOCATIONS):
+        self.report_path = Path(report_path) if report_path else None
+        self.trace_allocations = trace_allocations
+        self.top_allocations = top_allocations
+        self.stages: list[StageRecord] = []
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._started_tracing = False
+
+    def _start_tracing(self) -> None:
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name: str, rows_in=None) -> Iterator[StageRecord]:
+        """Times the block; rows_in (and stage.rows_out) take a row count or anything with len()."""
+        self._start_tracing()
+        record = StageRecord(name, rows_in=_row_count(rows_in))
+        rss_before = peak_rss_bytes()
+        snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            snapshot = tracemalloc.take_snapshot()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except BaseException as exc:
+            record.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            record.wall_s = round(time.perf_counter() - t0, 3)
+            record.cpu_s = round(time.process_time() - cpu0, 3)
+            record.rows_out = _row_count(record.rows_out)
+            rss_after = peak_rss_bytes()
+            record.peak_rss_mb = _mb(rss_after)
+            if rss_before is not None and rss_after is not None:
+                record.peak_rss_delta_mb = _mb(rss_after - rss_before)
+            if snapshot is not None and tracemalloc.is_tracing():
+                record.traced_peak_mb = _mb(tracemalloc.get_traced_memory()[1])
+                record.top_allocations = self._top_allocations(snapshot)
+            self.stages.append(record)
+            logger.info("Stage %s: %.2fs wall, %.2fs CPU, peak RSS %s MB",
+                        name, record.wall_s, record.cpu_s, record.peak_rss_mb)
+            if self.report_path is not None:
+                self.write_report()
+
+    def _top_allocations(self, before: tracemalloc.Snapshot) -> list[dict]:
+        after = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        diffs = after.compare_to(before, "lineno")[:self.top_allocations]
+        return [{"where": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                 "size_diff_kb": round(d.size_diff / 1024, 1), "count_diff": d.count_diff}
+                for d in diffs if d.size_diff > 0]
+
+    def report(self) -> dict:
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "trace_allocations": self.trace_allocations,
+            "total_wall_s": round(time.perf_counter() - self._t0, 3),
+            "total_cpu_s": round(time.process_time() - self._cpu0, 3),
+            "peak_rss_mb": _mb(peak_rss_bytes()),
+            "stages": [asdict(s) for s in self.stages],
+        }
+
+    def write_report(self, path: Optional[str | Path] = None) -> Path:
+        """Writes the JSON run report (to report_path unless path is given)."""
+        path = Path(path) if path else self.report_path
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(json.dumps(self.report(), indent=2))
+        tmp_path.replace(path)
+        return path
+
+    def print_summary(self, prefix: str = "[PROFILE]") -> None:
+        print(f"{prefix} {'stage':<28} {'wall s':>8} {'cpu s':>8} {'peak MB':>9} {'+MB':>7} {'rows in':>9} {'rows out':>9}")
+        for s in self.stages:
+            cells = [s.peak_rss_mb, s.peak_rss_delta_mb, s.rows_in, s.rows_out]
+            peak, delta, rows_in, rows_out = ("-" if v is None else v for v in cells)
+            print(f"{prefix} {s.name:<28} {s.wall_s:>8.2f} {s.cpu_s:>8.2f} {peak:>9} {delta:>7} {rows_in:>9} {rows_out:>9}"
+                  + (f"  FAILED: {s.error}" if s.error else ""))
+
+    def close(self) -> None:
+        """Stops tracemalloc if this profiler started it."""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
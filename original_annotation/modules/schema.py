@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+"""Column dtypes for the large annotation tables, applied when they are loaded."""
+
+import logging
+from pathlib import Path
+from typing import Mapping
+
+import pandas as pd
+
+from .living_store import has_columnar_engine
+
+logger = logging.getLogger(__name__)
+
+# Free text: Arrow-backed strings when pyarrow is installed
+TEXT = "string[pyarrow]" if has_columnar_engine() else "string"
+
+# Gene table (main.py gene_db and the living/augmented files); raw and deliverable names
+GENE_TABLE_DTYPES = {
+    "chr": "category",
+    "cpg_chr": "category",
+    "Start_hg38": "Int32",
+    "End_hg38": "Int32",
+    "cpg_start": "Int32",
+    "cpg_end": "Int32",
+    "gene_type_raw": "category",
+    "gene_type": "category",
+    "uniprot_entry_status": "category",
+    "uniprot_review": "category",
+    "uniprot_protein_existence": "category",
+    "uniprot_existence": "category",
+    "annotation_status": "category",
+    "gwas_assoc_count": "Int32",
+    "harmonizome_count": "Int32",
+    "pubmed_count": "Int32",
+    "pubmed_genetic_count": "Int32",
+}
+
+# DisGeNET GEA export. 'score' stays float64: its decimals are rendered and
+# compared against thresholds, and float32 would print 0.7 as 0.699999988.
+DISGENET_DTYPES = {
+    "gene_symbol": "category",
+    "geneid": "Int32",
+    "ensemblid": "category",
+    "geneNcbiType": "category",
+    "geneDSI": "float32",
+    "geneDPI": "float32",
+    "genepLI": "float32",
+    "uniprotids": "category",
+    "protein_classid": "category",
+    "protein_class_name": "category",
+    "disease_name": "category",
+    "diseaseType": "category",
+    "diseaseUMLSCUI": "category",
+    "diseaseClasses_MSH": "category",
+    "diseaseClasses_UMLS_ST": "category",
+    "diseaseClasses_DO": "category",
+    "diseaseClasses_HPO": "category",
+    "source": "category",
+    "associationType": "category",
+    "text": TEXT,
+    "sentence": TEXT,
+    "pmYear": "Int16",
+    "chemsInSentence": "float32",
+    "reference_type": "category",
+    "ancestry_name": "category",
+    "ancestry_id": "category",
+    "chemical_effect": "float32",
+    "polarity": "category",
+}
+
+# EWAS Atlas table (data/ewas_atlas.csv)
+ATLAS_DTYPES = {
+    "cpg_island": "category",
+    "correlation": "category",
+}
+
+
+def apply_schema(df: pd.DataFrame, dtypes: Mapping[str, str]) -> pd.DataFrame:
+    """
+    Casts the columns of df that appear in dtypes; other columns are left alone.
+
+    A column whose values do not fit its declared dtype (e.g. text in an Int32 column)
+    keeps its current dtype and is logged, so an unexpected export never aborts a run.
+    """
+    casts = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        try:
+            casts[col] = df[col].astype(dtype)
+        except (TypeError, ValueError) as exc:
+            logger.warning("Keeping %s as %s; cannot cast to %s (%s)", col, df[col].dtype, dtype, exc)
+    return df.assign(**casts) if casts else df
+
+
+def read_csv_with_schema(path: str | Path, dtypes: Mapping[str, str], **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv that parses straight into the declared dtypes, so no object copy of the
+    table is ever materialized; falls back to a plain read plus apply_schema if a column
+    does not parse.
+    """
+    header = pd.read_csv(path, nrows=0, **kwargs).columns
+    try:
+        return pd.read_csv(path, dtype={c: d for c, d in dtypes.items() if c in header}, **kwargs)
+    except (TypeError, ValueError) as exc:
+        logger.warning("Reading %s without declared dtypes (%s)", path, exc)
+        return apply_schema(pd.read_csv(path, **kwargs), dtypes)
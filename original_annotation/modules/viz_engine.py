@@ -5,66 +5,91 @@ import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
-import re
 import networkx as nx
 import textwrap
+import hashlib
+import json
+from importlib import util as importlib_util
+from pathlib import Path
 
-def plot_disease_heatmap(df: pd.DataFrame, 
-                         disease_col: str = 'disgenet_diseases', 
-                         gene_col: str = 'symbol',
-                         output_path: str = "disease_heatmap.png",
-                         title: str = "Gene-Disease Association Heatmap",
-                         cmap: str = "viridis",
-                         figsize: tuple = None,
-                         font_scale: float = 1.0,
-                         dpi: int = 300):
+from .associations import SOURCE_BY_COLUMN, parse_associations, scored_frame, select_associations
+from .graph_export import export_graph
+
+# Above this many gene x disease cells, heatmaps are drawn as one raster image
+LARGE_MATRIX_CELLS = 40_000
+
+# Axis labels are drawn on raster heatmaps only up to this many genes/diseases
+MAX_TICK_LABELS = 150
+
+# Raster heatmaps have a fixed size: resolution is set by dpi, not by matrix shape
+RASTER_FIGSIZE = (16, 12)
+
+# Network layout by node count: Kamada-Kawai (O(n^2) memory) up to the first limit,
+# grid-approximated force layout up to the second, layered bipartite layout beyond
+KAMADA_KAWAI_MAX_NODES = 300
+FORCE_LAYOUT_MAX_NODES = 20_000
+FORCE_LAYOUT_ITERATIONS = 50
+FORCE_GRID = 24
+
+# Node labels are drawn only for networks up to this size
+MAX_NETWORK_LABELS = 1_000
+
+def _scored_associations(df: pd.DataFrame, disease_col: str, gene_col: str, associations: pd.DataFrame = None):
     """
-    Generates a publication-quality heatmap showing associations between genes and diseases.
-    Expects associations in the format "Disease Name, Score;\nNext Disease, Score".
+    (gene, disease, score) rows for disease_col taken from the tidy association table,
+    limited to genes present in df; None when the table has nothing for that column.
     """
-    # 1. Parse the associations into a long-form DataFrame
-    parsed_data = []
-    
-    for _, row in df.iterrows():
-        gene = row[gene_col]
-        assoc_str = row[disease_col]
-        
-        if pd.isna(assoc_str) or assoc_str == 'n/a':
-            continue
-            
-        # Split by semicolon and optional newline
-        parts = re.split(r';\n|;', assoc_str)
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-                
-            # Expecting "Disease, Score"
-            if ',' in part:
-                try:
-                    disease, score_str = part.rsplit(',', 1)
-                    score = float(score_str.strip())
-                    parsed_data.append({
-                        'gene': gene,
-                        'disease': disease.strip(),
-                        'score': score
-                    })
-                except (ValueError, TypeError):
-                    # Skip 'error' or non-numeric scores for heatmap
-                    continue
-
-    if not parsed_data:
-        print("[VIZ] No numeric association data found for heatmap.")
-        return
+    source = SOURCE_BY_COLUMN.get(disease_col, disease_col)
+    selected = select_associations(associations, source, genes=df[gene_col])
+    if selected is None:
+        return None
+    selected = selected.dropna(subset=['score'])
+    return scored_frame(selected['gene'], selected['term'], selected['score'])
 
-    viz_df = pd.DataFrame(parsed_data)
-    
-    # 2. Pivot to matrix form
-    pivot_df = viz_df.pivot_table(index='gene', columns='disease', values='score', fill_value=0)
-    
-    # 3. Plotting (Academic & Clean style)
-    sns.set_theme(style="white", font_scale=font_scale)
-    
+def _score_matrix(viz_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dense gene x disease float32 matrix (mean score per pair, 0 where absent), with
+    genes and diseases in sorted order like pivot_table, built from category codes.
+    """
+    gene = viz_df['gene'].astype('category')
+    disease = viz_df['disease'].astype('category')
+    keep = ((gene.cat.codes >= 0) & (disease.cat.codes >= 0)).to_numpy()
+    gene = gene[keep].cat.remove_unused_categories()
+    disease = disease[keep].cat.remove_unused_categories()
+
+    means = (pd.DataFrame({'g': gene.cat.codes.to_numpy(), 'd': disease.cat.codes.to_numpy(),
+                           's': viz_df['score'].to_numpy()[keep]})
+             .groupby(['g', 'd'], sort=False)['s'].mean())
+    matrix = np.zeros((len(gene.cat.categories), len(disease.cat.categories)), dtype=np.float32)
+    matrix[means.index.get_level_values('g'), means.index.get_level_values('d')] = means.to_numpy()
+
+    return pd.DataFrame(matrix,
+                        index=pd.Index(gene.cat.categories, name='gene'),
+                        columns=pd.Index(disease.cat.categories, name='disease'))
+
+def _top_k(matrix: pd.DataFrame, top_k_genes: int = None, top_k_diseases: int = None) -> pd.DataFrame:
+    """Keeps the genes/diseases with the largest total score, in their original order."""
+    if top_k_genes is not None and top_k_genes < matrix.shape[0]:
+        keep = matrix.sum(axis=1).nlargest(top_k_genes).index
+        matrix = matrix.loc[matrix.index.isin(keep)]
+    if top_k_diseases is not None and top_k_diseases < matrix.shape[1]:
+        keep = matrix.sum(axis=0).nlargest(top_k_diseases).index
+        matrix = matrix.loc[:, matrix.columns.isin(keep)]
+    return matrix
+
+def _cluster_order(matrix: pd.DataFrame) -> pd.DataFrame:
+    """Reorders rows and columns by average-linkage hierarchical clustering (requires scipy)."""
+    if importlib_util.find_spec("scipy") is None:
+        print("[VIZ] Warning: scipy not installed; skipping heatmap clustering.")
+        return matrix
+    from scipy.cluster.hierarchy import leaves_list, linkage
+
+    values = matrix.to_numpy(dtype=np.float64)
+    rows = leaves_list(linkage(values, method='average')) if values.shape[0] > 2 else np.arange(values.shape[0])
+    cols = leaves_list(linkage(values.T, method='average')) if values.shape[1] > 2 else np.arange(values.shape[1])
+    return matrix.iloc[rows, cols]
+
+def _draw_seaborn_heatmap(pivot_df: pd.DataFrame, title: str, cmap: str, figsize: tuple, font_scale: float):
     # Dynamically adjust figsize if not provided
     if figsize is None:
         width = max(12, pivot_df.shape[1] * 0.3)
@@ -92,13 +117,280 @@ def plot_disease_heatmap(df: pd.DataFrame,
     # Rotate labels for readability
     plt.xticks(rotation=45, ha='right', fontsize=8 * font_scale)
     plt.yticks(rotation=0, fontsize=8 * font_scale)
-    
-    plt.tight_layout()
+
+def _draw_raster_heatmap(pivot_df: pd.DataFrame, title: str, cmap: str, figsize: tuple, font_scale: float):
+    """
+    One rasterized image for the whole matrix: cost scales with output pixels, not cells.
+    Matrices wider than the image are area-averaged by imshow's antialiasing.
+    """
+    n_genes, n_diseases = pivot_df.shape
+    # Constrained layout sizes the margins without the extra full render tight_layout does
+    fig, ax = plt.subplots(figsize=figsize or RASTER_FIGSIZE, layout='constrained')
+    colormap = plt.get_cmap(cmap).with_extremes(bad='white')  # Blank (zero) cells are white
+    image = ax.imshow(np.ma.masked_equal(pivot_df.to_numpy(), 0), aspect='auto',
+                      interpolation='antialiased', cmap=colormap, rasterized=True)
+    fig.colorbar(image, ax=ax, label='DisGeNET Association Score')
+
+    # Tick labels only while they stay legible
+    if n_diseases <= MAX_TICK_LABELS:
+        ax.set_xticks(np.arange(n_diseases))
+        ax.set_xticklabels(pivot_df.columns.astype(str), rotation=45, ha='right', fontsize=8 * font_scale)
+    else:
+        ax.set_xticks([])
+    if n_genes <= MAX_TICK_LABELS:
+        ax.set_yticks(np.arange(n_genes))
+        ax.set_yticklabels(pivot_df.index.astype(str), fontsize=8 * font_scale)
+    else:
+        ax.set_yticks([])
+
+    ax.set_title(title, fontsize=16 * font_scale, pad=20)
+    ax.set_xlabel(f"Disease (n={n_diseases})", fontsize=12 * font_scale)
+    ax.set_ylabel(f"Gene (n={n_genes})", fontsize=12 * font_scale)
+
+def _render_heatmap(pivot_df: pd.DataFrame, output_path: str, title: str, cmap: str,
+                    figsize: tuple, font_scale: float, dpi: int, render: str):
+    if render == 'auto':
+        render = 'raster' if pivot_df.size > LARGE_MATRIX_CELLS else 'seaborn'
+
+    # Plotting (Academic & Clean style)
+    sns.set_theme(style="white", font_scale=font_scale)
+    if render == 'raster':
+        _draw_raster_heatmap(pivot_df, title, cmap, figsize, font_scale)
+    else:
+        _draw_seaborn_heatmap(pivot_df, title, cmap, figsize, font_scale)
+        plt.tight_layout()
     
     # Save output with high DPI for zooming
     plt.savefig(output_path, dpi=dpi)
     plt.close()
-    print(f"[VIZ] Heatmap saved to: {output_path} (DPI: {dpi})")
+    print(f"[VIZ] Heatmap saved to: {output_path} (DPI: {dpi}, {pivot_df.shape[0]}x{pivot_df.shape[1]}, {render})")
+
+def plot_disease_heatmap(df: pd.DataFrame, 
+                         disease_col: str = 'disgenet_diseases', 
+                         gene_col: str = 'symbol',
+                         output_path: str = "disease_heatmap.png",
+                         title: str = "Gene-Disease Association Heatmap",
+                         cmap: str = "viridis",
+                         figsize: tuple = None,
+                         font_scale: float = 1.0,
+                         dpi: int = 300,
+                         associations: pd.DataFrame = None,
+                         render: str = "auto",
+                         top_k_genes: int = None,
+                         top_k_diseases: int = None,
+                         cluster: bool = False,
+                         tile_shape: tuple = None):
+    """
+    Generates a publication-quality heatmap showing associations between genes and diseases.
+    Reads the tidy association table when given; otherwise parses disease_col,
+    expecting the format "Disease Name, Score;\nNext Disease, Score".
+
+    Large matrices:
+        render: 'seaborn' (labelled cells), 'raster' (single imshow image) or 'auto',
+            which switches to 'raster' above LARGE_MATRIX_CELLS cells.
+        top_k_genes / top_k_diseases: keep only the rows/columns with the largest total score.
+        cluster: order rows and columns by hierarchical clustering (needs scipy).
+        tile_shape: (genes, diseases) per tile; writes one '<stem>_rNN_cNN' image per
+            non-empty block instead of a single figure.
+    """
+    # 1. Parse the associations into a long-form DataFrame
+    viz_df = _scored_associations(df, disease_col, gene_col, associations)
+    if viz_df is None:
+        viz_df = parse_associations(df, disease_col, gene_col)
+    if viz_df.empty:
+        print("[VIZ] No numeric association data found for heatmap.")
+        return
+    
+    # 2. Pivot to matrix form, then trim and reorder
+    pivot_df = _top_k(_score_matrix(viz_df), top_k_genes, top_k_diseases)
+    if cluster:
+        pivot_df = _cluster_order(pivot_df)
+    
+    # 3. Render as one figure or as tiles
+    if tile_shape is None:
+        _render_heatmap(pivot_df, output_path, title, cmap, figsize, font_scale, dpi, render)
+        return
+
+    tile_genes, tile_diseases = tile_shape
+    out = Path(output_path)
+    values = pivot_df.to_numpy()
+    written = 0
+    for r, row_start in enumerate(range(0, pivot_df.shape[0], tile_genes)):
+        for c, col_start in enumerate(range(0, pivot_df.shape[1], tile_diseases)):
+            rows = slice(row_start, row_start + tile_genes)
+            cols = slice(col_start, col_start + tile_diseases)
+            if not values[rows, cols].any():
+                continue
+            tile = pivot_df.iloc[rows, cols]
+            tile_path = out.with_name(f"{out.stem}_r{r:02d}_c{c:02d}{out.suffix}")
+            tile_title = (f"{title} (genes {row_start + 1}-{row_start + tile.shape[0]}, "
+                          f"diseases {col_start + 1}-{col_start + tile.shape[1]})")
+            _render_heatmap(tile, str(tile_path), tile_title, cmap, figsize, font_scale, dpi, render)
+            written += 1
+    print(f"[VIZ] Wrote {written} heatmap tiles for a {pivot_df.shape[0]}x{pivot_df.shape[1]} matrix.")
+
+def _spring_layout(G: nx.Graph) -> dict:
+    return nx.spring_layout(G, k=0.3, iterations=50, seed=0)
+
+def _kamada_kawai_layout(G: nx.Graph) -> dict:
+    # Kamada Kawai often handles disjoint components nicely, but needs scipy
+    if importlib_util.find_spec("scipy") is None:
+        return _spring_layout(G)
+    try:
+        return nx.kamada_kawai_layout(G)
+    except (nx.NetworkXException, ValueError, np.linalg.LinAlgError) as exc:
+        print(f"[VIZ] Kamada-Kawai layout failed ({exc}); falling back to spring layout.")
+        return _spring_layout(G)
+
+def _edge_arrays(G: nx.Graph, nodes: list):
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v], d.get('weight', 1.0)) for u, v, d in G.edges(data=True)],
+                     dtype=np.float64).reshape(-1, 3)
+    return edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2]
+
+def _repulsion(pos: np.ndarray, centroid: np.ndarray, mass: np.ndarray, k: float) -> np.ndarray:
+    delta = pos - centroid
+    return delta * (k * k * mass / np.maximum((delta ** 2).sum(axis=1), 1e-6))[:, None]
+
+def _force_layout(G: nx.Graph, iterations: int = FORCE_LAYOUT_ITERATIONS, seed: int = 0) -> dict:
+    """
+    Fruchterman-Reingold forces on the sparse edge list with Barnes-Hut-style repulsion:
+    each node is pushed by the mass and centroid of every occupied cell of a
+    FORCE_GRID x FORCE_GRID grid rather than by every other node.
+    Cost per iteration is O(edges + nodes * occupied cells).
+    """
+    nodes = list(G)
+    n = len(nodes)
+    src, dst, weight = _edge_arrays(G, nodes)
+    pos = np.random.default_rng(seed).uniform(-1.0, 1.0, (n, 2))
+    k = 2.0 / np.sqrt(n)  # ideal edge length in a [-1, 1] box
+    chunk = max(1, 2_000_000 // (FORCE_GRID * FORCE_GRID))
+
+    for step in range(iterations):
+        temperature = 0.1 * (1.0 - step / iterations) + 1e-3
+
+        # Bin nodes into grid cells; per cell: mass and centroid
+        lo, hi = pos.min(axis=0), pos.max(axis=0)
+        cell_xy = np.minimum(((pos - lo) / np.maximum(hi - lo, 1e-9) * FORCE_GRID).astype(np.int64), FORCE_GRID - 1)
+        cell_id = cell_xy[:, 0] * FORCE_GRID + cell_xy[:, 1]
+        occupied, node_cell, mass = np.unique(cell_id, return_inverse=True, return_counts=True)
+        centroid = np.zeros((len(occupied), 2))
+        np.add.at(centroid, node_cell, pos)
+        centroid /= mass[:, None]
+
+        # Repulsion k^2 * m / d from each occupied cell; a node's own cell is then
+        # replaced by the same cell without the node itself
+        disp = np.zeros_like(pos)
+        for start in range(0, n, chunk):
+            p = pos[start:start + chunk]
+            dx = p[:, 0:1] - centroid[:, 0]
+            dy = p[:, 1:2] - centroid[:, 1]
+            scale = (k * k) * mass / np.maximum(dx * dx + dy * dy, 1e-6)
+            # sum_c scale * (p - c), without materialising the (nodes, cells, 2) differences
+            disp[start:start + chunk] = p * scale.sum(axis=1)[:, None] - scale @ centroid
+        disp -= _repulsion(pos, centroid[node_cell], mass[node_cell], k)
+        others = mass[node_cell] - 1
+        alone = others == 0
+        own_centroid = (centroid[node_cell] * mass[node_cell][:, None] - pos) / np.maximum(others, 1)[:, None]
+        disp[~alone] += _repulsion(pos[~alone], own_centroid[~alone], others[~alone], k)
+
+        # Attraction d^2 / k along weighted edges
+        delta = pos[src] - pos[dst]
+        force = delta * (np.sqrt((delta ** 2).sum(axis=1)) * weight / k)[:, None]
+        np.add.at(disp, src, -force)
+        np.add.at(disp, dst, force)
+
+        # Move at most `temperature` per step
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+
+    pos = pos - pos.mean(axis=0)
+    pos /= max(np.abs(pos).max(), 1e-9)
+    return dict(zip(nodes, pos))
+
+def _layered_layout(G: nx.Graph, sweeps: int = 4) -> dict:
+    """
+    Two-column bipartite layout (genes left, diseases right), ordered by repeated
+    barycenter sweeps to reduce crossings. O(edges) per sweep.
+    """
+    nodes = list(G)
+    is_gene = np.array([G.nodes[n].get('type') == 'gene' for n in nodes])
+    src, dst, _ = _edge_arrays(G, nodes)
+    degree = np.bincount(src, minlength=len(nodes)) + np.bincount(dst, minlength=len(nodes))
+
+    # Start from degree order within each side, then move every node to its neighbours' mean rank
+    rank = np.empty(len(nodes))
+    for side in (is_gene, ~is_gene):
+        idx = np.flatnonzero(side)
+        rank[idx[np.argsort(-degree[idx], kind='stable')]] = np.arange(len(idx))
+    for sweep in range(sweeps):
+        moving = is_gene if sweep % 2 == 0 else ~is_gene
+        total = np.bincount(src, weights=rank[dst], minlength=len(nodes)) + \
+            np.bincount(dst, weights=rank[src], minlength=len(nodes))
+        barycenter = np.where(degree > 0, total / np.maximum(degree, 1), rank)
+        idx = np.flatnonzero(moving)
+        rank[idx[np.argsort(barycenter[idx], kind='stable')]] = np.arange(len(idx))
+
+    pos = np.zeros((len(nodes), 2))
+    pos[:, 0] = np.where(is_gene, -1.0, 1.0)
+    for side in (is_gene, ~is_gene):
+        count = side.sum()
+        pos[side, 1] = 1.0 - 2.0 * rank[side] / max(count - 1, 1)
+    return dict(zip(nodes, pos))
+
+def choose_network_layout(G: nx.Graph) -> str:
+    """Layout algorithm for a graph of this size: 'kamada_kawai', 'force' or 'layered'."""
+    n = G.number_of_nodes()
+    if n <= KAMADA_KAWAI_MAX_NODES:
+        return 'kamada_kawai'
+    if n <= FORCE_LAYOUT_MAX_NODES:
+        return 'force'
+    return 'layered'
+
+NETWORK_LAYOUTS = {
+    'kamada_kawai': _kamada_kawai_layout,
+    'spring': _spring_layout,
+    'force': _force_layout,
+    'layered': _layered_layout,
+}
+
+def _layout_cache_key(G: nx.Graph, layout: str) -> str:
+    digest = hashlib.sha256(layout.encode())
+    for line in sorted(f"{u}\t{v}\t{d.get('weight', 1.0)!r}" if str(u) <= str(v) else
+                       f"{v}\t{u}\t{d.get('weight', 1.0)!r}"
+                       for u, v, d in G.edges(data=True)):
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+def network_layout(G: nx.Graph, layout: str = 'auto', cache_dir: str = None) -> dict:
+    """
+    Node positions for G. layout is a NETWORK_LAYOUTS name or 'auto' (chosen by graph size).
+
+    With cache_dir, positions are stored as '<sha256 of layout + edge set>.json' and
+    reused on later runs with the same edges and weights.
+    """
+    if layout == 'auto':
+        layout = choose_network_layout(G)
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f"{_layout_cache_key(G, layout)}.json"
+        if cache_path.is_file():
+            try:
+                cached = json.loads(cache_path.read_text())
+                pos = {node: np.asarray(cached[str(node)]) for node in G}
+                print(f"[VIZ] Reusing cached {layout} layout: {cache_path}")
+                return pos
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"[VIZ] Ignoring unreadable layout cache {cache_path} ({exc}).")
+
+    pos = NETWORK_LAYOUTS[layout](G)
+
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps({str(node): [float(x), float(y)] for node, (x, y) in pos.items()}))
+    return pos
 
 def plot_broad_spectrum_network(df: pd.DataFrame, 
                                 disease_col: str = 'disgenet_diseases', 
@@ -106,60 +398,51 @@ def plot_broad_spectrum_network(df: pd.DataFrame,
                                 output_path: str = "broad_spectrum_network.png",
                                 title: str = "Gene-Disease Network",
                                 score_threshold: float = 0.1,
-                                wrap_width: int = 15):
+                                wrap_width: int = 15,
+                                associations: pd.DataFrame = None,
+                                layout: str = 'auto',
+                                layout_cache_dir: str = None,
+                                export_path: str = None):
     """
     Generates a network graph for broad-spectrum gene-disease associations.
     Genes are source nodes, Diseases are target nodes.
     Filters out associations with score < score_threshold.
-    Wraps disease labels.
+    Wraps disease labels. Reads the tidy association table when given.
+    layout picks the algorithm ('auto' chooses by graph size, see network_layout);
+    layout_cache_dir reuses positions between runs with an identical edge set.
+    export_path (.json node-link, .graphml or .gexf) also writes the graph with its
+    positions for external viewers; with output_path=None only the export is written.
     """
     G = nx.Graph()
-    
-    for _, row in df.iterrows():
-        gene = row[gene_col]
-        assoc_str = row[disease_col]
-        
-        if pd.isna(assoc_str) or assoc_str == 'n/a':
-            continue
-            
-        # We will add the gene node later only if it has valid edges
-        
-        parts = re.split(r';\n|;', assoc_str)
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            
-            if ',' in part:
-                try:
-                    disease, score_str = part.rsplit(',', 1)
-                    disease = disease.strip()
-                    score = float(score_str.strip())
-                    
-                    if score >= score_threshold:
-                        # Wrap disease name
-                        disease_label = "\n".join(textwrap.wrap(disease, wrap_width))
-                        
-                        # Add nodes and edge
-                        G.add_node(gene, type='gene', label=gene)
-                        G.add_node(disease, type='disease', label=disease_label)
-                        G.add_edge(gene, disease, weight=score)
-                        
-                except (ValueError, TypeError):
-                    continue
+
+    scored = _scored_associations(df, disease_col, gene_col, associations)
+    if scored is None:
+        scored = parse_associations(df, disease_col, gene_col)
+
+    for gene, disease, score in scored[scored['score'] >= score_threshold].itertuples(index=False, name=None):
+        # Wrap disease name
+        disease_label = "\n".join(textwrap.wrap(disease, wrap_width))
+
+        # Add nodes and edge
+        G.add_node(gene, type='gene', label=gene)
+        G.add_node(disease, type='disease', label=disease_label)
+        G.add_edge(gene, disease, weight=float(score))
 
     if G.number_of_nodes() == 0:
         print(f"[VIZ] No nodes to plot in network graph (threshold={score_threshold}).")
         return
 
+    # Layout - Kamada Kawai for small graphs, sparse force or layered layouts beyond that
+    pos = network_layout(G, layout=layout, cache_dir=layout_cache_dir)
+
+    if export_path is not None:
+        exported = export_graph(G, export_path, pos=pos)
+        print(f"[VIZ] Network exported to: {exported} ({G.number_of_nodes()} nodes, {G.number_of_edges()} edges)")
+    if output_path is None:
+        return
+
     plt.figure(figsize=(20, 20)) # Larger figure
     
-    # Layout - Kamada Kawai often handles disjoint components nicely
-    try:
-        pos = nx.kamada_kawai_layout(G)
-    except:
-        pos = nx.spring_layout(G, k=0.3, iterations=50) # Fallback
-    
     # Nodes
     genes = [n for n, d in G.nodes(data=True) if d.get('type') == 'gene']
     diseases = [n for n, d in G.nodes(data=True) if d.get('type') == 'disease']
@@ -179,9 +462,10 @@ def plot_broad_spectrum_network(df: pd.DataFrame,
     nx.draw_networkx_edges(G, pos, edge_color='gray', width=widths, alpha=0.4)
     
     # Labels
-    # Use the 'label' attribute we set (wrapped for diseases)
-    labels = nx.get_node_attributes(G, 'label')
-    nx.draw_networkx_labels(G, pos, labels, font_size=8, font_color='black')
+    # Use the 'label' attribute we set (wrapped for diseases); skipped when they would be illegible
+    if G.number_of_nodes() <= MAX_NETWORK_LABELS:
+        labels = nx.get_node_attributes(G, 'label')
+        nx.draw_networkx_labels(G, pos, labels, font_size=8, font_color='black')
     
     plt.title(f"{title} (Score > {score_threshold})", fontsize=24)
     plt.axis('off')
@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+import sys
+import os
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.associations import (
+    combine_associations,
+    load_associations,
+    make_associations,
+    parse_associations,
+    save_associations,
+    select_associations,
+)
+from original_annotation.modules.cpg_integration import attach_ewas_atlas_traits
+from original_annotation.modules.disgenet_utils import annotate_with_disgenet
+from original_annotation.modules.reporting_engine import generate_summary_report
+from original_annotation.modules.viz_engine import plot_broad_spectrum_network
+
+
+def _disgenet_df():
+    return pd.DataFrame({
+        'gene_symbol': ['GENE1', 'GENE1', 'GENE1', 'GENE2'],
+        'disease_name': ['Disease A', 'Disease A', 'Schizophrenia', 'Disease C'],
+        'diseaseClasses_UMLS_ST': ['Class 1', 'Class 1', 'Mental or Behavioral Dysfunction (T048)', 'Class 2'],
+        'score': [0.5, 0.5, 0.7, 0.3],
+        'polarity': ['Positive'] * 4,
+        'pmYear': [2020, 2021, 2021, 2019],
+        'reference_type': ['PMID'] * 4,
+        'reference': [123, 124, 456, 789],
+        'source': ['S1'] * 4,
+        'associationType': ['T1'] * 4,
+    })
+
+
+def test_disgenet_associations_match_string_column():
+    genes_df = pd.DataFrame({'symbol': ['GENE1', 'GENE2', 'GENE3']})
+    result, assoc = annotate_with_disgenet(genes_df, _disgenet_df(), psych_only=False, return_associations=True)
+
+    assert list(assoc['source'].unique()) == ['disgenet']
+    gene1 = assoc[assoc['gene'] == 'GENE1'].set_index('term')
+    assert gene1.loc['Disease A', 'score'] == 0.5
+    assert gene1.loc['Disease A', 'pmid'] == '123;124'
+    assert 'Disease A, 0.5' in result.loc[0, 'disgenet_diseases']
+    assert 'GENE3' not in set(assoc['gene'])
+
+    _, psych = annotate_with_disgenet(genes_df, _disgenet_df(), psych_only=True, return_associations=True)
+    assert psych[['gene', 'source', 'term']].values.tolist() == [['GENE1', 'disgenet_psych', 'Schizophrenia']]
+
+
+def test_atlas_associations_one_row_per_trait():
+    mapping_df = pd.DataFrame({'cpg': ['cg1', 'cg2'], 'symbol': ['GENE1', 'GENE2']})
+    atlas_df = pd.DataFrame({
+        'cpg': ['cg1', 'cg1', 'cg3'],
+        'trait': ['BMI', 'Smoking', 'Age'],
+        'rank': [1, 2, 1],
+        'total_associations': [10, 10, 5],
+        'correlation': ['pos', 'neg', 'pos'],
+        'pmid': [111.0, 222.0, 333.0],
+    })
+
+    _, assoc = attach_ewas_atlas_traits(mapping_df, atlas_df, return_associations=True)
+
+    # Same order as the formatted column: highest rank_score first
+    assert assoc[['gene', 'cpg', 'term', 'detail', 'pmid']].values.tolist() == [
+        ['GENE1', 'cg1', 'Smoking', 'hypo', '222'],
+        ['GENE1', 'cg1', 'BMI', 'hyper', '111'],
+    ]
+    assert assoc['score'].tolist() == pytest.approx([0.2, 0.1])
+
+
+def test_combine_select_and_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    first = make_associations(['GENE1'], 'disgenet', ['Disease A'], score=[0.5])
+    atlas = make_associations(['GENE1'], 'ewas_atlas', ['BMI'], cpg=['cg1'])
+    replacement = make_associations(['GENE2'], 'disgenet', ['Disease C'], score=[0.3])
+
+    combined = combine_associations(combine_associations(first, atlas), replacement)
+    assert sorted(combined['term']) == ['BMI', 'Disease C']
+    assert select_associations(combined, 'pubmed') is None
+    assert select_associations(combined, 'disgenet', genes=['GENE1']).empty
+
+    path = save_associations(combined, tmp_path / "associations.parquet")
+    loaded = load_associations(path)
+    pd.testing.assert_frame_equal(loaded, combined)
+    assert load_associations(tmp_path / "missing.parquet") is None
+
+
+def test_viz_and_report_read_association_table(tmp_path):
+    # String columns are deliberately out of date: the table must win
+    df = pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2'],
+        'disgenet_psych_diseases': ['Stale Disease, 0.9', 'n/a'],
+        'disgenet_diseases': ['n/a', 'n/a'],
+    })
+    assoc = pd.concat([
+        make_associations(['GENE1', 'GENE2'], 'disgenet_psych', ['Schizophrenia', 'Depression'], score=[0.7, 0.2]),
+        make_associations(['GENE1'], 'disgenet', ['Disease A'], score=[0.5]),
+    ], ignore_index=True)
+
+    report = tmp_path / "summary_report.md"
+    generate_summary_report(df, output_path=str(report), associations=assoc)
+    content = report.read_text()
+    assert "Schizophrenia" in content
+    assert "Stale Disease" not in content
+    assert "Depression" not in content  # below the 0.3 report cutoff
+
+    network = tmp_path / "network.png"
+    plot_broad_spectrum_network(df, output_path=str(network), associations=assoc)
+    assert Path(network).is_file()
+
+
+def test_parse_associations_matches_formatted_strings():
+    df = pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2', 'GENE3', 'GENE4'],
+        'disgenet_diseases': [
+            'Disease A, 0.7;\nAlzheimer, Early Onset, 0.5',
+            'Disease B, error; ;Disease C, 0.25 ',
+            'n/a',
+            None,
+        ],
+    })
+
+    parsed = parse_associations(df, 'disgenet_diseases')
+
+    assert parsed['score'].dtype == 'float32'
+    assert isinstance(parsed['gene'].dtype, pd.CategoricalDtype)
+    assert isinstance(parsed['disease'].dtype, pd.CategoricalDtype)
+    assert parsed[['gene', 'disease']].astype(str).values.tolist() == [
+        ['GENE1', 'Disease A'],
+        ['GENE1', 'Alzheimer, Early Onset'],
+        ['GENE2', 'Disease C'],
+    ]
+    assert parsed['score'].tolist() == pytest.approx([0.7, 0.5, 0.25])
+    assert parse_associations(df.iloc[2:], 'disgenet_diseases').empty
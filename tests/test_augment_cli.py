@@ -0,0 +1,69 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+
+import augment_living_file as augment
+from original_annotation.modules.associations import combine_associations, make_associations
+from original_annotation.modules.viz_engine import _scored_associations
+
+
+def _run(monkeypatch, argv):
+    calls = []
+    monkeypatch.setattr(augment, "augment_living_file", lambda **kwargs: calls.append(kwargs))
+    augment.main(argv)
+    return calls[0]
+
+
+def test_cli_stage_selection(monkeypatch):
+    assert _run(monkeypatch, [])["stages"] == list(augment.AUGMENT_STAGES)
+    assert _run(monkeypatch, ["--only", "disgenet,atlas"])["stages"] == ["disgenet", "atlas"]
+
+    kwargs = _run(monkeypatch, ["--no-viz", "--no-report", "--report", "out/report.md", "--incremental"])
+    assert kwargs["stages"] == ["atlas", "gap", "disgenet", "excel"]
+    assert kwargs["report_path"] == "out/report.md"
+    assert kwargs["incremental"] is True
+
+
+def test_cli_rejects_unknown_stage(monkeypatch):
+    with pytest.raises(SystemExit):
+        _run(monkeypatch, ["--only", "atlas,plots"])
+    with pytest.raises(ValueError):
+        augment._check_stages(["plots"])
+
+
+def test_figures_receive_only_their_source_and_genes():
+    associations = combine_associations(
+        make_associations(['GENE1', 'GENE2', 'OTHER'], 'disgenet', ['Asthma', 'Gout', 'Asthma'], score=[0.5, 0.2, 0.9]),
+        make_associations(['GENE1'], 'disgenet_psych', ['Autism'], score=[0.7]))
+    associations = combine_associations(associations, make_associations(['GENE1'], 'ewas_atlas', ['Smoking']))
+    df = pd.DataFrame({'symbol': ['GENE1', 'GENE2'], 'disgenet_disease': ['Asthma, 0.5', 'Gout, 0.2']})
+
+    for col in ('disgenet_disease', 'disgenet_psych_diseases'):
+        subset = augment._figure_associations(associations, df, col)
+        assert len(subset) == (2 if col == 'disgenet_disease' else 1)
+        pd.testing.assert_frame_equal(_scored_associations(df, col, 'symbol', subset),
+                                      _scored_associations(df, col, 'symbol', associations))
+    assert augment._figure_associations(associations, df, 'pubmed_terms') is None
+    assert augment._figure_associations(None, df, 'disgenet_disease') is None
+
+
+@pytest.mark.parametrize("use_cli", [False, True])
+def test_augment_stops_tracing_when_a_stage_fails(tmp_path, monkeypatch, use_cli):
+    import tracemalloc
+
+    monkeypatch.chdir(tmp_path)
+    missing = str(tmp_path / "missing_living.csv")
+    with pytest.raises(FileNotFoundError):
+        if use_cli:
+            augment.main(["--living", missing])
+        else:
+            augment.augment_living_file(living_path=missing, run_report_path=None)
+
+    assert not tracemalloc.is_tracing()
+    if use_cli:
+        # The failed stage is still recorded in the run report
+        assert '"error": "FileNotFoundError' in (tmp_path / augment.RUN_REPORT_PATH).read_text()
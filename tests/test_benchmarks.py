@@ -0,0 +1,44 @@
+import os
+import sys
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.cassette import Cassette, record, replay
+from benchmarks.run_benchmarks import BENCHMARKS, run_suite
+
+
+def test_every_stage_replays_without_cassette_misses():
+    results = run_suite([30], list(BENCHMARKS), repeat=1)
+
+    assert [r["stage"] for r in results] == list(BENCHMARKS)
+    for result in results:
+        assert result["cassette_misses"] == 0, (result["stage"], result["example_misses"])
+    by_stage = {r["stage"]: r for r in results}
+    assert set(by_stage["ncbi_hgnc"]["requests"]) == {"NCBI", "HGNC"}
+    assert set(by_stage["pubmed"]["requests"]) == {"E-utilities"}
+    assert by_stage["ewas_atlas_cached"]["requests"] == {}
+    # Region batching needs fewer UCSC requests than screening CpG by CpG
+    assert by_stage["ucsc_batched"]["requests"]["UCSC"] < by_stage["ucsc_per_cpg"]["requests"]["UCSC"]
+
+
+def test_cassette_record_save_and_replay(tmp_path, monkeypatch):
+    def upstream(url, params=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 503 if "flaky" in url else 200
+        response._content = b'{"gene": "BDNF"}'
+        return response
+
+    monkeypatch.setattr(requests, "get", upstream)
+    cassette = Cassette()
+    with record(cassette):
+        requests.get("https://rest.genenames.org/fetch/symbol/BDNF", params={"api_key": "secret"})
+        requests.get("https://rest.genenames.org/flaky")
+
+    replayed = Cassette.load(cassette.save(tmp_path / "hgnc.json.gz"))
+    assert list(replayed.responses) == ["rest.genenames.org/fetch/symbol/BDNF?"]
+    with replay(replayed):
+        assert requests.get("https://rest.genenames.org/fetch/symbol/BDNF").json() == {"gene": "BDNF"}
+        assert requests.get("https://rest.genenames.org/flaky").status_code == 404
+    assert replayed.misses == ["rest.genenames.org/flaky?"]
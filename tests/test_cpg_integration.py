@@ -11,7 +11,8 @@ from original_annotation.modules.cpg_integration import (
     expand_cpg_gene_mappings, 
     load_pi_cpg_mappings, 
     attach_ewas_atlas_traits,
-    analyze_unmapped_genes
+    analyze_unmapped_genes,
+    normalize_atlas_table
 )
 
 def test_cpg_mapping_expansion():
@@ -140,3 +141,37 @@ def test_analyze_unmapped_genes():
     # appendix_c_df: should have DECIMAL.1
     assert 'DECIMAL.1' in appendix_c_df['genes'].iloc[0]
 
+
+def test_analyze_unmapped_genes_synonym_formats():
+    living_df = pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2', 'GENE3'],
+        # A truncated JSON list, a JSON list with an escape and a ';'-separated string
+        'synonyms': ['["ALIAS_A", "ALIAS_B"', '["X\\u00e9"]', 'ALIAS_C; ALIAS_D'],
+    })
+    mapping_df = pd.DataFrame({'cpg': ['cg1'], 'unique_gene_name': ['GENE1']})
+    atlas_df = pd.DataFrame({'cpg': ['cg1'], 'genes': ['ALIAS_A;X\u00e9;ALIAS_D']})
+
+    _, _, unaccounted_df, _ = analyze_unmapped_genes(atlas_df, living_df, mapping_df)
+
+    synonym_of = dict(zip(unaccounted_df['uncaptured_gene'], unaccounted_df['synonym_of']))
+    assert synonym_of == {'ALIAS_A': '', 'X\u00e9': 'GENE2', 'ALIAS_D': 'GENE3'}
+
+
+def test_normalize_atlas_table_is_idempotent():
+    atlas_df = pd.DataFrame({
+        'cpg': ['cg1', 'cg2', 'cg3'],
+        'p': [1e-5, np.nan, 'n'],
+        'rank': [10, np.nan, 'x'],
+        'pmid': [123.0, np.nan, 456],
+        'total_associations': [100, 50, 0],
+    })
+
+    result = normalize_atlas_table(atlas_df)
+
+    assert list(result.columns) == ['cpg', 'p', 'rank_score', 'rank', 'pmid', 'total_associations']
+    assert result['rank_score'].tolist() == ['0.100', '', '']
+    assert result['rank'].tolist() == ['10', '', '']
+    assert result['pmid'].tolist() == ['123', '', '456']
+
+    again = normalize_atlas_table(result)
+    assert again.to_csv(index=False) == result.to_csv(index=False)
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'ewas-atlas'))
+
+import ewas_atlas_pmid
+from ewas_atlas_pmid import fetch_publications
+
+
+PUBLICATION = {"studyList": [{"assocaitionList": [{"probeId": "cg01", "rank": 1, "pvalue": 1e-8}]}]}
+
+
+def test_null_publications_are_not_cached(tmp_path, monkeypatch):
+    responses = {
+        "111": {"code": 0, "data": PUBLICATION},
+        "222": {"code": 0, "data": None},
+        "333": {"code": 1, "data": None},
+    }
+    calls = []
+
+    def fake_get(pmid):
+        calls.append(pmid)
+        return responses[pmid]
+
+    monkeypatch.setattr(ewas_atlas_pmid, "get_publication_data", fake_get)
+    monkeypatch.setattr(ewas_atlas_pmid, "REQUEST_DELAY", 0)
+    # A null payload cached by an earlier run is treated as never fetched
+    (tmp_path / "444.json").write_text("null")
+    responses["444"] = {"code": 0, "data": None}
+
+    assert fetch_publications(["111", "222", "333", "444"], cache_dir=str(tmp_path)) == {"111": PUBLICATION}
+    assert sorted(calls) == ["111", "222", "333", "444"]
+    assert json.loads((tmp_path / "111.json").read_text()) == PUBLICATION
+    assert not (tmp_path / "222.json").exists()
+    assert not (tmp_path / "333.json").exists()
+
+    # Once the Atlas has the publication, the rerun picks it up; 111 comes from the cache
+    calls.clear()
+    responses["222"] = {"code": 0, "data": PUBLICATION}
+    assert fetch_publications(["111", "222"], cache_dir=str(tmp_path)) == {"111": PUBLICATION, "222": PUBLICATION}
+    assert calls == ["222"]
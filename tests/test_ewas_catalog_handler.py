@@ -0,0 +1,151 @@
+import gzip
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'ewas-catalog'))
+
+import ewas_catalog_handler
+from ewas_catalog_handler import (
+    _lookup_offsets,
+    build_cpg_index,
+    extract_ewas_results,
+    index_is_current,
+    split_byte_ranges,
+)
+
+RESULTS_HEADER = ['CpG', 'Location', 'Chr', 'Pos', 'Gene', 'Type', 'Beta', 'SE', 'P', 'Details', 'StudyID']
+STUDIES = [
+    ['Author', 'PMID', 'Trait', 'StudyID'],
+    ['Monick MM', '22232023', 'Smoking', 'study_smoking'],
+    ['Singmann P', '26500701', 'Sex', 'study_sex'],
+]
+
+
+def _result_line(i):
+    cpg = f"cg{i % 7:08d}"
+    study = ('study_smoking', 'study_sex', 'study_missing')[i % 3]
+    # Some CpGs are quoted, as in exports that went through a spreadsheet
+    cpg_field = f'"{cpg}"' if i % 5 == 0 else cpg
+    return "\t".join([cpg_field, f"chr1:{1000 + i}", '1', str(1000 + i), 'GENE', 'Open sea',
+                      'NA', 'NA', f"{i}e-08", '-', study]) + "\n"
+
+
+def _write_results(path, n_rows=40):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("\t".join(RESULTS_HEADER) + "\n")
+        for i in range(n_rows):
+            f.write(_result_line(i))
+    return path
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    results = _write_results(tmp_path / 'results.txt')
+    studies = tmp_path / 'studies.txt'
+    studies.write_text("\n".join("\t".join(row) for row in STUDIES) + "\n", encoding='utf-8')
+    return results, studies
+
+
+def _extract(tmp_path, label, results, studies, **kwargs):
+    targets = {
+        str(tmp_path / f'{label}_a.csv'): {'cg00000000', 'cg00000003'},
+        str(tmp_path / f'{label}_b.csv'): {'cg00000003', 'cg00000005', 'cg_absent'},
+    }
+    counts = extract_ewas_results(targets, str(results), str(studies), **kwargs)
+    outputs = [open(p, encoding='utf-8').read() for p in targets]
+    return list(counts.values()), outputs
+
+
+def test_indexed_and_parallel_extraction_match_full_scan(tmp_path, catalog):
+    results, studies = catalog
+    gz_results = tmp_path / 'results.txt.gz'
+    with open(results, 'rb') as src, gzip.open(gz_results, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+
+    expected = _extract(tmp_path, 'scan', results, studies, use_index=False)
+    assert expected[0] == [12, 11]
+    assert 'cg00000000,chr1:1000,1,1000,GENE,Open sea,NA,NA,0e-08,-,study_smoking,Monick MM,22232023,Smoking' \
+        in expected[1][0]
+
+    build_cpg_index(str(results))
+    assert index_is_current(str(results))
+    assert _extract(tmp_path, 'indexed', results, studies) == expected
+    assert _extract(tmp_path, 'parallel', results, studies, workers=3, use_index=False) == expected
+    assert _extract(tmp_path, 'gz', gz_results, studies, workers=3) == expected
+
+
+def test_malformed_rows_are_aligned_with_the_header(tmp_path, catalog):
+    results, studies = catalog
+    with open(results, 'a', encoding='utf-8', newline='') as f:
+        # Truncated before StudyID, and with two stray trailing fields
+        f.write("\t".join(['cg00000003', 'chr1:5000', '1', '5000', 'GENE']) + "\n")
+        f.write(_result_line(3).rstrip("\n") + "\textra\tfields\n")
+
+    counts, outputs = _extract(tmp_path, 'malformed', results, studies, use_index=False)
+    assert counts == [14, 13]
+    lines = outputs[0].splitlines()
+    assert all(len(line.split(',')) == len(RESULTS_HEADER) + len(STUDIES[0]) - 1 for line in lines)
+    assert lines[-2] == 'cg00000003,chr1:5000,1,5000,GENE,,,,,,,,,'
+    assert lines[-1].endswith(',study_smoking,Monick MM,22232023,Smoking')
+
+
+def test_lookup_offsets_returns_file_order_spans(tmp_path, catalog, monkeypatch):
+    results, _ = catalog
+    index_path = build_cpg_index(str(results), str(tmp_path / 'cpg.idx'))
+    # Force the IN (...) query to run in several chunks
+    monkeypatch.setattr(ewas_catalog_handler, 'SQLITE_MAX_VARIABLES', 2)
+
+    spans = _lookup_offsets(index_path, ['cg00000005', 'cg00000000', 'cg00000003', 'cg_absent'])
+    assert spans == sorted(spans)
+    raw = results.read_bytes()
+    lines = [raw[offset:offset + length].decode('utf-8') for offset, length in spans]
+    assert lines == [_result_line(i) for i in range(40) if i % 7 in (0, 3, 5)]
+
+
+def test_index_is_rebuilt_after_source_changes(tmp_path, catalog):
+    results, studies = catalog
+    assert not index_is_current(str(results))
+    build_cpg_index(str(results))
+    assert index_is_current(str(results))
+
+    # Appending rows changes the size; the stale index must not be used
+    _write_results(results, n_rows=47)
+    assert not index_is_current(str(results))
+    stale = _extract(tmp_path, 'stale', results, studies)
+    assert stale == _extract(tmp_path, 'scan', results, studies, use_index=False)
+    assert stale[0] == [14, 13]
+
+    build_cpg_index(str(results))
+    assert index_is_current(str(results))
+    assert _extract(tmp_path, 'rebuilt', results, studies) == stale
+
+    # Same size, new contents: caught by the modification time
+    stat = os.stat(results)
+    results.write_text(results.read_text(encoding='utf-8').replace('GENE', 'GENX'), encoding='utf-8')
+    os.utime(results, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not index_is_current(str(results))
+
+
+def test_byte_ranges_start_on_lines_and_cover_the_file(catalog):
+    results, _ = catalog
+    raw = results.read_bytes()
+    ranges = split_byte_ranges(str(results), 4)
+
+    assert len(ranges) == 4
+    assert ranges[0][0] == raw.index(b"\n") + 1 and ranges[-1][1] == len(raw)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(raw[start - 1:start] == b"\n" for start, _ in ranges)
+
+
+def test_compressed_results_cannot_be_indexed(tmp_path):
+    gz_results = tmp_path / 'results.txt.gz'
+    with gzip.open(gz_results, 'wt', encoding='utf-8') as f:
+        f.write("\t".join(RESULTS_HEADER) + "\n")
+    with pytest.raises(ValueError):
+        build_cpg_index(str(gz_results))
+    assert not index_is_current(str(gz_results))
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.excel_export import multiline_columns, write_excel
+
+
+def _export_df():
+    return pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2', 'GENE3'],
+        'count': pd.array([3, None, 1], dtype='Int64'),
+        'score': [0.5, np.nan, 1.25],
+        'traits': ['BMI, 0.100;\nAge, 0.050', None, 'Obesity'],
+        'formula_like': ['=SUM(A1)', 'http://example.org', '00123'],
+    })
+
+
+def test_multiline_columns():
+    assert multiline_columns(_export_df()) == ['traits']
+
+
+@pytest.mark.parametrize("engine", ["xlsxwriter", "openpyxl"])
+def test_write_excel_values_and_wrap(tmp_path, engine):
+    pytest.importorskip(engine)
+    path = tmp_path / "export.xlsx"
+
+    used = write_excel(_export_df(), str(path), wrap_columns=['traits'], engine=engine)
+    assert used == engine
+
+    result = pd.read_excel(path)
+    assert result['symbol'].tolist() == ['GENE1', 'GENE2', 'GENE3']
+    assert result['count'].isna().tolist() == [False, True, False]
+    assert result['score'].iloc[2] == 1.25
+    assert result['traits'].iloc[0] == 'BMI, 0.100;\nAge, 0.050'
+    # Strings stay literal text: no formulas, links or numeric conversion
+    assert result['formula_like'].tolist() == ['=SUM(A1)', 'http://example.org', '00123']
+
+    sheet = load_workbook(path).active
+    assert sheet['D2'].alignment.wrap_text
+    assert not sheet['A2'].alignment.wrap_text
@@ -0,0 +1,41 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.figure_stage import FigureStage
+
+
+def _write_figure(path, text):
+    Path(path).write_text(text)
+
+
+def _broken_figure():
+    raise ValueError("no data")
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_figure_stage_collects_results(tmp_path, parallel):
+    stage = FigureStage(max_workers=2, parallel=parallel)
+    stage.run_command("script", [sys.executable, "-c", f"open({str(tmp_path / 'r.txt')!r}, 'w').write('r')"])
+    stage.run_command("failing script", [sys.executable, "-c", "raise SystemExit(3)"])
+    stage.submit("heatmap", _write_figure, tmp_path / "heatmap.txt", "h")
+    stage.submit("broken", _broken_figure)
+
+    results = stage.wait()
+
+    assert results["heatmap"] is None and results["script"] is None
+    assert results["broken"] == "ValueError: no data"
+    assert results["failing script"] == "exited with status 3"
+    assert (tmp_path / "heatmap.txt").read_text() == "h"
+    assert (tmp_path / "r.txt").read_text() == "r"
+
+
+def test_missing_command_is_reported():
+    stage = FigureStage(parallel=False)
+    stage.run_command("R heatmap", ["definitely-not-an-installed-binary"])
+
+    assert stage.wait()["R heatmap"].startswith("could not start")
@@ -0,0 +1,117 @@
+import gzip
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to sys.path to import our modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import original_annotation.modules.gene_proximity as gene_proximity
+from original_annotation.modules.gene_proximity import (
+    load_gene_annotation,
+    build_tss_windows,
+    interval_join,
+    map_cpgs_to_genes,
+    nearest_tss,
+)
+
+
+def _write_refgene(path):
+    # bin, name, chrom, strand, txStart, txEnd, cdsStart, cdsEnd, exonCount, exonStarts, exonEnds, score, name2
+    lines = [
+        "0\tNM_1\tchr1\t+\t1000\t3000\t1000\t3000\t1\t1000,\t3000,\t0\tPLUSGENE\tcmpl\tcmpl\t0,",
+        "0\tNM_2\tchr1\t-\t5000\t9000\t5000\t9000\t1\t5000,\t9000,\t0\tMINUSGENE\tcmpl\tcmpl\t0,",
+        "0\tNM_3\tchr1_alt\t+\t1000\t3000\t1000\t3000\t1\t1000,\t3000,\t0\tALTGENE\tcmpl\tcmpl\t0,",
+    ]
+    with gzip.open(path, "wt") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_load_refgene_and_gtf(tmp_path):
+    refgene = tmp_path / "refGene.txt.gz"
+    _write_refgene(refgene)
+    genes = load_gene_annotation(refgene)
+
+    assert list(genes["gene"]) == ["PLUSGENE", "MINUSGENE"]  # alt contig dropped
+    assert list(genes["tss"]) == [1000, 8999]
+
+    gtf = tmp_path / "genes.gtf"
+    gtf.write_text(
+        "#!genome-build GRCh38\n"
+        '1\tHAVANA\tgene\t1001\t3000\t.\t+\t.\tgene_id "G1"; gene_name "PLUSGENE";\n'
+        '1\tHAVANA\ttranscript\t1001\t3000\t.\t+\t.\tgene_id "G1"; gene_name "PLUSGENE";\n'
+        '1\tHAVANA\ttranscript\t5001\t9000\t.\t-\t.\tgene_id "G2";\n'
+    )
+    genes = load_gene_annotation(gtf)
+
+    assert list(genes["chr"]) == ["chr1", "chr1"]
+    assert list(genes["gene"]) == ["PLUSGENE", "G2"]  # gene_id used when gene_name is absent
+    assert list(genes["tss"]) == [1000, 8999]
+
+
+def test_tss_windows_are_strand_aware():
+    genes = pd.DataFrame({
+        "gene": ["P", "M"], "chr": ["chr1", "chr1"], "start": [1000, 5000],
+        "end": [3000, 9000], "strand": ["+", "-"], "tss": [1000, 8999],
+    })
+    windows = build_tss_windows(genes, upstream=100, downstream=10)
+
+    assert list(windows["start"]) == [900, 8989]
+    assert list(windows["end"]) == [1011, 9100]
+
+
+def test_interval_join_matches_brute_force(monkeypatch):
+    # Force several chunks to exercise the chunked expansion
+    monkeypatch.setattr(gene_proximity, "JOIN_CHUNK_PAIRS", 50)
+    rng = np.random.default_rng(0)
+    targets = pd.DataFrame({"chr": rng.choice(["chr1", "chr2"], 300), "start": rng.integers(0, 100_000, 300)})
+    targets["end"] = targets["start"] + rng.integers(1, 5_000, 300)
+    queries = pd.DataFrame({"chr": rng.choice(["chr1", "chr2", "chrX"], 200), "start": rng.integers(0, 100_000, 200)})
+    queries["end"] = queries["start"] + 2
+
+    pairs = interval_join(queries, targets)
+
+    expected = [
+        (i, j)
+        for i in range(len(queries))
+        for j in np.flatnonzero(
+            (targets["chr"].to_numpy() == queries["chr"][i])
+            & (targets["start"].to_numpy() < queries["end"][i])
+            & (targets["end"].to_numpy() > queries["start"][i])
+        )
+    ]
+    assert list(zip(pairs["query_idx"], pairs["target_idx"])) == expected
+
+
+def test_map_cpgs_to_genes_with_nearest_fallback():
+    genes = pd.DataFrame({
+        "gene": ["PLUSGENE", "MINUSGENE"], "chr": ["chr1", "chr1"], "start": [1000, 5000],
+        "end": [3000, 9000], "strand": ["+", "-"], "tss": [1000, 8999],
+    })
+    cpgs = pd.DataFrame({
+        "cpg": ["cg_promoter", "cg_minus", "cg_between", "cg_other_chr"],
+        "chr": ["chr1", "1", "chr1", "chr2"],
+        "Start_hg38": [900, 9500, 4000, 100],
+        "End_hg38": [901, 9501, 4001, 101],
+    })
+
+    result = map_cpgs_to_genes(cpgs, genes)
+    assert list(result.columns) == ["cpg", "chr", "unique_gene_name", "Start_hg38", "End_hg38"]
+    assert list(result["unique_gene_name"][:3]) == ["PLUSGENE", "MINUSGENE", "PLUSGENE"]
+    assert pd.isna(result["unique_gene_name"][3])
+
+    strict = map_cpgs_to_genes(cpgs, genes, nearest_fallback=False)
+    assert pd.isna(strict["unique_gene_name"][2])
+
+
+def test_nearest_tss_upstream_of_first_tss():
+    genes = pd.DataFrame({"gene": ["FIRST", "SECOND"], "chr": ["chr1", "chr1"], "tss": [5_000_000, 9_000_000]})
+    cpgs = pd.DataFrame({"chr": ["chr1", "chr1"], "start": [100, 100_000], "end": [101, 100_001]})
+
+    result = nearest_tss(cpgs, genes).sort_values("query_idx")
+    assert list(result["target_idx"]) == [0, 0]
+    assert list(result["distance"]) == [4_999_900, 4_900_000]
+
+    assert nearest_tss(cpgs, genes, max_distance=1000).empty
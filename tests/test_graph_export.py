@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import original_annotation.modules.graph_export as graph_export
+from original_annotation.modules.graph_export import export_graph
+from original_annotation.modules.viz_engine import plot_broad_spectrum_network
+
+
+def _graph():
+    G = nx.Graph()
+    G.add_node("GENE1", type='gene', label='GENE1')
+    G.add_node("GENE2", type='gene', label='GENE2')
+    G.add_node("Disease <A> & B", type='disease', label="Disease <A>\n& B")
+    G.add_node("Disease C", type='disease', label="Disease C")
+    G.add_edge("GENE1", "Disease <A> & B", weight=np.float32(0.5))
+    G.add_edge("GENE2", "Disease <A> & B", weight=0.75)
+    G.add_edge("GENE2", "Disease C", weight=0.25)
+    return G
+
+
+@pytest.mark.parametrize("suffix", [".json", ".graphml", ".gexf"])
+def test_export_round_trip(tmp_path, monkeypatch, suffix):
+    # Small batches exercise the incremental writes
+    monkeypatch.setattr(graph_export, "WRITE_BATCH", 2)
+    G = _graph()
+    pos = {node: (i / 10, -i / 10) for i, node in enumerate(G)}
+
+    path = export_graph(G, tmp_path / f"network{suffix}", pos=pos)
+
+    if suffix == ".json":
+        H = nx.node_link_graph(json.loads(path.read_text()))
+        assert H.nodes["GENE2"]["x"] == pytest.approx(0.1)
+    elif suffix == ".graphml":
+        H = nx.read_graphml(path)
+        assert H.nodes["GENE2"]["y"] == pytest.approx(-0.1)
+    else:
+        H = nx.read_gexf(path)
+        assert H.nodes["GENE2"]["viz"]["position"]["x"] == pytest.approx(0.1)
+
+    assert set(H.nodes) == set(G.nodes)
+    assert {frozenset(e) for e in H.edges} == {frozenset(e) for e in G.edges}
+    assert H.edges["GENE2", "Disease C"]["weight"] == pytest.approx(0.25)
+    assert H.nodes["Disease <A> & B"]["label"] == "Disease <A>\n& B"
+    assert H.nodes["GENE1"]["type"] == 'gene'
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_graph(_graph(), tmp_path / "network.dot")
+
+
+def test_network_export_without_rendering(tmp_path):
+    df = pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2'],
+        'disgenet_diseases': ['Disease A, 0.7;\nDisease B, 0.05', 'Disease A, 0.4'],
+    })
+
+    plot_broad_spectrum_network(df, output_path=None, export_path=str(tmp_path / "network.gexf"))
+
+    H = nx.read_gexf(tmp_path / "network.gexf")
+    assert set(H.nodes) == {'GENE1', 'GENE2', 'Disease A'}
+    assert not list(tmp_path.glob("*.png"))
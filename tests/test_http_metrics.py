@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules import function_annotation, pubmed_association
+from original_annotation.modules.http_metrics import METRICS, HttpMetrics, service_for_url
+
+
+def _response(status, body=b"{}"):
+    return SimpleNamespace(status_code=status, content=body, text=body.decode(),
+                           json=lambda: json.loads(body))
+
+
+def test_registry_counts_statuses_errors_and_cache(tmp_path):
+    metrics = HttpMetrics()
+    for status, body in [(200, b"x" * 1024), (429, b""), (503, b""), (404, b"")]:
+        with metrics.request("UniProt") as call:
+            call.response = _response(status, body)
+    with pytest.raises(requests.ConnectionError):
+        with metrics.request("UniProt"):
+            raise requests.ConnectionError("reset")
+    metrics.retry("UniProt")
+    metrics.cache_hit("UniProt")
+    metrics.cache_hit("UniProt")
+    metrics.cache_miss("UniProt")
+    metrics.observe("NCBI", 12.0, status=200)
+
+    stats = metrics.snapshot()
+    uniprot = stats["UniProt"]
+    assert (uniprot["requests"], uniprot["errors"], uniprot["retries"]) == (5, 1, 1)
+    assert (uniprot["status_429"], uniprot["status_5xx"], uniprot["status_other"]) == (1, 1, 1)
+    assert uniprot["bytes_received"] == 1024
+    assert uniprot["cache_hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+    assert sum(uniprot["latency_histogram"].values()) == 5
+    # Slowest service first; a single 12 s call sits in the 30 s bucket
+    assert list(stats) == ["NCBI", "UniProt"]
+    assert stats["NCBI"]["latency_histogram"]["<=30s"] == 1
+    assert stats["NCBI"]["latency_p95_s"] == 12.0
+
+    exported = json.loads(metrics.write_json(tmp_path / "http.json").read_text())
+    assert exported["services"]["UniProt"]["requests"] == 5
+
+
+def test_service_for_url():
+    assert service_for_url("https://rest.uniprot.org/uniprotkb/P12345.json") == "UniProt"
+    assert service_for_url("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi") == "E-utilities"
+    assert service_for_url("https://ngdc.cncb.ac.cn/ewas/rest/publication?pmid=22232023") == "EWAS Atlas"
+    assert service_for_url("https://example.org/x") == "example.org"
+
+
+def test_json_helper_records_retries(monkeypatch):
+    responses = iter([_response(429), _response(200, b'{"ok": true}')])
+    monkeypatch.setattr(function_annotation.requests, "get", lambda *a, **k: next(responses))
+    monkeypatch.setattr(function_annotation.time, "sleep", lambda s: None)
+    METRICS.reset()
+
+    data = function_annotation._http_get_json_with_retries("https://rest.genenames.org/fetch/hgnc_id/1")
+
+    assert data == {"ok": True}
+    hgnc = METRICS.snapshot()["HGNC"]
+    assert (hgnc["requests"], hgnc["retries"], hgnc["status_429"]) == (2, 1, 1)
+    METRICS.reset()
+
+
+def test_eutils_get_retries_dropped_connections(monkeypatch):
+    attempts = []
+
+    def get(*args, **kwargs):
+        attempts.append(kwargs["params"])
+        if len(attempts) == 1:
+            raise requests.exceptions.ConnectionError("Connection aborted: RemoteDisconnected")
+        return SimpleNamespace(status_code=200, text="<eSearchResult/>", content=b"<eSearchResult/>",
+                               raise_for_status=lambda: None)
+
+    monkeypatch.setattr(pubmed_association.requests, "get", get)
+    monkeypatch.setattr(pubmed_association.time, "sleep", lambda s: None)
+    METRICS.reset()
+
+    text = pubmed_association._eutils_get("esearch.fcgi", {"db": "pubmed", "term": "BDNF"}, email="test@example.org")
+
+    assert text == "<eSearchResult/>"
+    assert len(attempts) == 2
+    eutils = METRICS.snapshot()["E-utilities"]
+    assert (eutils["requests"], eutils["errors"], eutils["retries"]) == (2, 1, 1)
+    METRICS.reset()
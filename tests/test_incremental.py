@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.incremental import (
+    diff_rows,
+    read_manifest,
+    row_hashes,
+    row_keys,
+    write_manifest,
+)
+
+
+def _base():
+    return pd.DataFrame({
+        'cpg': ['cg1', 'cg2', 'cg2', 'cg3'],
+        'gene': ['GENE1', 'GENE2', 'GENE2', None],
+        'cpg_start': [100, 200, 200, 300],
+    })
+
+
+def test_row_keys_are_unique_per_row():
+    keys = row_keys(_base(), ['cpg', 'gene'])
+    assert list(keys) == ['cg1|GENE1', 'cg2|GENE2', 'cg2|GENE2#1', 'cg3|<NA>']
+
+
+def test_diff_reuses_unchanged_rows(tmp_path):
+    old = _base()
+    fingerprints = {'atlas': 'abc', 'gea': None}
+    manifest = tmp_path / "out.parquet.manifest.json"
+    write_manifest(manifest, row_keys(old, ['cpg', 'gene']), row_hashes(old), fingerprints)
+
+    # cg1 moved, cg3 removed, cg4 added
+    new = pd.DataFrame({
+        'cpg': ['cg4', 'cg1', 'cg2', 'cg2'],
+        'gene': ['GENE4', 'GENE1', 'GENE2', 'GENE2'],
+        'cpg_start': [400, 150, 200, 200],
+    })
+    keys, hashes = row_keys(new, ['cpg', 'gene']), row_hashes(new)
+
+    diff = diff_rows(keys, hashes, read_manifest(manifest), fingerprints, previous_len=len(old))
+    assert not diff.full
+    assert diff.changed.tolist() == [True, True, False, False]
+    assert diff.previous_rows.tolist() == [-1, -1, 1, 2]
+    assert diff.removed == 1
+
+    same = diff_rows(row_keys(old, ['cpg', 'gene']), row_hashes(old), read_manifest(manifest),
+                     fingerprints, previous_len=len(old))
+    assert same.up_to_date
+
+    # A changed source file invalidates every row
+    changed_source = diff_rows(keys, hashes, read_manifest(manifest), {'atlas': 'def', 'gea': None},
+                               previous_len=len(old))
+    assert changed_source.full and changed_source.changed.all()
+    assert 'atlas' in changed_source.reason
+    assert diff_rows(keys, hashes, None, fingerprints, previous_len=None).changed.all()
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.living_store import (
+    coerce_mixed_columns,
+    read_living_file,
+    write_csv_if_changed,
+    write_living_file,
+)
+
+pytest.importorskip("pyarrow")
+
+
+def _living_df():
+    return pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2', 'GENE3'],
+        'entrez': [101, 202, 303],
+        'synonyms': [['A1', 'A2'], 'B1', None],
+        'mixed': [1, 'two', None],
+    })
+
+
+def test_coerce_mixed_columns_only_touches_mixed_columns():
+    coerced = coerce_mixed_columns(_living_df())
+
+    assert coerced['entrez'].tolist() == [101, 202, 303]
+    assert coerced['synonyms'].tolist()[:2] == ['["A1", "A2"]', 'B1']
+    assert coerced['mixed'].tolist()[:2] == ['1', 'two']
+    assert coerced['mixed'].isna().iloc[2]
+
+
+@pytest.mark.parametrize("name", ["living.parquet", "living.feather", "living.csv"])
+def test_round_trip(tmp_path, name):
+    path = write_living_file(_living_df(), tmp_path / name)
+    result = read_living_file(path)
+
+    assert path == tmp_path / name
+    assert result['symbol'].tolist() == ['GENE1', 'GENE2', 'GENE3']
+    assert result['entrez'].tolist() == [101, 202, 303]
+    assert result['synonyms'].iloc[0] == '["A1", "A2"]'
+
+
+def test_migrates_legacy_workbook(tmp_path):
+    legacy = tmp_path / "annotated_genes.xlsx"
+    pd.DataFrame({'symbol': ['GENE1'], 'entrez': [101]}).to_excel(legacy, index=False)
+
+    result = read_living_file(tmp_path / "annotated_genes.parquet")
+
+    assert result['symbol'].tolist() == ['GENE1']
+    assert (tmp_path / "annotated_genes.parquet").is_file()
+
+
+def test_missing_living_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_living_file(tmp_path / "missing.parquet")
+
+
+def test_write_csv_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / "atlas.csv"
+    df = pd.DataFrame({'cpg': ['cg1', 'cg2'], 'rank_score': ['0.100', '']})
+
+    assert write_csv_if_changed(df, path)
+    mtime = path.stat().st_mtime_ns
+    assert (tmp_path / "atlas.csv.sha256").is_file()
+
+    assert not write_csv_if_changed(df.copy(), path)
+    assert path.stat().st_mtime_ns == mtime
+
+    df.loc[1, 'rank_score'] = '0.200'
+    assert write_csv_if_changed(df, path)
+    assert pd.read_csv(path)['rank_score'].tolist() == [0.1, 0.2]
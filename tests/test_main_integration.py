@@ -17,3 +17,32 @@ def test_main_logic_integration():
     # 3. Broad-spectrum DisGeNET associations
     
     pass
+
+
+def _failing_pipeline(seen):
+    def run(input_path, args, profiler):
+        seen.append(profiler)
+        with profiler.stage("hgnc_pull"):
+            raise RuntimeError("upstream down")
+    return run
+
+
+@pytest.mark.parametrize("argv, traced", [([], True), (["--no-trace-allocations"], False)])
+def test_main_stops_tracing_when_a_stage_fails(tmp_path, monkeypatch, argv, traced):
+    import tracemalloc
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'original_annotation')))
+    import main as pipeline
+
+    genes = tmp_path / "genes.txt"
+    genes.write_text("BDNF\n")
+    monkeypatch.chdir(tmp_path)
+    seen = []
+    monkeypatch.setattr(pipeline, "run_pipeline", _failing_pipeline(seen))
+
+    with pytest.raises(RuntimeError):
+        pipeline.main([str(genes)] + argv)
+
+    assert seen[0].trace_allocations is traced
+    assert not tracemalloc.is_tracing()
+    assert seen[0].stages[0].error == "RuntimeError: upstream down"
@@ -0,0 +1,70 @@
+import gzip
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'ucsc'))
+
+from manifest_verify import load_manifest, verify_against_manifest
+
+
+def _write_illumina_manifest(path):
+    # Heading block, probe table and a [Controls] section, as in the EPIC CSVs
+    lines = [
+        "Illumina, Inc.,,,,",
+        "[Heading],,,,",
+        "Descriptor File Name,EPIC.csv,,,",
+        "[Assay],,,,",
+        "IlmnID,Name,CHR_hg38,Start_hg38,End_hg38",
+        "cg01_BC11,cg01,chr1,1000,1002",
+        "cg02_TC11,cg02,chr2,5000,5002",
+        "cg02_TC12,cg02,chr2,9999,10001",
+        "cg03_BC11,cg03,chrX,700,702",
+        "[Controls],,,,",
+        "21630339,STAINING,Red,,",
+    ]
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def test_load_illumina_manifest(tmp_path):
+    manifest = load_manifest(_write_illumina_manifest(tmp_path / "EPIC.csv.gz"))
+
+    assert list(manifest.index) == ["cg01", "cg02", "cg03"]
+    # Replicate probes keep their first entry
+    assert manifest.loc["cg02", "start"] == 5000
+    assert str(manifest["start"].dtype) == "Int64"
+
+
+def test_verify_matches_mismatches_and_missing_probes(tmp_path):
+    manifest = load_manifest(_write_illumina_manifest(tmp_path / "EPIC.csv.gz"))
+    df = pd.DataFrame({
+        "cpg": ["cg01", "cg02", "cg03", "cg_absent", " cg01 "],
+        "chr": ["1", "chr2", "chr3", "chr1", "chr1"],
+        "Start_hg38": [1000, 5001, 700, 10, 1000],
+        "End_hg38": [1002, 5002, 702, 12, 1003],
+    })
+
+    verified, mismatches = verify_against_manifest(df, manifest)
+
+    # Bare chromosome numbers and stray whitespace in IDs still match
+    assert verified.tolist() == [True, False, False, False, False]
+    assert mismatches["cpg"].tolist() == ["cg02", "cg03", "cg_absent", " cg01 "]
+    assert mismatches["issue"].tolist() == ["start_mismatch", "chr_mismatch", "not_in_manifest", "end_mismatch"]
+    missing = mismatches[mismatches["issue"] == "not_in_manifest"].iloc[0]
+    assert pd.isna(missing["manifest_chr"]) and pd.isna(missing["manifest_start"])
+    assert mismatches.loc[0, ["manifest_chr", "manifest_start", "manifest_end"]].tolist() == ["chr2", 5000, 5002]
+
+
+def test_verify_with_start_offset(tmp_path):
+    manifest = pd.DataFrame({"chr": ["chr1"], "start": pd.array([1001], dtype="Int64"),
+                             "end": pd.array([1003], dtype="Int64")}, index=pd.Index(["cg01"], name="probe"))
+    df = pd.DataFrame({"cpg": ["cg01"], "chr": ["chr1"], "Start_hg38": [1000], "End_hg38": [1002]})
+
+    assert not verify_against_manifest(df, manifest)[0][0]
+    verified, mismatches = verify_against_manifest(df, manifest, start_offset=-1)
+    assert verified.tolist() == [True] and mismatches.empty
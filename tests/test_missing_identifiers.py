@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules import function_annotation, pubmed_association
+
+
+def _recording_get(calls):
+    # The fetch helpers swallow request errors, so record calls rather than raise
+    def get(url, *args, **kwargs):
+        calls.append((url, kwargs.get("params")))
+        raise AssertionError(f"unexpected request to {url}")
+    return get
+
+
+def test_function_annotation_skips_nan_accessions(monkeypatch):
+    # Genes NCBI could not resolve reach this stage with NaN identifiers
+    calls = []
+    monkeypatch.setattr(function_annotation.requests, "get", _recording_get(calls))
+    gene_db = pd.DataFrame({
+        "summary_text": ["Cytokine receptor.", np.nan],
+        "uniprot_primary_accession": [np.nan, np.nan],
+        "hgnc_id": [np.nan, None],
+    })
+
+    out = function_annotation.run_function_annotation(gene_db)
+
+    assert calls == []
+    na = function_annotation.NA_PLACEHOLDER
+    assert out["function_uniprot"].tolist() == [na, na]
+    assert out["function_hgnc"].tolist() == [na, na]
+    assert out.loc[0, "function_ncbi"] == "Cytokine receptor."
+
+
+def test_pubmed_annotation_skips_nan_symbols(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pubmed_association.requests, "get", _recording_get(calls))
+    df = pd.DataFrame({"approved_symbol": [np.nan], "entrez_id": [np.nan]})
+
+    out, assoc = pubmed_association.annotate_df_with_psych_literature(
+        df, email="test@example.org", pause=0, return_associations=True,
+    )
+
+    assert calls == []
+    assert out.loc[0, "pubmed_count"] == 0 and out.loc[0, "pubmed_pmids"] == ""
+    assert assoc.empty
@@ -37,4 +37,30 @@ def test_generate_summary_report(tmp_path):
     assert "# Psychiatric Epigenetics Discovery Report" in content
     assert "Top Psychiatric Associations" in content
     assert "GENE1" in content
-    assert "Schizophrenia" in content
\ No newline at end of file
+    assert "Schizophrenia" in content
+
+
+def test_report_top_k_and_sections(tmp_path):
+    df = pd.DataFrame({
+        'symbol': ['GENE1', 'GENE2', 'GENE3'],
+        'cpg': ['cg1', 'cg2', 'cg1'],
+        'disgenet_psych_diseases': ['Schizophrenia, 0.7;\nBipolar Disorder, 0.5', 'Depression, 0.9', 'n/a'],
+        'disgenet_diseases': ['Asthma, 0.4;\nSchizophrenia, 0.7', 'Asthma, 0.6', 'n/a'],
+        'ewas_atlas_traits': ['BMI;\nSmoking', 'n/a', 'Age'],
+    })
+
+    output_file = tmp_path / "summary_report.md"
+    generate_summary_report(df, output_path=str(output_file), top_k=1,
+                            sections=("psych_hits", "disease_gene_counts", "cpg_trait_density"))
+    content = output_file.read_text()
+
+    # Only the single strongest psychiatric hit is listed
+    assert "| GENE2 | Depression | 0.9 |" in content
+    assert "Bipolar Disorder" not in content
+    assert "| Asthma | 2 | 0.500 |" in content
+    assert "| cg1 | 3 | GENE1, GENE3 |" in content
+    assert "Top Epigenetic Trait Clusters" not in content
+    assert "## Interpretation" not in content
+
+    with pytest.raises(ValueError):
+        generate_summary_report(df, output_path=str(output_file), sections=("bogus",))
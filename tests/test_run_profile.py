@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.run_profile import RunProfiler
+
+
+def test_stages_are_recorded_and_reported(tmp_path):
+    report_path = tmp_path / "run_report.json"
+    profiler = RunProfiler(report_path=report_path)
+    df = pd.DataFrame({"a": range(10)})
+
+    with profiler.stage("load", rows_in=df) as stage:
+        blocks = [bytearray(64 * 1024) for _ in range(16)]
+        stage.rows_out = df[df["a"] > 4]
+    with profiler.stage("count", rows_in=5):
+        pass
+    profiler.close()
+
+    assert not tracemalloc.is_tracing()
+    report = json.loads(report_path.read_text())
+    assert [s["name"] for s in report["stages"]] == ["load", "count"]
+    load = report["stages"][0]
+    assert (load["rows_in"], load["rows_out"]) == (10, 5)
+    assert load["wall_s"] >= 0 and load["cpu_s"] >= 0
+    assert load["traced_peak_mb"] >= 1.0
+    assert any(a["size_diff_kb"] > 0 for a in load["top_allocations"])
+    assert report["stages"][1]["rows_out"] is None
+    del blocks
+
+
+def test_failed_stage_is_recorded(tmp_path):
+    report_path = tmp_path / "run_report.json"
+    profiler = RunProfiler(report_path=report_path, trace_allocations=False)
+
+    with pytest.raises(KeyError):
+        with profiler.stage("lookup"):
+            {}["missing"]
+
+    stage = json.loads(report_path.read_text())["stages"][0]
+    assert stage["error"] == "KeyError: 'missing'"
+    assert stage["traced_peak_mb"] is None and stage["top_allocations"] == []
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,82 @@
+import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from original_annotation.modules.disgenet_utils import annotate_with_disgenet, build_disgenet_associations, load_disgenet
+from original_annotation.modules.schema import DISGENET_DTYPES, GENE_TABLE_DTYPES, apply_schema, read_csv_with_schema
+
+
+def test_apply_schema_casts_known_columns_and_keeps_bad_ones():
+    df = pd.DataFrame({
+        'cpg_chr': ['chr1', 'chr2', 'chr1'],
+        'cpg_start': [100, None, 300],
+        'gwas_assoc_count': ['1', 'many', '3'],  # not castable to Int32
+        'other': ['a', 'b', 'c'],
+    })
+    out = apply_schema(df, GENE_TABLE_DTYPES)
+
+    assert isinstance(out['cpg_chr'].dtype, pd.CategoricalDtype)
+    assert str(out['cpg_start'].dtype) == 'Int32'
+    assert out['gwas_assoc_count'].tolist() == ['1', 'many', '3']
+    assert out['other'].dtype == df['other'].dtype
+
+
+def test_read_csv_with_schema_falls_back_on_unparsable_column(tmp_path):
+    path = tmp_path / "table.csv"
+    pd.DataFrame({'cpg_chr': ['chr1', 'chr2'], 'cpg_start': ['100', 'unknown']}).to_csv(path, index=False)
+
+    df = read_csv_with_schema(path, GENE_TABLE_DTYPES)
+    assert isinstance(df['cpg_chr'].dtype, pd.CategoricalDtype)
+    assert df['cpg_start'].tolist() == ['100', 'unknown']
+
+
+def test_disgenet_annotation_unchanged_by_categorical_load(tmp_path):
+    gea = pd.DataFrame({
+        'gene_symbol': ['GENE1', 'GENE1', 'GENE2'],
+        'disease_name': ['Schizophrenia', 'Schizophrenia', 'Asthma'],
+        'diseaseClasses_UMLS_ST': ['Mental or Behavioral Dysfunction (T048)'] * 2 + ['Disease or Syndrome (T047)'],
+        'score': [0.7, 0.7, 0.3],
+        'polarity': [None, 'Positive', None],
+        'pmYear': [2021, None, 2019],
+        'reference_type': ['PMID'] * 3,
+        'reference': [456, 457, 789],
+        'source': ['S1'] * 3,
+        'associationType': ['T1'] * 3,
+    })
+    path = tmp_path / "gea.csv"
+    gea.to_csv(path, index=False)
+    genes = pd.DataFrame({'symbol': ['GENE1', 'GENE2', 'GENE3']})
+
+    compact = load_disgenet(path)
+    assert isinstance(compact['polarity'].dtype, pd.CategoricalDtype)
+    assert str(compact['pmYear'].dtype) == 'Int16'
+
+    expected = annotate_with_disgenet(genes, pd.read_csv(path), psych_only=False)
+    pd.testing.assert_frame_equal(annotate_with_disgenet(genes, compact, psych_only=False), expected)
+
+
+def test_disgenet_associations_from_categorical_load_keep_observed_pairs(tmp_path):
+    gea = pd.DataFrame({
+        'gene_symbol': ['GENE1', 'GENE1', 'GENE2', 'GENE3', 'GENE4'],
+        'disease_name': ['Schizophrenia', 'Schizophrenia', 'Asthma', 'Autism', 'Gout'],
+        'diseaseClasses_UMLS_ST': ['Mental or Behavioral Dysfunction (T048)'] * 2
+                                  + ['Disease or Syndrome (T047)', 'Mental or Behavioral Dysfunction (T048)',
+                                     'Disease or Syndrome (T047)'],
+        'score': [0.7, 0.7, 0.3, 0.5, 0.1],
+        'reference_type': ['PMID'] * 5,
+        'reference': [456, 457, 789, 790, 791],
+    })
+    path = tmp_path / "gea.csv"
+    gea.to_csv(path, index=False)
+    compact = read_csv_with_schema(path, DISGENET_DTYPES)
+    assert isinstance(compact['disease_name'].dtype, pd.CategoricalDtype)
+    genes = pd.DataFrame({'symbol': ['GENE1', 'GENE2', 'GENE3']})
+
+    broad = build_disgenet_associations(genes, compact, psych_only=False)
+    assert len(broad) == 3
+    assert sorted(zip(broad['gene'], broad['term'])) == [
+        ('GENE1', 'Schizophrenia'), ('GENE2', 'Asthma'), ('GENE3', 'Autism')]
+    assert broad.loc[broad['gene'] == 'GENE1', 'pmid'].item() == '456;457'
+    assert len(build_disgenet_associations(genes, compact, psych_only=True)) == 2
@@ -0,0 +1,169 @@
+import gzip
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'ucsc'))
+
+from ucsc_offline import BED_FIELDS, ChromIndex, LocalTrack, LocalTrackStore, parse_schema
+
+
+def _write_lines(path, lines):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def test_chrom_index_overlaps_are_half_open_and_start_ordered():
+    # A long item starting far left, a zero-length insertion and unsorted input
+    index = ChromIndex([500, 100, 300, 450], [510, 1000, 300, 460], ['c', 'long', 'insertion', 'b'])
+
+    assert [index.rows[i] for i in index.query(450, 500)] == ['long', 'b']
+    assert [index.rows[i] for i in index.query(300, 301)] == ['long', 'insertion']
+    assert [index.rows[i] for i in index.query(1000, 2000)] == []
+    assert index.query(0, 100) == []
+
+
+# gwasCatalog.sql and a row from hg38 gwasCatalog.txt.gz, as UCSC ships them (no header line)
+GWAS_CATALOG_SQL = """CREATE TABLE `gwasCatalog` (
+  `bin` smallint(5) unsigned NOT NULL,
+  `chrom` varchar(255) NOT NULL,
+  `chromStart` int(10) unsigned NOT NULL,
+  `chromEnd` int(10) unsigned NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `pubMedID` int(10) unsigned NOT NULL,
+  `author` varchar(255) NOT NULL,
+  `pubDate` varchar(255) NOT NULL,
+  `journal` varchar(255) NOT NULL,
+  `title` varchar(1024) NOT NULL,
+  `trait` varchar(255) NOT NULL,
+  `initSample` longblob NOT NULL,
+  `replSample` longblob NOT NULL,
+  `region` varchar(255) NOT NULL,
+  `genes` longblob NOT NULL,
+  `riskAllele` longblob NOT NULL,
+  `riskAlFreq` varchar(255) NOT NULL,
+  `pValue` double NOT NULL,
+  `pValueDesc` varchar(255) NOT NULL,
+  `orOrBeta` varchar(255) NOT NULL,
+  `ci95` varchar(255) NOT NULL,
+  `platform` varchar(255) NOT NULL,
+  `cnv` enum('Y','N') NOT NULL,
+  KEY `chrom` (`chrom`,`bin`),
+  KEY `name` (`name`)
+) ENGINE=MyISAM DEFAULT CHARSET=latin1;
+"""
+GWAS_CATALOG_ROW = "\t".join([
+    "585", "chr1", "1005005", "1005006", "rs3934834", "19851299", "Hancock DB", "2009-11-25", "PLoS Genet",
+    "Genome-wide association study of schizophrenia", "Schizophrenia", "1,000 European ancestry cases", "NA",
+    "1p36.33", "HES4", "rs3934834-C", "0.7", "3E-6", "(males)", "1.12", "[1.07-1.18]",
+    "Illumina [~2.3M]", "N",
+])
+
+
+def test_headerless_table_dump_reads_the_sql_schema(tmp_path):
+    path = _write_lines(tmp_path / 'gwasCatalog.txt.gz', [GWAS_CATALOG_ROW])
+    (tmp_path / 'gwasCatalog.sql').write_text(GWAS_CATALOG_SQL)
+    track = LocalTrack(path)
+
+    assert track.fields[:5] == ["chrom", "chromStart", "chromEnd", "name", "pubMedID"]
+    assert track.query("chr1", 1_000_000, 1_010_000) == [{
+        "chrom": "chr1", "chromStart": 1005005, "chromEnd": 1005006, "name": "rs3934834",
+        "pubMedID": 19851299, "author": "Hancock DB", "pubDate": "2009-11-25", "journal": "PLoS Genet",
+        "title": "Genome-wide association study of schizophrenia", "trait": "Schizophrenia",
+        "initSample": "1,000 European ancestry cases", "replSample": "NA", "region": "1p36.33",
+        "genes": "HES4", "riskAllele": "rs3934834-C",
+        # Numeric-looking text columns stay text, as in the API's JSON
+        "riskAlFreq": "0.7", "pValue": 3e-06, "pValueDesc": "(males)", "orOrBeta": "1.12",
+        "ci95": "[1.07-1.18]", "platform": "Illumina [~2.3M]", "cnv": "N",
+    }]
+
+
+def test_headerless_table_dump_without_schema_is_refused(tmp_path):
+    path = _write_lines(tmp_path / 'gwasCatalog.txt.gz', [GWAS_CATALOG_ROW])
+    with pytest.raises(ValueError, match=r"\.sql"):
+        LocalTrack(path)
+
+    track = LocalTrack(path, fields=[name for name, _ in parse_schema(GWAS_CATALOG_SQL)])
+    item = track.query("chr1", 1005005, 1005006)[0]
+    # Explicit names carry no types: only standard BED columns would be converted
+    assert item["trait"] == "Schizophrenia" and item["pubMedID"] == "19851299"
+
+
+def test_autosql_schema_types():
+    sql = """table bed6Plus "example"
+    (
+    string chrom;      "Chromosome"
+    uint   chromStart; "Start"
+    uint   chromEnd;   "End"
+    string name;       "Name"
+    uint   score;      "Score"
+    char[1] strand;    "Strand"
+    float  signal;     "Signal"
+    int    blockCount; "Blocks"
+    int[blockCount] blockSizes; "Sizes"
+    lstring note;      "Free text"
+    )"""
+    assert parse_schema(sql) == [("chrom", None), ("chromStart", int), ("chromEnd", int), ("name", None),
+                                 ("score", int), ("strand", None), ("signal", float), ("blockCount", int),
+                                 ("blockSizes", None), ("note", None)]
+
+
+def test_header_names_columns_and_non_finite_values_stay_text(tmp_path):
+    path = _write_lines(tmp_path / 'gwasCatalog.txt.gz', [
+        "#bin\tchrom\tchromStart\tchromEnd\tname\tpValue\ttrait",
+        "585\tchr1\t1000\t1001\trs1\t2e-08\tSchizophrenia",
+        "585\tchr1\t5000\t5001\tinf\tnan\tInfinity",
+    ])
+    header_only = LocalTrack(path)
+    assert header_only.fields == ["chrom", "chromStart", "chromEnd", "name", "pValue", "trait"]
+    # Without a schema, non-BED columns are not guessed to be numeric
+    assert header_only.query("chr1", 1000, 1001)[0]["pValue"] == "2e-08"
+
+    (tmp_path / 'gwasCatalog.as').write_text(
+        'table gwasCatalog "x"\n(\nushort bin; ""\nstring chrom; ""\nuint chromStart; ""\n'
+        'uint chromEnd; ""\nstring name; ""\ndouble pValue; ""\nstring trait; ""\n)')
+    typed = LocalTrack(path)
+    assert typed.query("chr1", 0, 2000)[0]["pValue"] == 2e-08
+    assert typed.query("chr1", 5000, 5001)[0] == {
+        "chrom": "chr1", "chromStart": 5000, "chromEnd": 5001, "name": "inf", "pValue": "nan", "trait": "Infinity",
+    }
+    assert typed.query("chr3", 0, 100) == []
+
+
+def test_headerless_bed_uses_standard_fields(tmp_path):
+    path = _write_lines(tmp_path / 'clinvarMain.bed', [
+        "track name=clinvar",
+        "chr1\t100\t200\tVCV1\t0\t+\t100\t200\t0,0,0\tpathogenic",
+        "",
+        "chr1\t150\t150\tVCV2\t1000\t-",
+    ])
+    track = LocalTrack(path)
+
+    assert track.fields == BED_FIELDS
+    assert track.query("chr1", 150, 151) == [
+        {"chrom": "chr1", "chromStart": 100, "chromEnd": 200, "name": "VCV1", "score": 0, "strand": "+",
+         "thickStart": 100, "thickEnd": 200, "itemRgb": "0,0,0", "blockCount": "pathogenic"},
+        {"chrom": "chr1", "chromStart": 150, "chromEnd": 150, "name": "VCV2", "score": 1000, "strand": "-"},
+    ]
+
+
+def test_store_fetch_ranges_and_item_cap(tmp_path):
+    _write_lines(tmp_path / 'gwasCatalog.bed', [f"chr1\t{start}\t{start + 10}\trs{start}" for start in range(0, 100, 10)])
+    store = LocalTrackStore(str(tmp_path))
+
+    items, truncated = store.fetch("chr1", "25", "45", "gwasCatalog")
+    assert [h["name"] for h in items] == ["rs20", "rs30", "rs40"] and truncated is False
+    assert store.fetch("chr1", 100, 200, "gwasCatalog") == ([], False)
+
+    # Local lookups are never capped, so a batched caller never needs to split a span
+    capped, truncated = store.fetch("chr1", 0, 100, "gwasCatalog", max_items=2)
+    assert len(capped) == 10 and truncated is False
+    assert store.get_track("gwasCatalog") is store.get_track("gwasCatalog")
+
+    with pytest.raises(FileNotFoundError, match="clinvarMain.bb"):
+        store.fetch("chr1", 0, 100, "clinvarMain")
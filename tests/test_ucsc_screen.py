@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'ucsc'))
+
+import ucsc_screen
+from ucsc_screen import GWAS_WINDOW_SIZE, VERIFY_TRACK, screen_batched, screen_cpg
+
+
+def _item(chrom, start, end, name):
+    return {'chrom': chrom, 'chromStart': start, 'chromEnd': end, 'name': name}
+
+
+# Three probes 50bp apart merge into one span, which hits a 2-item cap and must split
+ROWS = [
+    {'cpg': 'cg01', 'chr': 'chr1', 'Start_hg38': 10_000, 'End_hg38': 10_001},
+    {'cpg': 'cg02', 'chr': 'chr1', 'Start_hg38': 10_050, 'End_hg38': 10_051},
+    {'cpg': 'cg03', 'chr': 'chr1', 'Start_hg38': 10_100, 'End_hg38': 10_101},
+    {'cpg': 'cg04', 'chr': 'chr1', 'Start_hg38': 60_000, 'End_hg38': 60_001},
+    {'cpg': 'cg05', 'chr': 'chr2', 'Start_hg38': 4_000, 'End_hg38': 4_001},
+    {'cpg': 'cg_moved', 'chr': 'chr2', 'Start_hg38': 90_000, 'End_hg38': 90_001},
+]
+
+TRACK_ITEMS = {
+    VERIFY_TRACK: [_item(r['chr'], r['Start_hg38'], r['End_hg38'], r['cpg']) for r in ROWS[:5]]
+                  + [_item('chr2', 95_000, 95_001, 'cg_moved')],
+    'clinvarMain': [
+        _item('chr1', 10_040, 10_060, 'VCV1'),      # overlaps cg02 only
+        _item('chr1', 10_101, 10_200, 'VCV2'),      # starts where cg03 ends
+        _item('chr2', 3_990, 4_001, 'VCV3'),        # ends on cg05's last base
+    ],
+    'gwasCatalog': [
+        _item('chr1', 60_000 - GWAS_WINDOW_SIZE - 1, 60_000 - GWAS_WINDOW_SIZE, 'rs_before'),  # ends at window start
+        _item('chr1', 60_001 + GWAS_WINDOW_SIZE - 1, 60_001 + GWAS_WINDOW_SIZE, 'rs_last'),    # window's last base
+        _item('chr1', 60_001 + GWAS_WINDOW_SIZE, 60_002 + GWAS_WINDOW_SIZE, 'rs_after'),      # starts at window end
+        _item('chr1', 12_000, 12_001, 'rs_shared'),
+        _item('chr2', 0, 1, 'rs_chrom_start'),      # cg05's window is clamped at 0
+    ],
+}
+
+
+def _stub_get(url, params, calls):
+    """UCSC getData/track stand-in: half-open overlap, maxItemsOutput cap and maxItemsLimit flag."""
+    calls.append(dict(params))
+    items = [h for h in TRACK_ITEMS[params['track']]
+             if h['chrom'] == params['chrom'] and h['chromStart'] < params['end'] and h['chromEnd'] > params['start']]
+    payload = {params['track']: items}
+    limit = params.get('maxItemsOutput')
+    if limit and len(items) > limit:
+        payload = {params['track']: items[:limit], 'maxItemsLimit': True}
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(payload).encode('utf-8')
+    return response
+
+
+def test_batched_screen_matches_per_cpg_screen(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ucsc_screen, 'rate_limited_get', lambda url, params: _stub_get(url, params, calls))
+    monkeypatch.setattr(ucsc_screen, 'MAX_ITEMS_OUTPUT', 2)
+
+    per_cpg = [screen_cpg(row) for row in ROWS]
+    per_cpg_requests = len(calls)
+    calls.clear()
+    batched = screen_batched(ROWS)
+
+    assert batched == per_cpg
+    assert per_cpg[-1] is None
+    assert [r['name'] for r in per_cpg[1]['clinvarMain']] == ['VCV1']
+    assert 'name' not in per_cpg[2]['clinvarMain'][0]
+    assert [r['name'] for r in per_cpg[3]['gwasCatalog']] == ['rs_last']
+    assert [r['name'] for r in per_cpg[4]['gwasCatalog']] == ['rs_chrom_start']
+
+    # The merged cg01-cg03 span hit the cap and was re-queried as its two halves
+    probe_spans = sorted((c['start'], c['end']) for c in calls if c['track'] == VERIFY_TRACK and c['chrom'] == 'chr1')
+    assert probe_spans == [(10_000, 10_001), (10_000, 10_101), (10_050, 10_101), (60_000, 60_001)]
+    assert len(calls) < per_cpg_requests
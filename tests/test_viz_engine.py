@@ -28,4 +28,30 @@ def test_plot_broad_spectrum_network(tmp_path):
     # This should run without error and create a file
     plot_broad_spectrum_network(df, output_path=str(output_file))
     
-    assert Path(output_file).is_file()
\ No newline at end of file
+    assert Path(output_file).is_file()
+
+def _large_association_df(n_genes=60, n_diseases=80):
+    rows = []
+    for g in range(n_genes):
+        parts = [f"Disease {d}, {((g * d) % 10) / 10 + 0.05:.2f}" for d in range(n_diseases) if (g + d) % 3 == 0]
+        rows.append(";\n".join(parts))
+    return pd.DataFrame({'symbol': [f"GENE{g}" for g in range(n_genes)], 'disgenet_diseases': rows})
+
+
+def test_plot_disease_heatmap_large_matrix_modes(tmp_path, monkeypatch, capsys):
+    import original_annotation.modules.viz_engine as viz_engine
+    df = _large_association_df()
+
+    # Force the raster path by lowering the cell threshold
+    monkeypatch.setattr(viz_engine, "LARGE_MATRIX_CELLS", 100)
+    plot_disease_heatmap(df, output_path=str(tmp_path / "raster.png"), dpi=50)
+    assert (tmp_path / "raster.png").is_file()
+    assert "60x80, raster" in capsys.readouterr().out
+
+    plot_disease_heatmap(df, output_path=str(tmp_path / "top.png"), dpi=50,
+                         top_k_genes=5, top_k_diseases=7, render="seaborn")
+    assert "5x7, seaborn" in capsys.readouterr().out
+
+    plot_disease_heatmap(df, output_path=str(tmp_path / "tiled.png"), dpi=50, tile_shape=(40, 50))
+    tiles = sorted(p.name for p in tmp_path.glob("tiled_r*_c*.png"))
+    assert tiles == ["tiled_r00_c00.png", "tiled_r00_c01.png", "tiled_r01_c00.png", "tiled_r01_c01.png"]
@@ -27,4 +27,43 @@ def test_network_refinements(tmp_path):
     
     plot_broad_spectrum_network(df, output_path=str(output_file), score_threshold=0.1)
     
-    assert Path(output_file).is_file()
\ No newline at end of file
+    assert Path(output_file).is_file()
+
+def test_network_layout_selection_and_cache(tmp_path, monkeypatch):
+    import networkx as nx
+    import original_annotation.modules.viz_engine as viz_engine
+    from original_annotation.modules.viz_engine import choose_network_layout, network_layout
+
+    G = nx.Graph()
+    for g in range(30):
+        for d in range(g % 4 + 1):
+            G.add_node(f"GENE{g}", type='gene')
+            G.add_node(f"Disease {(g + d) % 12}", type='disease')
+            G.add_edge(f"GENE{g}", f"Disease {(g + d) % 12}", weight=0.5)
+
+    assert choose_network_layout(G) == 'kamada_kawai'
+    monkeypatch.setattr(viz_engine, "KAMADA_KAWAI_MAX_NODES", 10)
+    assert choose_network_layout(G) == 'force'
+    monkeypatch.setattr(viz_engine, "FORCE_LAYOUT_MAX_NODES", 20)
+    assert choose_network_layout(G) == 'layered'
+
+    for layout in ('force', 'layered'):
+        pos = network_layout(G, layout=layout)
+        assert set(pos) == set(G)
+        assert all(abs(x) <= 1 and abs(y) <= 1 for x, y in pos.values())
+
+    # Layered layout: genes on the left, diseases on the right
+    pos = network_layout(G, layout='layered')
+    assert all((pos[n][0] < 0) == (d['type'] == 'gene') for n, d in G.nodes(data=True))
+
+    cache_dir = tmp_path / "layout_cache"
+    first = network_layout(G, layout='force', cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    monkeypatch.setitem(viz_engine.NETWORK_LAYOUTS, 'force', lambda G: pytest.fail("cache not used"))
+    second = network_layout(G, layout='force', cache_dir=cache_dir)
+    assert all((first[n] == second[n]).all() for n in G)
+
+    # A changed edge set misses the cache
+    G.add_edge("GENE0", "Disease 11", weight=0.9)
+    monkeypatch.setitem(viz_engine.NETWORK_LAYOUTS, 'force', lambda G: {n: (0.0, 0.0) for n in G})
+    assert network_layout(G, layout='force', cache_dir=cache_dir)["GENE0"] == (0.0, 0.0)
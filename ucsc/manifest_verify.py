@@ -0,0 +1,157 @@
+import argparse
+import gzip
+import sys
+
+import numpy as np
+import pandas as pd
+
+INPUT_FILE = "ewas_res_groupsig_128.xlsx"
+MISMATCH_FILE = "ucsc/manifest_mismatches.csv"
+
+# Canonical manifest columns and the names they go by in the Illumina EPIC/450k
+# manifests (hg38 columns) and the Zhou lab hg38 annotation manifests
+MANIFEST_COLUMN_ALIASES = {
+    "probe": ["Name", "probeID", "Probe_ID", "IlmnID"],
+    "chr": ["CHR_hg38", "CpG_chrm", "chr", "CHR"],
+    "start": ["Start_hg38", "CpG_beg", "start"],
+    "end": ["End_hg38", "CpG_end", "end"],
+}
+
+
+def _resolve_columns(columns):
+    resolved = {}
+    for canonical, aliases in MANIFEST_COLUMN_ALIASES.items():
+        for col in aliases:
+            if col in columns:
+                resolved[canonical] = col
+                break
+    missing = [c for c in MANIFEST_COLUMN_ALIASES if c not in resolved]
+    return resolved, missing
+
+
+def _normalize_chrom(series):
+    chrom = series.astype("string").str.strip()
+    return chrom.where(chrom.str.startswith("chr") | chrom.isna(), "chr" + chrom)
+
+
+def _find_header_row(path):
+    """
+    Illumina CSV manifests open with a [Heading] block; the table starts at the IlmnID row.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for i, line in enumerate(f):
+            if line.startswith("IlmnID,") or line.startswith("Name,"):
+                return i
+            if i > 50:
+                break
+    return 0
+
+
+def load_manifest(path):
+    """
+    Loads an EPIC/450k manifest into a DataFrame indexed by probe ID with chr, start and end columns.
+    """
+    sep = "\t" if ".tsv" in str(path) or ".txt" in str(path) else ","
+    header_row = _find_header_row(path) if sep == "," else 0
+    raw = pd.read_csv(path, sep=sep, skiprows=header_row, dtype=str, low_memory=False)
+
+    resolved, missing = _resolve_columns(raw.columns)
+    if missing:
+        raise ValueError(f"Manifest {path} is missing columns for: {missing} (found: {list(raw.columns)[:20]})")
+    # Illumina CSVs end with a [Controls] section whose rows carry no coordinates
+    section_start = raw.iloc[:, 0].fillna("").str.startswith("[")
+    raw = raw[~section_start.cummax()]
+
+    manifest = pd.DataFrame({
+        "probe": raw[resolved["probe"]].str.strip(),
+        "chr": _normalize_chrom(raw[resolved["chr"]]),
+        "start": pd.to_numeric(raw[resolved["start"]], errors="coerce").astype("Int64"),
+        "end": pd.to_numeric(raw[resolved["end"]], errors="coerce").astype("Int64"),
+    })
+    manifest = manifest.dropna(subset=["probe"])
+    # EPIC v2 lists replicate probes under one name; the first entry is kept
+    manifest = manifest.drop_duplicates(subset="probe", keep="first")
+    return manifest.set_index("probe")
+
+
+def verify_against_manifest(df, manifest, start_offset=0):
+    """
+    Checks every row's (chr, Start_hg38, End_hg38) against the manifest in one vectorized comparison.
+
+    Args:
+        df: Rows with 'cpg', 'chr', 'Start_hg38' and 'End_hg38'.
+        manifest: Output of load_manifest.
+        start_offset: Added to manifest coordinates before comparing, for manifests
+            using a different coordinate convention than the input (e.g. -1 for 1-based starts).
+
+    Returns:
+        (verified, mismatches): a boolean array aligned with df, and a DataFrame
+        with one row per failing CpG and an 'issue' column describing the failure.
+    """
+    expected = manifest.reindex(df["cpg"].astype(str).str.strip())
+
+    in_manifest = expected["chr"].notna().to_numpy()
+    chr_ok = (expected["chr"].fillna("").to_numpy(dtype=object)
+              == _normalize_chrom(df["chr"]).fillna("").to_numpy(dtype=object))
+    exp_start = (expected["start"] + start_offset).to_numpy(dtype="float64", na_value=np.nan)
+    exp_end = (expected["end"] + start_offset).to_numpy(dtype="float64", na_value=np.nan)
+    start_ok = exp_start == pd.to_numeric(df["Start_hg38"], errors="coerce").to_numpy(dtype="float64")
+    end_ok = exp_end == pd.to_numeric(df["End_hg38"], errors="coerce").to_numpy(dtype="float64")
+
+    verified = in_manifest & chr_ok & start_ok & end_ok
+
+    issue = np.select(
+        [~in_manifest, ~chr_ok, ~start_ok & ~end_ok, ~start_ok, ~end_ok],
+        ["not_in_manifest", "chr_mismatch", "position_mismatch", "start_mismatch", "end_mismatch"],
+        default="",
+    )
+
+    mismatches = pd.DataFrame({
+        "cpg": df["cpg"].to_numpy(),
+        "chr": df["chr"].to_numpy(),
+        "Start_hg38": df["Start_hg38"].to_numpy(),
+        "End_hg38": df["End_hg38"].to_numpy(),
+        "manifest_chr": expected["chr"].to_numpy(),
+        "manifest_start": exp_start,
+        "manifest_end": exp_end,
+        "issue": issue,
+    })[~verified].reset_index(drop=True)
+    mismatches["manifest_start"] = mismatches["manifest_start"].astype("Int64")
+    mismatches["manifest_end"] = mismatches["manifest_end"].astype("Int64")
+
+    return verified, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify CpG coordinates against a local Illumina EPIC/450k manifest.")
+    parser.add_argument("manifest", help="Manifest CSV/TSV (optionally gzipped) with hg38 coordinates.")
+    parser.add_argument("--input", default=INPUT_FILE, help=f"CpG coordinate sheet (default: {INPUT_FILE}).")
+    parser.add_argument("--output", default=MISMATCH_FILE, help=f"Mismatch table (default: {MISMATCH_FILE}).")
+    parser.add_argument("--start-offset", type=int, default=0,
+                        help="Offset added to manifest coordinates before comparing (default: 0).")
+    args = parser.parse_args()
+
+    try:
+        df = pd.read_excel(args.input, usecols=["cpg", "chr", "Start_hg38", "End_hg38"])
+    except FileNotFoundError:
+        print(f"Error: Could not find {args.input}")
+        sys.exit(1)
+
+    print(f"Loading manifest: {args.manifest}...")
+    manifest = load_manifest(args.manifest)
+    print(f"Loaded {len(manifest)} probes.")
+
+    verified, mismatches = verify_against_manifest(df, manifest, start_offset=args.start_offset)
+    print(f"Verified {int(verified.sum())}/{len(df)} CpGs.")
+
+    if mismatches.empty:
+        print("All coordinates match the manifest.")
+    else:
+        print(mismatches.to_string(index=False))
+    mismatches.to_csv(args.output, index=False)
+    print(f"Mismatch table written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import gzip
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+# Standard BED column names, used for .bed/.bigBed files that carry no header or schema
+BED_FIELDS = [
+    "chrom", "chromStart", "chromEnd", "name", "score", "strand",
+    "thickStart", "thickEnd", "itemRgb", "blockCount", "blockSizes", "chromStarts",
+]
+# Numeric BED columns; everything else in a BED file is text
+BED_FIELD_KINDS = {"chromStart": int, "chromEnd": int, "score": int, "thickStart": int, "thickEnd": int,
+                   "blockCount": int}
+
+# File names looked up for each track inside the offline directory, in order of preference
+TRACK_FILE_PATTERNS = ["{track}.bb", "{track}.bigBed", "{track}.bed.gz", "{track}.bed", "{track}.txt.gz", "{track}.txt"]
+# Schemas looked up next to a track file: the MySQL .sql UCSC ships with each table dump, or an autoSql .as
+SCHEMA_FILE_PATTERNS = ["{track}.sql", "{track}.as"]
+
+# Scalar column types the API returns as JSON numbers, in autoSql (.as, bigBed) and MySQL (.sql) schemas
+_INT_TYPES = {"int", "uint", "short", "ushort", "byte", "ubyte", "bigint",
+              "tinyint", "smallint", "mediumint", "integer"}
+_FLOAT_TYPES = {"float", "double", "decimal", "real"}
+
+
+def _type_kind(sql_type):
+    sql_type = sql_type.lower()
+    if sql_type in _INT_TYPES:
+        return int
+    if sql_type in _FLOAT_TYPES:
+        return float
+    return None
+
+
+def _parse_autosql(sql):
+    """
+    Extracts (field name, int/float/None) pairs from an autoSql definition.
+    Arrays (e.g. 'uint[blockCount] blockSizes') are returned by the API as text and stay None.
+    """
+    fields = []
+    in_body = False
+    for line in sql.splitlines():
+        line = line.strip()
+        if line.startswith("("):
+            in_body = True
+            line = line[1:].strip()
+        if not in_body or not line or line.startswith(")"):
+            continue
+        # e.g. 'uint chromStart;  "Start position in chromosome"'
+        decl = line.split(";", 1)[0].split()
+        if len(decl) >= 2:
+            fields.append((decl[-1], None if "[" in decl[0] else _type_kind(decl[0])))
+    return fields
+
+
+def _parse_mysql_schema(sql):
+    """
+    Extracts (field name, int/float/None) pairs from a UCSC table dump's CREATE TABLE statement.
+    """
+    fields = []
+    for match in re.finditer(r"^\s*`(\w+)`\s+(\w+)", sql, re.MULTILINE):
+        fields.append((match.group(1), _type_kind(match.group(2))))
+    return fields
+
+
+def parse_schema(sql):
+    """(field name, int/float/None) pairs from a MySQL .sql or autoSql .as track schema."""
+    if re.search(r"CREATE\s+TABLE", sql, re.IGNORECASE):
+        return _parse_mysql_schema(sql)
+    return _parse_autosql(sql)
+
+
+def find_schema_file(path):
+    """The .sql/.as schema next to a track file (gwasCatalog.txt.gz -> gwasCatalog.sql), or None."""
+    directory, filename = os.path.split(str(path))
+    for pattern in TRACK_FILE_PATTERNS:
+        suffix = pattern.format(track="")
+        if filename.endswith(suffix):
+            track = filename[:-len(suffix)]
+            for schema_pattern in SCHEMA_FILE_PATTERNS:
+                schema_path = os.path.join(directory, schema_pattern.format(track=track))
+                if os.path.exists(schema_path):
+                    return schema_path
+    return None
+
+
+def _convert(value, kind):
+    """
+    Converts a value of a numeric column like the API's JSON output; text columns are left alone.
+    Unparseable or non-finite values ('', 'NA', 'nan', 'inf') stay strings.
+    """
+    if kind is None:
+        return value
+    try:
+        number = kind(value)
+    except ValueError:
+        return value
+    return number if kind is int or math.isfinite(number) else value
+
+
+class ChromIndex:
+    """
+    Sorted-array interval index for one chromosome.
+
+    Items are kept sorted by start. With the longest item length as a bound,
+    an overlap query is two binary searches plus a filter over that slice.
+    """
+    def __init__(self, starts, ends, rows):
+        order = np.argsort(starts, kind="stable")
+        self.starts = np.asarray(starts, dtype=np.int64)[order]
+        self.ends = np.asarray(ends, dtype=np.int64)[order]
+        self.rows = [rows[i] for i in order]
+        # Zero-length items (insertions) are treated as covering one base when matching
+        self._match_ends = np.maximum(self.ends, self.starts + 1)
+        self.max_len = int((self._match_ends - self.starts).max()) if len(self.starts) else 0
+
+    def query(self, start, end):
+        """Indices of items overlapping [start, end), in start order."""
+        lo = np.searchsorted(self.starts, start - self.max_len + 1, side="left")
+        hi = np.searchsorted(self.starts, end, side="left")
+        if hi <= lo:
+            return []
+        hits = np.nonzero(self._match_ends[lo:hi] > start)[0] + lo
+        return hits.tolist()
+
+
+class LocalTrack:
+    """
+    A UCSC track loaded from a local bigBed or (bgzipped) BED/table dump,
+    indexed per chromosome for overlap queries.
+
+    Column names come from, in order: the fields argument, a .sql/.as schema next to
+    the file (or schema_path), the bigBed's embedded autoSql, a '#' header line, and
+    for .bed/.bigBed files the standard BED columns. A headerless table dump without a
+    schema is refused rather than guessed. Only columns a schema declares numeric are
+    converted to numbers.
+
+    Items are returned as dicts shaped like the UCSC getData/track API output.
+    """
+    def __init__(self, path, fields=None, schema_path=None):
+        self.path = path
+        self.fields = None
+        self.field_kinds = {}
+        self.has_bin = False
+        if fields:
+            self._set_fields([(name, BED_FIELD_KINDS.get(name)) for name in fields])
+        else:
+            schema_path = schema_path or find_schema_file(path)
+            if schema_path:
+                with open(schema_path, "r", encoding="utf-8") as f:
+                    self._set_fields(parse_schema(f.read()))
+        self.chroms = {}
+        if str(path).endswith((".bb", ".bigBed")):
+            self._load_bigbed()
+        else:
+            self._load_bed()
+
+    def _set_fields(self, fields):
+        # UCSC table dumps lead with a 'bin' column; rows keep it, items do not
+        fields = list(fields)
+        self.has_bin = bool(fields) and fields[0][0] == "bin"
+        if self.has_bin:
+            fields = fields[1:]
+        self.fields = [name for name, _ in fields]
+        self.field_kinds = {name: kind for name, kind in fields if kind is not None}
+
+    def _load_bigbed(self):
+        try:
+            import pyBigWig
+        except ImportError as exc:
+            raise ImportError(
+                f"Reading {self.path} requires pyBigWig (pip install pyBigWig); "
+                "alternatively convert it with bigBedToBed and gzip the output."
+            ) from exc
+
+        bb = pyBigWig.open(str(self.path))
+        try:
+            if self.fields is None:
+                sql = bb.SQL()
+                if isinstance(sql, bytes):
+                    sql = sql.decode("utf-8")
+                self._set_fields(parse_schema(sql) if sql else [(n, BED_FIELD_KINDS.get(n)) for n in BED_FIELDS])
+            for chrom, length in bb.chroms().items():
+                entries = bb.entries(chrom, 0, length) or []
+                starts = [e[0] for e in entries]
+                ends = [e[1] for e in entries]
+                rows = [tuple(e[2].split("\t")) if e[2] else () for e in entries]
+                if entries:
+                    self.chroms[chrom] = ChromIndex(starts, ends, rows)
+        finally:
+            bb.close()
+
+    def _default_fields(self):
+        """Field list for a file with no schema or header: BED columns, or an error for table dumps."""
+        if not str(self.path).endswith((".bed", ".bed.gz")):
+            raise ValueError(
+                f"{self.path} has no header and no .sql/.as schema next to it, so its columns are unknown. "
+                "Download the table's .sql file from the UCSC database dump directory into the same "
+                "directory, or pass the field names explicitly."
+            )
+        return [(name, BED_FIELD_KINDS.get(name)) for name in BED_FIELDS]
+
+    def _load_bed(self):
+        opener = gzip.open if str(self.path).endswith(".gz") else open
+        per_chrom = {}
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not line:
+                    continue
+                if line.startswith("#") or line.startswith("track ") or line.startswith("browser "):
+                    if line.startswith("#") and self.fields is None:
+                        # A header names the columns but not their types; only BED columns are numeric
+                        self._set_fields([(name, BED_FIELD_KINDS.get(name)) for name in line.lstrip("#").split("\t")])
+                    continue
+                parts = line.split("\t")
+                if self.fields is None:
+                    self._set_fields(self._default_fields())
+                offset = 1 if self.has_bin else 0
+                chrom = parts[offset]
+                starts, ends, rows = per_chrom.setdefault(chrom, ([], [], []))
+                starts.append(int(parts[offset + 1]))
+                ends.append(int(parts[offset + 2]))
+                rows.append(tuple(parts[offset + 3:]))
+
+        for chrom, (starts, ends, rows) in per_chrom.items():
+            self.chroms[chrom] = ChromIndex(starts, ends, rows)
+
+    def _item(self, chrom, index, i):
+        item = {"chrom": chrom, "chromStart": int(index.starts[i]), "chromEnd": int(index.ends[i])}
+        extra_fields = self.fields[3:]
+        for j, value in enumerate(index.rows[i]):
+            name = extra_fields[j] if j < len(extra_fields) else f"field{j + 4}"
+            item[name] = _convert(value, self.field_kinds.get(name))
+        return item
+
+    def query(self, chrom, start, end):
+        """Items overlapping [start, end) on chrom."""
+        index = self.chroms.get(chrom)
+        if index is None:
+            return []
+        return [self._item(chrom, index, i) for i in index.query(start, end)]
+
+
+def find_track_file(directory, track):
+    for pattern in TRACK_FILE_PATTERNS:
+        path = os.path.join(directory, pattern.format(track=track))
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class LocalTrackStore:
+    """
+    Lazily loads tracks from a directory of downloaded track files.
+
+    fetch() has the same signature and return shape as ucsc_screen.fetch_track_items,
+    so it can stand in for the live API in any screening strategy.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._tracks = {}
+        self._lock = threading.Lock()
+
+    def get_track(self, track):
+        with self._lock:
+            if track not in self._tracks:
+                path = find_track_file(self.directory, track)
+                if path is None:
+                    expected = ", ".join(p.format(track=track) for p in TRACK_FILE_PATTERNS)
+                    raise FileNotFoundError(f"No local file for track '{track}' in {self.directory} (expected one of: {expected})")
+                print(f"  Loading local track {track} from {path}...")
+                self._tracks[track] = LocalTrack(path)
+            return self._tracks[track]
+
+    def fetch(self, chrom, start, end, track_name, max_items=None):
+        """
+        Items of track_name overlapping [start, end) on chrom, as (items, truncated).
+        Local lookups have no item cap: max_items is accepted for compatibility and truncated is always False.
+        """
+        return self.get_track(track_name).query(chrom, int(start), int(end)), False
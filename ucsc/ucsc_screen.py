@@ -1,14 +1,44 @@
 import pandas as pd
 import requests
 import json
+import os
 import time
 import sys
+import threading
+import argparse
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+from ucsc_offline import LocalTrackStore
+from manifest_verify import MISMATCH_FILE, load_manifest, verify_against_manifest
+
+# Add root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from original_annotation.modules.http_metrics import METRICS, service_for_url
 
 # --- CONFIGURATION ---
 GENOME_BUILD = "hg38"
 GWAS_WINDOW_SIZE = 5000  # Look 5kb upstream and downstream for GWAS hits
 INPUT_FILE = "ewas_res_groupsig_128.xlsx"
 OUTPUT_FILE = "ucsc/ewas_ucsc_annotated.xlsx"
+HTTP_METRICS_FILE = "ucsc/ewas_ucsc_http_metrics.json"
+
+# --- CONCURRENCY ---
+UCSC_API_URL = "https://api.genome.ucsc.edu/getData/track"
+MAX_WORKERS = 8                 # CpGs screened in parallel
+MAX_CONNECTIONS_PER_HOST = 4    # Requests in flight to any one host
+MAX_REQUESTS_PER_SECOND = 5.0   # Global cap across all workers
+REQUEST_TIMEOUT = 30            # Seconds
+
+# --- REGION BATCHING ---
+VERIFY_TRACK = "snpArrayIllumina850k"
+MAX_SPAN_GAP = 10_000           # Merge query windows separated by at most this many bp
+MAX_SPAN_SIZE = 2_000_000       # Never let a merged span grow beyond this many bp
+MAX_ITEMS_OUTPUT = 100_000      # Per-request item cap sent to the API
 
 # Define your tracks separated by search strategy
 TRACKS = {
@@ -24,38 +54,104 @@ TRACKS = {
     ]
 }
 
-def query_ucsc_track(chrom, start, end, track_name):
+class RateLimiter:
+    """
+    Thread-safe limiter spacing request starts at least 1/rate seconds apart.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+_rate_limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)
+
+
+def get_session():
     """
-    Queries the UCSC API for a specific track at specific coordinates.
+    Returns the shared requests session, pooling up to MAX_CONNECTIONS_PER_HOST connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONNECTIONS_PER_HOST)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _host_slot(url):
+    host = urlparse(url).netloc
+    with _session_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_slots[host]
+
+
+def rate_limited_get(url, params):
+    """
+    GET through the shared session, bounded per host and by the global rate cap.
+    Latency is recorded from the moment the request is sent, excluding the wait for a slot.
+    """
+    with _host_slot(url):
+        _rate_limiter.wait()
+        with METRICS.request(service_for_url(url)) as call:
+            call.response = get_session().get(url, params=params, timeout=REQUEST_TIMEOUT)
+        return call.response
+
+
+def fetch_track_items(chrom, start, end, track_name, max_items=None):
+    """
+    Queries the UCSC API for a track over a region.
+
+    Returns (items, truncated), where truncated is True when the API reports
+    that the item limit was reached.
     """
-    base_url = "https://api.genome.ucsc.edu/getData/track"
     params = {
         "genome": GENOME_BUILD,
         "track": track_name,
         "chrom": chrom,
-        "start": start,
-        "end": end
+        "start": int(start),
+        "end": int(end)
     }
-    
+    if max_items:
+        params["maxItemsOutput"] = max_items
+
     try:
-        response = requests.get(base_url, params=params)
+        response = rate_limited_get(UCSC_API_URL, params)
         response.raise_for_status()
         data = response.json()
-        
-        if track_name in data:
-            return data[track_name]
-        return []
-        
+        return data.get(track_name, []), bool(data.get("maxItemsLimit"))
+
     except requests.exceptions.RequestException as e:
         print(f"  [!] Error querying {track_name}: {e}")
-        return []
+        return [], False
 
-def verify_cpg(cpg_id, chrom, start, end):
+def query_ucsc_track(chrom, start, end, track_name, fetch=None):
+    """
+    Queries the UCSC API (or a local stand-in passed as fetch) for a specific track at specific coordinates.
+    """
+    items, _ = (fetch or fetch_track_items)(chrom, start, end, track_name)
+    return items
+
+def verify_cpg(cpg_id, chrom, start, end, fetch=None):
     """
     Verifies that the coordinates resolve to the given CpG ID using the snpArrayIllumina850k track.
     """
-    track_name = "snpArrayIllumina850k"
-    hits = query_ucsc_track(chrom, start, end, track_name)
+    hits = query_ucsc_track(chrom, start, end, VERIFY_TRACK, fetch)
     
     for hit in hits:
         if hit.get('name') == cpg_id:
@@ -77,7 +173,192 @@ def flatten_result(cpg_id, original_row_data, hit_data):
     flat.update(hit_data)
     return flat
 
+def screen_cpg(row, fetch=None, verify=True):
+    """
+    Verifies one CpG and runs every track against it.
+
+    Returns {track: [flattened records]}, or None if verification failed.
+    Tracks without hits get a single blank record to keep the CpG in the sheet.
+    Pass verify=False for rows already checked against a local manifest.
+    """
+    cpg_id = row['cpg']
+    chrom = row['chr']
+    start = row['Start_hg38']
+    end = row['End_hg38']
+
+    # 1. Verification
+    if verify and not verify_cpg(cpg_id, chrom, start, end, fetch):
+        return None
+
+    results = {}
+
+    # 2. Run Direct Overlap Tracks
+    for track in TRACKS["direct_overlap"]:
+        hits = query_ucsc_track(chrom, start, end, track, fetch)
+        results[track] = [flatten_result(cpg_id, row, hit) for hit in hits] or [flatten_result(cpg_id, row, {})]
+
+    # 3. Run Neighborhood Tracks
+    win_start = max(0, start - GWAS_WINDOW_SIZE)
+    win_end = end + GWAS_WINDOW_SIZE
+
+    for track in TRACKS["neighborhood"]:
+        hits = query_ucsc_track(chrom, win_start, win_end, track, fetch)
+        results[track] = [flatten_result(cpg_id, row, hit) for hit in hits] or [flatten_result(cpg_id, row, {})]
+
+    return results
+
+# --- REGION-BATCHED SCREENING ---
+
+def plan_query_spans(windows, max_gap=MAX_SPAN_GAP, max_span=MAX_SPAN_SIZE):
+    """
+    Merges per-CpG query windows into larger spans.
+
+    windows: list of (key, chrom, start, end).
+    Returns a list of (chrom, span_start, span_end, [(key, start, end), ...]),
+    grouping windows sorted by chromosome and position whenever the gap to the
+    current span is at most max_gap and the merged span stays within max_span.
+    """
+    spans = []
+    current = None
+    for key, chrom, start, end in sorted(windows, key=lambda w: (str(w[1]), w[2], w[3])):
+        if (current is not None and chrom == current[0]
+                and start - current[2] <= max_gap
+                and max(end, current[2]) - current[1] <= max_span):
+            current[2] = max(current[2], end)
+            current[3].append((key, start, end))
+        else:
+            current = [chrom, start, end, [(key, start, end)]]
+            spans.append(current)
+    return [tuple(span) for span in spans]
+
+
+class HitIndex:
+    """
+    Interval index over the items returned for one span.
+
+    Items are sorted by chromStart; together with the longest item length this
+    bounds every overlap query to a bisected slice of the sorted starts.
+    """
+    def __init__(self, items):
+        self.items = sorted(items, key=lambda h: h.get('chromStart', 0))
+        self.starts = [h.get('chromStart', 0) for h in self.items]
+        # Zero-length items (insertions) are treated as covering one base
+        self.ends = [max(h.get('chromEnd', s), s + 1) for h, s in zip(self.items, self.starts)]
+        self.max_len = max((e - s for s, e in zip(self.starts, self.ends)), default=0)
+
+    def overlapping(self, start, end):
+        """Items overlapping the half-open interval [start, end), in start order."""
+        lo = bisect_left(self.starts, start - self.max_len + 1)
+        hi = bisect_left(self.starts, end)
+        return [self.items[i] for i in range(lo, hi) if self.ends[i] > start]
+
+
+def fetch_span_items(chrom, start, end, track, members, fetch=fetch_track_items):
+    """
+    Fetches one span, splitting it by member windows if the API item cap was hit.
+
+    Returns a list of (HitIndex, members) pairs covering all members.
+    """
+    items, truncated = fetch(chrom, start, end, track, max_items=MAX_ITEMS_OUTPUT)
+    if truncated and len(members) > 1:
+        half = len(members) // 2
+        parts = []
+        for part in (members[:half], members[half:]):
+            part_start = min(m[1] for m in part)
+            part_end = max(m[2] for m in part)
+            parts.extend(fetch_span_items(chrom, part_start, part_end, track, part, fetch))
+        return parts
+    if truncated:
+        print(f"  [!] {track} item limit reached for {chrom}:{start}-{end}; results may be incomplete.")
+    return [(HitIndex(items), members)]
+
+
+def query_track_batched(windows, track, executor, fetch=fetch_track_items):
+    """
+    Runs a track over many windows with one request per merged span.
+
+    Returns {key: [items overlapping that key's window]}.
+    """
+    spans = plan_query_spans(windows)
+    print(f"  - {track}: {len(windows)} windows merged into {len(spans)} requests.")
+    futures = [executor.submit(fetch_span_items, chrom, start, end, track, members, fetch)
+               for chrom, start, end, members in spans]
+
+    hits_by_key = {}
+    for future in futures:
+        for index, members in future.result():
+            for key, start, end in members:
+                hits_by_key[key] = index.overlapping(start, end)
+    return hits_by_key
+
+
+def screen_batched(rows, fetch=None, verified=None):
+    """
+    Region-batched equivalent of running screen_cpg on every row.
+
+    verified: optional set of row indices already checked against a local
+        manifest; when given, the verification track is not queried.
+
+    Returns a list aligned with rows holding {track: [flattened records]},
+    or None for rows whose coordinates failed verification.
+    """
+    fetch = fetch or fetch_track_items
+    exact = [(i, row['chr'], int(row['Start_hg38']), int(row['End_hg38'])) for i, row in enumerate(rows)]
+    neighborhood = [(i, chrom, max(0, start - GWAS_WINDOW_SIZE), end + GWAS_WINDOW_SIZE)
+                    for i, chrom, start, end in exact]
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # 1. Verification
+        if verified is None:
+            probe_hits = query_track_batched(exact, VERIFY_TRACK, executor, fetch)
+            verified = {i for i, row in enumerate(rows)
+                        if any(hit.get('name') == row['cpg'] for hit in probe_hits.get(i, []))}
+        exact = [w for w in exact if w[0] in verified]
+        neighborhood = [w for w in neighborhood if w[0] in verified]
+
+        # 2/3. Direct overlap and neighborhood tracks
+        track_hits = {}
+        for track in TRACKS["direct_overlap"]:
+            track_hits[track] = query_track_batched(exact, track, executor, fetch)
+        for track in TRACKS["neighborhood"]:
+            track_hits[track] = query_track_batched(neighborhood, track, executor, fetch)
+
+    results = []
+    for i, row in enumerate(rows):
+        if i not in verified:
+            results.append(None)
+            continue
+        cpg_results = {}
+        for track, hits_by_key in track_hits.items():
+            hits = hits_by_key.get(i, [])
+            cpg_results[track] = [flatten_result(row['cpg'], row, hit) for hit in hits] or [flatten_result(row['cpg'], row, {})]
+        results.append(cpg_results)
+    return results
+
 def main():
+    parser = argparse.ArgumentParser(description="Screen CpG coordinates against UCSC Genome Browser tracks.")
+    parser.add_argument("--per-cpg", action="store_true",
+                        help="Query every CpG individually instead of merging nearby CpGs into region requests.")
+    parser.add_argument("--offline", metavar="TRACK_DIR",
+                        help="Read tracks from local files in TRACK_DIR (e.g. clinvarMain.bb, or gwasCatalog.txt.gz "
+                             "with the gwasCatalog.sql schema from the same UCSC dump directory) instead of the UCSC API.")
+    parser.add_argument("--manifest", metavar="PATH",
+                        help="Verify coordinates against a local Illumina EPIC/450k manifest instead of "
+                             f"querying {VERIFY_TRACK}; mismatches are written to {MISMATCH_FILE}.")
+    args = parser.parse_args()
+
+    fetch = None
+    if args.offline:
+        store = LocalTrackStore(args.offline)
+        print(f"Offline mode: loading tracks from {args.offline}...")
+        # Load every track up front so worker threads never wait on each other's parsing
+        preload = [t for cat in TRACKS.values() for t in cat]
+        if not args.manifest:
+            preload.insert(0, VERIFY_TRACK)
+        for track in preload:
+            store.get_track(track)
+        fetch = store.fetch
+
     print(f"Reading input file: {INPUT_FILE}...")
     try:
         df = pd.read_excel(INPUT_FILE)
@@ -96,51 +377,37 @@ def main():
         print(f"Found columns: {df.columns.tolist()}")
         sys.exit(1)
 
-    print(f"Processing {len(df)} rows...")
-    
-    for index, row in df.iterrows():
-        cpg_id = row['cpg']
-        chrom = row['chr']
-        start = row['Start_hg38']
-        end = row['End_hg38']
-        
-        print(f"[{index+1}/{len(df)}] Processing {cpg_id}...", end="", flush=True)
+    verified = None
+    if args.manifest:
+        print(f"Verifying coordinates against manifest: {args.manifest}...")
+        passed, mismatches = verify_against_manifest(df, load_manifest(args.manifest))
+        verified = set(passed.nonzero()[0].tolist())
+        print(f"  {len(verified)}/{len(df)} CpGs verified; writing {len(mismatches)} mismatches to {MISMATCH_FILE}.")
+        mismatches.to_csv(MISMATCH_FILE, index=False)
 
-        # 1. Verification
-        if not verify_cpg(cpg_id, chrom, start, end):
-            print(" [X] Verification Failed (Coordinates do not match CpG ID)")
+    rows = [row for _, row in df.iterrows()]
+    if args.per_cpg:
+        print(f"Processing {len(df)} rows with {MAX_WORKERS} workers...")
+        if verified is not None:
+            # Rows failing the manifest check are dropped here rather than re-checked over HTTP
+            todo = [row for i, row in enumerate(rows) if i in verified]
+        else:
+            todo = rows
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # map() yields in input order, so buffered results are written in the original row order
+            done = iter(executor.map(partial(screen_cpg, fetch=fetch, verify=verified is None), todo))
+        screened = [next(done) if verified is None or i in verified else None for i in range(len(rows))]
+    else:
+        print(f"Processing {len(df)} rows in region-batched mode...")
+        screened = screen_batched(rows, fetch=fetch, verified=verified)
+
+    for index, (row, cpg_results) in enumerate(zip(rows, screened)):
+        cpg_id = row['cpg']
+        if cpg_results is None:
+            print(f"[{index+1}/{len(df)}] {cpg_id} [X] Verification Failed (Coordinates do not match CpG ID)")
             continue
-        
-        print(" [V] Verified. Running tracks...", end="", flush=True)
-        
-        # 2. Run Direct Overlap Tracks
-        for track in TRACKS["direct_overlap"]:
-            hits = query_ucsc_track(chrom, start, end, track)
-            if hits:
-                for hit in hits:
-                    flat_hit = flatten_result(cpg_id, row, hit)
-                    results_storage[track].append(flat_hit)
-            else:
-                # Add a blank record if no hits found to keep the CpG in the sheet
-                results_storage[track].append(flatten_result(cpg_id, row, {}))
-
-        # 3. Run Neighborhood Tracks
-        win_start = max(0, start - GWAS_WINDOW_SIZE)
-        win_end = end + GWAS_WINDOW_SIZE
-        
-        for track in TRACKS["neighborhood"]:
-            hits = query_ucsc_track(chrom, win_start, win_end, track)
-            if hits:
-                for hit in hits:
-                    flat_hit = flatten_result(cpg_id, row, hit)
-                    results_storage[track].append(flat_hit)
-            else:
-                # Add a blank record if no hits found to keep the CpG in the sheet
-                results_storage[track].append(flatten_result(cpg_id, row, {}))
-
-        print(" Done.")
-        # Be polite to the API
-        time.sleep(0.1)
+        for track, records in cpg_results.items():
+            results_storage[track].extend(records)
 
     # 4. Write Output
     print(f"Writing results to {OUTPUT_FILE}...")
@@ -158,6 +425,9 @@ def main():
             print("  Warning: No results found for any track. Creating an empty file.")
             pd.DataFrame({'info': ['No hits found']}).to_excel(writer, sheet_name='Summary', index=False)
 
+    if not args.offline:
+        METRICS.print_summary(prefix="  [HTTP]")
+        print(f"  HTTP metrics written to {METRICS.write_json(HTTP_METRICS_FILE)}")
     print("Process complete!")
 
 if __name__ == "__main__":